@@ -1,5 +1,5 @@
 from .bmpdb import *
 from .summary import *
-from . import nsqd
+from . import nsqd, cache, stats
 
 from .tests import test, teststrict
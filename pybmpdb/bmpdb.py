@@ -1,24 +1,195 @@
 import os
+import json
+import hashlib
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from pkg_resources import resource_filename
 from functools import partial
+from contextlib import closing
+from collections import namedtuple
 from pathlib import Path
 
 import numpy
 import pandas
 from bulwark import checks
 
-from . import info, utils
+from . import info, utils, cache
 
 import wqio
 
 
-__all__ = ["load_data", "transform_parameters", "paired_qual"]
+__all__ = ["load_data", "LoadOptions", "SummaryPlan", "transform_parameters", "combine_parameters", "derive_parameters", "paired_qual"]
 
 
 _logger = logging.getLogger(__name__)
 
 
+# index levels that together uniquely define each observation in the
+# cleaned data (in addition to ``sampledatetime``)
+_row_headers = [
+    "category",
+    "epazone",
+    "state",
+    "site",
+    "bmp",
+    "station",
+    "storm",
+    "sampletype",
+    "watertype",
+    "paramgroup",
+    "units",
+    "parameter",
+    "fraction",
+    "wq_initialscreen",
+    "ms_indivscreen",
+    "wq_catscreen",
+    "bmptype",
+    "ws_id",
+    "site_id",
+    "bmp_id",
+    "dot_type",
+]
+
+# row headers that ``_clean_raw_data`` derives from the raw data rather
+# than passing through as-is
+_derived_row_headers = [
+    "station",
+    "sampletype",
+    "units",
+    "fraction",
+    "wq_initialscreen",
+    "ms_indivscreen",
+    "wq_catscreen",
+]
+
+# row headers that the preparation of the data and wqio.DataCollection
+# rely on. The others can be left out of the raw data (see ``_raw_columns``).
+_required_row_headers = [
+    "category",
+    "site",
+    "bmp",
+    "station",
+    "storm",
+    "sampletype",
+    "paramgroup",
+    "units",
+    "parameter",
+    "fraction",
+    "bmptype",
+    "site_id",
+    "bmp_id",
+]
+
+# columns of the raw data other than the row headers that are cleaned
+_raw_value_columns = ["res", "qual", "DL", "sampledate", "sampletime"]
+
+_screening_headers = ["wq_initialscreen", "ms_indivscreen", "wq_catscreen"]
+
+# number of rows in which the raw data are read when they are filtered
+_filter_chunksize = 100000
+
+# columns of the results of data/default.sql that are named differently
+# in the CSV export of the database
+_sql_column_names = {
+    "wq_units": "units",
+    "wq_qual": "qual",
+    "wq_value": "res",
+    "initialscreen": "wq_initialscreen",
+    "wqscreen": "ms_indivscreen",
+    "catscreen": "wq_catscreen",
+}
+
+# number of rows fetched at a time from a database
+_fetch_size = 50000
+
+# pandas dtype of the strings with the "pyarrow" dtype backend
+_arrow_string = "string[pyarrow]"
+
+# validation modes of the checks of the data and the number of rows that
+# are checked with validate="sample"
+_validate_modes = ("full", "sample", "off")
+_validate_sample_size = 10000
+
+# parameters that ``_maybe_combine_nox`` combines into NOx, in order of
+# preference
+_nitro_components = [
+    "Nitrogen, Nitrite (NO2) + Nitrate (NO3) as N",
+    "Nitrogen, Nitrate (NO3) as N",
+]
+_nitro_combined = "Nitrogen, NOx as N"
+
+# BMP categories that ``_maybe_combine_WB_RP`` combines and the category
+# that ``_maybe_fix_PFCs`` assigns to BMPs of type "PF"
+_wbrp_indiv = ["Retention Pond", "Wetland Basin"]
+_wbrp_combo = "Wetland Basin/Retention Pond"
+_PFC = "Permeable Friction Course"
+
+
+# qualifiers that flag non-detects when scaling the results and when
+# assigning the final qualifiers, respectively
+_ND_factor_quals = ["U", "UK", "UA", "UC", "K"]
+_ND_qualifier_quals = ["U", "UA", "UI", "UC", "UK", "K"]
+
+
+def _nd_kernel(
+    quals, res, DL, factor_quals=None, qualifier_quals=None, nd_correction=2, scaled=False
+):
+    """Computes the non-detect scaling factors and flags of the results in
+    a single pass. The qualifiers are factorized once, the vocabularies are
+    matched against the (few) unique qualifiers only, and everything else
+    is done on plain numpy arrays.
+
+    Parameters
+    ----------
+    quals, res, DL : array-like
+        The qualifiers, results, and detection limits.
+    factor_quals, qualifier_quals : list of str, optional
+        The qualifiers that signify a non-detect when computing the scaling
+        factors and the final qualifiers, respectively. See
+        ``_handle_ND_factors`` and ``_handle_ND_qualifiers`` for the
+        defaults.
+    nd_correction : float, optional (default = 2.0)
+        The factor by which non-detect results will be multiplied.
+    scaled : bool (default = False)
+        When True, the UJ results are flagged by comparing the scaled
+        results (``res * factors``) to the detection limits, exactly as
+        when ``_handle_ND_qualifiers`` is applied after the results are
+        scaled with ``_handle_ND_factors``.
+
+    Returns
+    -------
+    factors : numpy.array of floats
+    is_ND : numpy.array of bools
+
+    """
+
+    factor_quals = wqio.validate.at_least_empty_list(factor_quals) or _ND_factor_quals
+    qualifier_quals = wqio.validate.at_least_empty_list(qualifier_quals) or _ND_qualifier_quals
+
+    # missing qualifiers get code -1, which picks the trailing False below
+    codes, uniques = pandas.factorize(numpy.asarray(quals, dtype=object))
+
+    def _lookup(vocabulary):
+        return numpy.append(pandas.Index(uniques).isin(vocabulary), False)[codes]
+
+    normal_ND = _lookup(factor_quals)
+    qualified_ND = _lookup(qualifier_quals)
+    is_UJ = _lookup(["UJ"])
+
+    res = numpy.asarray(res, dtype=float)
+    DL = numpy.asarray(DL, dtype=float)
+
+    factors = numpy.where(normal_ND, float(nd_correction), 1.0)
+    weird_UJ = is_UJ & ~normal_ND & (res < DL)
+    factors[weird_UJ] = DL[weird_UJ] / res[weird_UJ]
+
+    if scaled:
+        res = res * factors
+
+    is_ND = qualified_ND | (is_UJ & (res <= DL))
+    return factors, is_ND
+
+
 @wqio.utils.log_df_shape(_logger)
 def _handle_ND_factors(df, qualcol="qual", rescol="res", dlcol="DL", quals=None, nd_correction=2):
     """Determines the scaling factor to be applied to the water quality result
@@ -43,6 +214,10 @@ def _handle_ND_factors(df, qualcol="qual", rescol="res", dlcol="DL", quals=None,
     -------
     factors : numpy.array
 
+    See also
+    --------
+    _nd_kernel
+
     Notes
     -----
     The underlying assumption here is that the BMP Database reports non-detects
@@ -57,16 +232,8 @@ def _handle_ND_factors(df, qualcol="qual", rescol="res", dlcol="DL", quals=None,
 
     """
 
-    quals = wqio.validate.at_least_empty_list(quals)
-    if not quals:
-        quals.extend(["U", "UK", "UA", "UC", "K"])
-
-    normal_ND = [df[qualcol].isin(quals), float(nd_correction)]
-    weird_UJ = [
-        (df[qualcol] == "UJ") & (df[rescol] < df[dlcol]),
-        df[dlcol] / df[rescol],
-    ]
-    return wqio.utils.selector(1, normal_ND, weird_UJ)
+    factors, _ = _nd_kernel(df[qualcol], df[rescol], df[dlcol], factor_quals=quals, nd_correction=nd_correction)
+    return factors
 
 
 @wqio.utils.log_df_shape(_logger)
@@ -95,6 +262,7 @@ def _handle_ND_qualifiers(df, qualcol="qual", rescol="res", dlcol="DL", quals=No
     See also
     --------
     _handle_ND_factors
+    _nd_kernel
 
     Notes
     -----
@@ -103,14 +271,24 @@ def _handle_ND_qualifiers(df, qualcol="qual", rescol="res", dlcol="DL", quals=No
 
     """
 
-    quals = wqio.validate.at_least_empty_list(quals)
-    if not quals:
-        quals.extend(["U", "UA", "UI", "UC", "UK", "K"])
-
-    is_ND = df[qualcol].isin(quals) | ((df[qualcol] == "UJ") & (df[rescol] <= df[dlcol]))
+    _, is_ND = _nd_kernel(df[qualcol], df[rescol], df[dlcol], qualifier_quals=quals)
     return numpy.where(is_ND, "ND", "=")
 
 
+@wqio.utils.log_df_shape(_logger)
+def _apply_ND_handling(df, qualcol="qual", rescol="res", dlcol="DL", nd_correction=2):
+    """Scales the non-detect results and replaces the raw qualifiers with
+    "ND" or "=" using a single call to ``_nd_kernel``. As when the results
+    are scaled before they are requalified, the final qualifiers are based
+    on the scaled results.
+    """
+
+    factors, is_ND = _nd_kernel(
+        df[qualcol], df[rescol], df[dlcol], nd_correction=nd_correction, scaled=True
+    )
+    return df.assign(**{rescol: df[rescol] * factors, qualcol: numpy.where(is_ND, "ND", "=")})
+
+
 @wqio.utils.log_df_shape(_logger)
 def _process_screening(df, screencol):
     yes = df[screencol].str.lower().isin(["inc", "yes", "y"])
@@ -118,16 +296,81 @@ def _process_screening(df, screencol):
     return wqio.utils.selector("invalid", [yes, "yes"], [no, "no"])
 
 
+def _str_contains(values, pattern):
+    # plain boolean array even for nullable (e.g., Arrow-backed) strings
+    return values.str.lower().str.contains(pattern).to_numpy(dtype=bool, na_value=False)
+
+
 @wqio.utils.log_df_shape(_logger)
 def _process_sampletype(df, sampletype):
-    grab = [df[sampletype].str.lower().str.contains("grab"), "grab"]
-    composite = [
-        df[sampletype].str.lower().str.contains("emc") | df[sampletype].str.lower().str.contains("comp"),
-        "composite",
-    ]
+    grab = [_str_contains(df[sampletype], "grab"), "grab"]
+    composite = [_str_contains(df[sampletype], "emc|comp"), "composite"]
     return wqio.utils.selector("unknown", grab, composite)
 
 
+def _parse_unique(values, parser):
+    # parse each distinct value only once, leaving NaN where *parser* fails
+    parsed = {}
+    for value in values.dropna().unique():
+        try:
+            parsed[value] = parser(value)
+        except ValueError:
+            pass
+    return values.map(parsed)
+
+
+def _time_of_day(timestamp):
+    return timestamp - timestamp.normalize()
+
+
+@wqio.utils.log_df_shape(_logger)
+def _make_timestamps(df, datecol="sampledate", timecol="sampletime"):
+    """Combines separate date and time columns into a single column of
+    timestamps. This is a column-wise version of
+    ``wqio.utils.makeTimestamp``.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    datecol : str, optional (default = 'sampledate')
+        The column in *df* that contains the sample dates.
+    timecol : str, optional (default = 'sampletime')
+        The column in *df* that contains the sample times.
+
+    Returns
+    -------
+    timestamps : pandas.Series
+
+    Notes
+    -----
+    Missing or unparsable dates fall back to 1901-01-01 and missing or
+    unparsable times fall back to midnight, just as they do in
+    ``wqio.utils.makeTimestamp``. Columns that are already datetimes are
+    handled with vectorized operations. Any other column is parsed one
+    distinct value at a time, so the cost depends on the number of distinct
+    dates and times rather than the number of rows.
+
+    """
+
+    fallback = pandas.Timestamp("1901-01-01 00:00")
+
+    dates = df[datecol]
+    if pandas.api.types.is_datetime64_any_dtype(dates):
+        dates = dates.dt.normalize()
+    else:
+        dates = pandas.to_datetime(_parse_unique(dates, lambda d: pandas.Timestamp(d).normalize()))
+
+    times = df[timecol]
+    if pandas.api.types.is_datetime64_any_dtype(times):
+        times = times - times.dt.normalize()
+    else:
+        times = pandas.to_timedelta(_parse_unique(times, lambda t: _time_of_day(pandas.Timestamp(t))))
+
+    # datetime.time only carries microseconds
+    times = times.dt.floor("us")
+    return dates.fillna(fallback) + times.fillna(pandas.Timedelta(0))
+
+
 def _check_levelnames(levels):
     good_levels = [
         "category",
@@ -212,6 +455,202 @@ def transform_parameters(
     return result
 
 
+def _set_level_value(df, level, value):
+    # sets every value of an index level to *value*, from the codes
+    position = df.index.names.index(level)
+    levels = list(df.index.levels)
+    codes = list(df.index.codes)
+    levels[position] = pandas.Index([value], name=level)
+    codes[position] = numpy.zeros(df.shape[0], dtype="int8")
+    index = pandas.MultiIndex(levels=levels, codes=codes, names=df.index.names, verify_integrity=False)
+    return df.set_axis(index, axis="index")
+
+
+def _append_rows(df, other):
+    """Appends the rows of *other* to *df*, which must have the same index
+    levels. Equivalent to ``pandas.concat([df, other])``, but the index is
+    built from the levels and codes of both rather than from full-length
+    arrays of their values, so the index of *df* is never materialized.
+    """
+
+    levels, codes = [], []
+    for left, left_codes, right, right_codes in zip(
+        df.index.levels, df.index.codes, other.index.levels, other.index.codes
+    ):
+        # existing codes stay valid since new values are added at the end
+        level = left.append(right[~right.isin(left)])
+        mapped = level.get_indexer(right)
+        levels.append(level)
+        codes.append(numpy.concatenate([left_codes, numpy.where(right_codes >= 0, mapped[right_codes], -1)]))
+
+    index = pandas.MultiIndex(levels=levels, codes=codes, names=df.index.names, verify_integrity=False)
+    return pandas.concat([df, other], ignore_index=True, sort=False).set_axis(index, axis="index")
+
+
+def combine_parameters(
+    df,
+    existingparams,
+    newparam,
+    newunits,
+    resfxn,
+    qualfxn,
+    indexMods=None,
+    paramlevel="parameter",
+    rescol="res",
+    qualcol="qual",
+):
+    """Vectorized variant of ``transform_parameters``: computes a new
+    parameter from existing ones and appends it to the data.
+
+    The results of the existing parameters are aligned by all of the
+    other levels of the index, so a new result is computed for every
+    observation of at least one of them.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    existingparams : list of strings
+        List of the existing parameters that will be used to compute
+        the new values
+    newparam : string
+        Name of the new parameter to be generated
+    newunits : string
+        Units of the newly computed values
+    resfxn : callable
+        Function that computes the results of ``newparam``. It receives
+        one aligned pandas.Series of results for each of the
+        ``existingparams`` (in that order, NaN where a parameter wasn't
+        observed) and returns a Series of the same length.
+    qualfxn : callable
+        Same as ``resfxn``, but for determining the final qualifier
+        of the ``newparam`` results.
+    indexMods : dict, optional (keys = index level names)
+        Dictionary of index level name whose values are the new
+        values of those levels where ``parameter == newparam``.
+    paramlevel : str (default = "parameter")
+    rescol, qualcol : str (default = "res", "qual")
+        Level of the index with the parameter names, and the columns of
+        results and qualifiers.
+
+    Returns
+    -------
+    transformed : pandas.DataFrame
+        *df*, followed by the rows of ``newparam``. New rows without a
+        result nor a qualifier are dropped.
+
+    See also
+    --------
+    transform_parameters
+
+    """
+
+    derivation = dict(
+        existingparams=existingparams,
+        newparam=newparam,
+        newunits=newunits,
+        resfxn=resfxn,
+        qualfxn=qualfxn,
+        indexMods=indexMods,
+    )
+    return derive_parameters(df, [derivation], paramlevel=paramlevel, rescol=rescol, qualcol=qualcol)
+
+
+def derive_parameters(df, derivations, paramlevel="parameter", rescol="res", qualcol="qual"):
+    """Computes several new parameters from existing ones in a single pass
+    and appends them to the data.
+
+    The results and qualifiers of all of the existing parameters that
+    the derivations need are aligned (pivoted) once, by all of the other
+    levels of the index. Each derivation is computed from those columns,
+    and the new rows of all of them are appended to the data at once.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    derivations : list of dicts
+        Each with the keys ``existingparams``, ``newparam``, ``newunits``,
+        ``resfxn``, ``qualfxn`` and, optionally, ``indexMods``, as
+        described for ``combine_parameters``. The new parameters are all
+        computed from the parameters in *df*, so they cannot be used to
+        derive one another.
+    paramlevel : str (default = "parameter")
+    rescol, qualcol : str (default = "res", "qual")
+        Level of the index with the parameter names, and the columns of
+        results and qualifiers.
+
+    Returns
+    -------
+    transformed : pandas.DataFrame
+        *df*, followed by the rows of the new parameters, in the order of
+        *derivations*.
+
+    Examples
+    --------
+    >>> derivations = [
+    ...     dict(
+    ...         existingparams=["Copper, Total", "Zinc, Total"],
+    ...         newparam="Copper + Zinc",
+    ...         newunits="ug/L",
+    ...         resfxn=lambda cu, zn: cu + zn,
+    ...         qualfxn=lambda cu, zn: cu.where(cu == "ND", zn),
+    ...     ),
+    ...     ...
+    ... ]
+    >>> data = derive_parameters(data, derivations)  # doctest: +SKIP
+
+    """
+
+    derivations = [dict(d, existingparams=wqio.validate.at_least_empty_list(d["existingparams"])) for d in derivations]
+    newparams = [d["newparam"] for d in derivations]
+    existingparams = list(dict.fromkeys(p for d in derivations for p in d["existingparams"]))
+    if set(newparams).intersection(existingparams):
+        raise ValueError("new parameters cannot be derived from the other new parameters of the same batch")
+
+    subset = df.loc[_level_isin(df.index, paramlevel, existingparams)]
+    others = [name for name in df.index.names if name != paramlevel]
+
+    # the rows of the different parameters of the same observation share
+    # a key, in the same (sorted) order as the rows of an unstack
+    keys = subset.groupby(level=others, observed=True, dropna=False).ngroup().to_numpy()
+    nkeys = keys.max() + 1 if keys.size else 0
+    first = numpy.empty(nkeys, dtype=numpy.intp)
+    first[keys[::-1]] = numpy.arange(keys.size)[::-1]
+    index = subset.index[first]
+
+    # the wide pivot: results, qualifiers and presence of each parameter
+    results, quals, observed = {}, {}, {}
+    for param in existingparams:
+        mask = _level_isin(subset.index, paramlevel, [param])
+        results[param] = numpy.full(nkeys, numpy.nan)
+        results[param][keys[mask]] = subset[rescol].to_numpy()[mask]
+        quals[param] = numpy.full(nkeys, numpy.nan, dtype=object)
+        quals[param][keys[mask]] = subset[qualcol].to_numpy()[mask]
+        observed[param] = numpy.zeros(nkeys, dtype=bool)
+        observed[param][keys[mask]] = True
+
+    derived = []
+    for derivation in derivations:
+        inputs = derivation["existingparams"]
+        res = derivation["resfxn"](*[pandas.Series(results[p].copy()) for p in inputs])
+        qual = derivation["qualfxn"](*[pandas.Series(quals[p].copy()) for p in inputs])
+        rows = numpy.logical_or.reduce([observed[p] for p in inputs]) if inputs else numpy.zeros(nkeys, dtype=bool)
+        transformed = (
+            pandas.DataFrame({rescol: numpy.asarray(res), qualcol: numpy.asarray(qual)}, index=index)
+            .loc[rows]
+            .dropna(how="all")
+        )
+
+        indexMods = wqio.validate.at_least_empty_dict(derivation.get("indexMods"))
+        indexMods.update({paramlevel: derivation["newparam"], "units": derivation["newunits"]})
+        for levelname, value in indexMods.items():
+            transformed = _set_level_value(transformed, levelname, value)
+        derived.append(transformed)
+
+    if not derived:
+        return df
+    return _append_rows(df, pandas.concat(derived))
+
+
 @wqio.utils.log_df_shape(_logger)
 def paired_qual(df, qualin="qual_inflow", qualout="qual_outflow"):
     ND_neither = [(df[qualin] == "=") & (df[qualout] == "="), "Pair"]
@@ -223,50 +662,121 @@ def paired_qual(df, qualin="qual_inflow", qualout="qual_outflow"):
 
 @wqio.utils.log_df_shape(_logger)
 def _pick_non_null(df, maincol, preferred, secondary):
+    # either parameter may be absent from a subset of the data
+    if (maincol, secondary) not in df.columns:
+        return df[(maincol, preferred)]
+    elif (maincol, preferred) not in df.columns:
+        return df[(maincol, secondary)]
     return df[(maincol, preferred)].combine_first(df[(maincol, secondary)])
 
 
+def _level_isin(index, level, values):
+    # membership of the values of an index level, evaluated on its unique
+    # values and broadcast through the codes (missing values, code -1,
+    # pick the trailing False)
+    position = index.names.index(level)
+    hits = numpy.append(numpy.asarray(index.levels[position].isin(values)), False)
+    return hits[index.codes[position]]
+
+
+def _redefine_index_level(df, level, value, mask, dropold=True):
+    """Vectorized ``wqio.utils.redefine_index_level``: sets *level* to
+    *value* for the rows selected by *mask* by rewriting the codes of the
+    index. The data are only copied for the rows that are duplicated.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    level : str
+        Name of the index level to redefine.
+    value : str
+        The new value of the level.
+    mask : array of bool
+        The rows to redefine.
+    dropold : bool (default = True)
+        Toggles the replacement (True) or addition (False) of the
+        redefined rows.
+
+    Returns
+    -------
+    redefined : pandas.DataFrame
+        Sorted by its index, like the output of
+        ``wqio.utils.redefine_index_level``.
+
+    """
+
+    mask = numpy.asarray(mask, dtype=bool)
+    position = df.index.names.index(level)
+    levels = list(df.index.levels)
+    codes = [numpy.asarray(c) for c in df.index.codes]
+    if value in levels[position]:
+        code = levels[position].get_loc(value)
+    else:
+        code = len(levels[position])
+        levels[position] = levels[position].append(pandas.Index([value]))
+
+    if dropold:
+        codes[position] = numpy.where(mask, code, codes[position])
+        data = df
+    else:
+        codes = [numpy.concatenate([c, c[mask]]) for c in codes]
+        codes[position][df.shape[0] :] = code
+        data = pandas.concat([df, df.loc[mask]], ignore_index=True)
+
+    index = pandas.MultiIndex(levels=levels, codes=codes, names=df.index.names, verify_integrity=False)
+    return data.set_axis(index, axis="index").sort_index()
+
+
+def _replace_level_values(df, level, mapping):
+    """Replaces the values of an index level according to *mapping*
+    (values missing from it are left as-is) by rewriting the level and its
+    codes. Values mapped to the same new value are merged.
+    """
+
+    index = df.index
+    position = index.names.index(level)
+    newvalues = [mapping.get(value, value) for value in index.levels[position]]
+    inverse, uniques = pandas.factorize(numpy.asarray(newvalues, dtype=object))
+
+    oldcodes = index.codes[position]
+    levels = list(index.levels)
+    codes = list(index.codes)
+    levels[position] = pandas.Index(uniques, name=level)
+    codes[position] = numpy.where(oldcodes >= 0, inverse[oldcodes], -1)
+    newindex = pandas.MultiIndex(levels=levels, codes=codes, names=index.names, verify_integrity=False)
+    return df.set_axis(newindex, axis="index")
+
+
+# final station and order of preference of the stations that are kept
+_best_stations = {
+    "outflow": ("outflow", 0),
+    "subsurface": ("outflow", 1),
+    "inflow": ("inflow", 0),
+    "reference outflow": ("inflow", 1),
+}
+_final_stations = sorted(set(final for final, _ in _best_stations.values()))
+
+
 @wqio.utils.log_df_shape(_logger)
 def _pick_best_station(df):
-    def best_col(df, mainstation, backupstation, valcol):
-        for sta in [mainstation, backupstation]:
-            if (sta, valcol) not in df.columns:
-                df = wqio.utils.assign_multilevel_column(df, numpy.nan, sta, valcol)
+    # like the stacked results of the old pivoting implementation
+    valcols = ["qual", "res"]
 
-        return df[(mainstation, valcol)].combine_first(df[(backupstation, valcol)])
+    others = [name for name in df.index.names if name != "station"]
+    station = df.index.get_level_values("station")
+    preference = numpy.asarray(station.map(lambda s: _best_stations.get(s, (None, -1))[1]), dtype=int)
 
-    orig_index = df.index.names
+    # sort by preference so that the first non-null value of every column
+    # within each group comes from the preferred station
+    keep = numpy.flatnonzero(preference >= 0)
+    order = keep[numpy.argsort(preference[keep], kind="stable")]
     data = (
-        df.pipe(utils.refresh_index)
-        .unstack(level="station")
-        .pipe(wqio.utils.swap_column_levels, 0, 1)
-        .pipe(
-            wqio.utils.assign_multilevel_column,
-            lambda df: best_col(df, "outflow", "subsurface", "res"),
-            "final_outflow",
-            "res",
-        )
-        .pipe(
-            wqio.utils.assign_multilevel_column,
-            lambda df: best_col(df, "outflow", "subsurface", "qual"),
-            "final_outflow",
-            "qual",
-        )
-        .pipe(
-            wqio.utils.assign_multilevel_column,
-            lambda df: best_col(df, "inflow", "reference outflow", "res"),
-            "final_inflow",
-            "res",
-        )
-        .pipe(
-            wqio.utils.assign_multilevel_column,
-            lambda df: best_col(df, "inflow", "reference outflow", "qual"),
-            "final_inflow",
-            "qual",
-        )
-        .loc[:, lambda df: df.columns.map(lambda c: "final_" in c[0])]
-        .rename(columns=lambda col: col.replace("final_", ""))
-        .stack(level="station")
+        df.iloc[order]
+        .loc[:, valcols]
+        .pipe(_replace_level_values, "station", {s: final for s, (final, _) in _best_stations.items()})
+        .groupby(level=others + ["station"], observed=True, dropna=False)
+        .first()
+        .dropna(how="all")
     )
 
     return data
@@ -274,27 +784,50 @@ def _pick_best_station(df):
 
 @wqio.utils.log_df_shape(_logger)
 def _pick_best_sampletype(df):
-    orig_cols = df.columns
-    xtab = df.pipe(utils.refresh_index).unstack(level="sampletype")
-    for col in orig_cols:
-        grabvalues = numpy.where(xtab[(col, "composite")].isnull(), xtab[(col, "grab")], numpy.nan)
-        xtab = wqio.utils.assign_multilevel_column(xtab, grabvalues, col, "grab")
+    others = [name for name in df.index.names if name != "sampletype"]
+    data = df.loc[~_level_isin(df.index, "sampletype", ["unknown"])]
+    is_composite = _level_isin(data.index, "sampletype", ["composite"])
+    is_grab = _level_isin(data.index, "sampletype", ["grab"])
 
-    data = xtab.loc[:, xtab.columns.map(lambda c: c[1] != "unknown")].stack(level=["sampletype"])
-    return data
+    # grab values are only kept when there's no composite value for the
+    # same column in the same group
+    groups = data.groupby(level=others, observed=True, dropna=False).ngroup().to_numpy()
+    picked = {}
+    for col in data.columns:
+        has_composite = numpy.zeros(groups.max() + 1 if groups.shape[0] else 0, dtype=bool)
+        has_composite[groups[is_composite & data[col].notnull().to_numpy()]] = True
+        picked[col] = data[col].where(~(is_grab & has_composite[groups]))
+
+    return data.assign(**picked).dropna(how="all").reorder_levels(others + ["sampletype"]).sort_index()
+
+
+def _station_set(df):
+    return sorted(pandas.unique(numpy.asarray(df.index.get_level_values("station"), dtype=object)))
 
 
 @wqio.utils.log_df_shape(_logger)
-def _maybe_filter_onesided_BMPs(df, balanced_only):
+def _maybe_filter_onesided_BMPs(df, balanced_only, all_stations=None):
     grouplevels = ["site", "bmp", "parameter", "category"]
     pivotlevel = "station"
 
     if balanced_only:
+        # keep the BMPs with results at every station, i.e., whose number
+        # of stations with non-null results matches the whole dataset (or
+        # *all_stations*, when *df* is only part of it)
+        if all_stations is None:
+            all_stations = _station_set(df)
+        stations = pandas.Series(numpy.asarray(df.index.get_level_values(pivotlevel), dtype=object), index=df.index)
+        station_count = (
+            stations.where(df["res"].notnull()).groupby(level=grouplevels, observed=True).transform("nunique")
+        )
+
+        # like the stacking of an unstacked dataframe, this drops empty
+        # rows and moves the pivot level last
+        others = [name for name in df.index.names if name != pivotlevel]
         return (
-            df.unstack(level=pivotlevel)
-            .groupby(level=grouplevels)
-            .filter(lambda g: numpy.all(g["res"].describe().loc["count"] > 0))
-            .stack(level=pivotlevel)
+            df.loc[(station_count == len(all_stations)).to_numpy()]
+            .dropna(how="all")
+            .reorder_levels(others + [pivotlevel])
         )
     else:
         return df
@@ -305,36 +838,31 @@ def _filter_by_storm_count(df, minstorms):
     # filter out all monitoring stations with less than /N/ storms
     grouplevels = ["site", "bmp", "parameter", "station"]
 
-    data = df.groupby(level=grouplevels).filter(lambda g: g.count()["res"] >= minstorms)
-    return data
+    storm_count = df["res"].groupby(level=grouplevels, observed=True).transform("count")
+    return df.loc[(storm_count >= minstorms).to_numpy()]
 
 
 @wqio.utils.log_df_shape(_logger)
 def _filter_by_BMP_count(df, minbmps):
     grouplevels = ["category", "parameter", "station"]
 
-    data = df.groupby(level=grouplevels).filter(lambda g: g.index.get_level_values("bmp").unique().shape[0] >= minbmps)
-    return data
+    bmps = pandas.Series(numpy.asarray(df.index.get_level_values("bmp"), dtype=object), index=df.index)
+    bmp_count = bmps.groupby(level=grouplevels, observed=True).transform("nunique")
+    return df.loc[(bmp_count >= minbmps).to_numpy()]
 
 
 @wqio.utils.log_df_shape(_logger)
-def _maybe_combine_WB_RP(df, combine_WB_RP, catlevel="category"):
+def _maybe_combine_WB_RP(df, combine_WB_RP, catlevel="category", validate="full"):
     if combine_WB_RP:
         # merge Wetland Basins and Retention ponds, keeping
         # the original records
-        wbrp_indiv = ["Retention Pond", "Wetland Basin"]
-        wbrp_combo = "Wetland Basin/Retention Pond"
-        level_pos = utils.get_level_position(df, catlevel)
-        return wqio.utils.redefine_index_level(
+        return _redefine_index_level(
             df,
             catlevel,
-            wbrp_combo,
+            _wbrp_combo,
+            _level_isin(df.index, catlevel, _wbrp_indiv),
             dropold=False,
-            criteria=lambda row: row[level_pos] in wbrp_indiv,
-        ).pipe(
-            checks.custom_check,
-            lambda df: df.index.get_level_values(catlevel) == wbrp_combo,
-        )
+        ).pipe(_check_level_values, catlevel, _wbrp_combo, validate=validate)
     else:
         return df
 
@@ -347,44 +875,38 @@ def _maybe_combine_nox(
     rescol="res",
     qualcol="qual",
     finalunits="mg/L",
+    validate="full",
 ):
-    if combine_nox:
-        # combine NO3+NO2 and NO3 into NOx
-        nitro_components = [
-            "Nitrogen, Nitrite (NO2) + Nitrate (NO3) as N",
-            "Nitrogen, Nitrate (NO3) as N",
-        ]
-        nitro_combined = "Nitrogen, NOx as N"
-
-        picker = partial(_pick_non_null, preferred=nitro_components[0], secondary=nitro_components[1])
+    if combine_nox and df.index.get_level_values(paramlevel).isin(_nitro_components).any():
+        # combine NO3+NO2 and NO3 into NOx, preferring NO3+NO2
+        def picker(preferred, secondary):
+            return preferred.combine_first(secondary)
 
-        return transform_parameters(
+        return combine_parameters(
             df,
-            nitro_components,
-            nitro_combined,
+            _nitro_components,
+            _nitro_combined,
             finalunits,
-            partial(picker, maincol=rescol),
-            partial(picker, maincol=qualcol),
-        ).pipe(
-            checks.custom_check,
-            lambda df: df.index.get_level_values(paramlevel) == nitro_combined,
-        )
+            picker,
+            picker,
+            paramlevel=paramlevel,
+            rescol=rescol,
+            qualcol=qualcol,
+        ).pipe(_check_level_values, paramlevel, _nitro_combined, validate=validate)
     else:
         return df
 
 
 @wqio.utils.log_df_shape(_logger)
-def _maybe_fix_PFCs(df, fix_PFCs, catlevel="category", typelevel="bmptype"):
+def _maybe_fix_PFCs(df, fix_PFCs, catlevel="category", typelevel="bmptype", validate="full"):
     if fix_PFCs:
-        PFC = "Permeable Friction Course"
-        type_level_pos = utils.get_level_position(df, typelevel)
-        return wqio.utils.redefine_index_level(
+        return _redefine_index_level(
             df,
             catlevel,
-            PFC,
+            _PFC,
+            _level_isin(df.index, typelevel, ["PF"]),
             dropold=True,
-            criteria=lambda row: row[type_level_pos] == "PF",
-        ).pipe(checks.custom_check, lambda df: df.index.get_level_values(catlevel) == PFC)
+        ).pipe(_check_level_values, catlevel, _PFC, validate=validate)
     else:
         return df
 
@@ -392,7 +914,7 @@ def _maybe_fix_PFCs(df, fix_PFCs, catlevel="category", typelevel="bmptype"):
 @wqio.utils.log_df_shape(_logger)
 def _maybe_remove_grabs(df, remove_grabs, grab_ok_bmps="default"):
     if remove_grabs:
-        if grab_ok_bmps.lower() == "default":
+        if isinstance(grab_ok_bmps, str) and grab_ok_bmps.lower() == "default":
             grab_ok_bmps = [
                 "Retention Pond",
                 "Wetland Basin",
@@ -410,121 +932,1289 @@ def _maybe_remove_grabs(df, remove_grabs, grab_ok_bmps="default"):
     return df
 
 
-def _load_raw_data(csvfile=None):
-    csvfile = Path(csvfile or wqio.download("bmpdata"))
-    return pandas.read_csv(csvfile, parse_dates=["sampledate"], encoding="utf-8")
+@wqio.utils.log_df_shape(_logger)
+def _maybe_compact_columns(df, compact, columns=None):
+    """Encodes the string (object) columns of a dataframe as pandas
+    categoricals.
 
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    compact : bool
+        Toggles the encoding. When False, *df* is returned as-is.
+    columns : list of str, optional
+        The columns to encode. Columns that are missing from *df* or that do
+        not hold strings are skipped. Defaults to ``_row_headers``.
 
-@wqio.utils.log_df_shape(_logger)
-def _clean_raw_data(raw_df, nd_correction=2):
-    _row_headers = [
-        "category",
-        "epazone",
-        "state",
-        "site",
-        "bmp",
-        "station",
-        "storm",
-        "sampletype",
-        "watertype",
-        "paramgroup",
-        "units",
-        "parameter",
-        "fraction",
-        "wq_initialscreen",
-        "ms_indivscreen",
-        "wq_catscreen",
-        "bmptype",
-        "ws_id",
-        "site_id",
-        "bmp_id",
-        "dot_type",
-    ]
+    Returns
+    -------
+    compacted : pandas.DataFrame
 
-    units_norm = {u["unicode"]: info.getNormalization(u["name"]) for u in info.units}
+    """
 
-    target_units = {p["name"].lower(): info.getUnitsFromParam(p["name"], attr="unicode") for p in info.parameters}
+    if not compact:
+        return df
 
-    expected_rows = raw_df.loc[:, "res"].groupby(lambda x: x > 0).count().loc[True]
+    columns = _row_headers if columns is None else columns
+    to_encode = [c for c in columns if c in df.columns and _is_string_dtype(df[c].dtype)]
+    if not to_encode:
+        return df
+    return df.assign(**{c: df[c].astype("category") for c in to_encode})
+
+
+def _is_string_dtype(dtype):
+    return dtype == object or isinstance(dtype, pandas.StringDtype)
 
-    drop_columns = ["ms", "_parameter"]
-    prepped = (
-        raw_df.fillna({"qual": "="})
-        .dropna(subset=["res"])
-        .assign(qual=lambda df: df["qual"].str.strip())
-        .assign(res=lambda df: df["res"] * _handle_ND_factors(df, nd_correction=nd_correction))
-        .assign(qual=lambda df: _handle_ND_qualifiers(df))
-        .assign(wq_initialscreen=lambda df: _process_screening(df, "wq_initialscreen"))
-        .assign(ms_indivscreen=lambda df: _process_screening(df, "ms_indivscreen"))
-        .assign(wq_catscreen=lambda df: _process_screening(df, "wq_catscreen"))
-        .assign(station=lambda df: df["station"].str.lower())
-        .assign(sampletype=lambda df: _process_sampletype(df, "sampletype"))
-        .assign(sampledatetime=lambda df: df.apply(wqio.utils.makeTimestamp, axis=1))
-        .assign(units=lambda df: df["units"].map(lambda u: info.getUnits(u, attr="unicode")))
-        .assign(_parameter=lambda df: df["parameter"].str.lower().str.strip())
-        .assign(fraction=lambda df: numpy.where(df["_parameter"].str.contains("dissolved"), "dissolved", "total"))
-        .pipe(
-            wqio.utils.normalize_units,
-            units_norm,
-            target_units,
-            paramcol="_parameter",
-            rescol="res",
-            unitcol="units",
-            napolicy="raise",
-        )
-        .drop(drop_columns, axis=1)
-        .query("res > 0")
-        .pipe(
-            checks.multi_check,
-            [
-                lambda df: checks.has_no_nans(df, columns=_row_headers),
-                lambda df: checks.has_no_nones(df, columns=_row_headers),
-            ],
-        )
-        .groupby(by=_row_headers)
-        .agg({"res": "mean", "qual": "min", "sampledatetime": "min"})
-        .set_index("sampledatetime", append=True)
-        .pipe(checks.unique_index)
-    )
-    return prepped
+
+def _validate_dtype_backend(dtype_backend):
+    if dtype_backend not in ("numpy", "pyarrow"):
+        raise ValueError("`dtype_backend` must be 'numpy' or 'pyarrow', not {!r}".format(dtype_backend))
+    if dtype_backend == "pyarrow" and cache.pyarrow is None:
+        raise ImportError("pyarrow is required for the 'pyarrow' dtype backend")
+    return dtype_backend
 
 
 @wqio.utils.log_df_shape(_logger)
-def _prepare_for_summary(
-    df,
-    minstorms=3,
-    minbmps=3,
-    combine_nox=True,
-    combine_WB_RP=True,
-    remove_grabs=True,
-    grab_ok_bmps="default",
-    balanced_only=True,
-    fix_PFCs=True,
-    excluded_bmps=None,
-    excluded_params=None,
-):
-    """Prepare data for categorical summaries
+def _maybe_arrow_columns(df, dtype_backend, columns=None):
+    """Stores the string (object) columns of a dataframe as Arrow-backed
+    strings (``string[pyarrow]``).
 
-    Parameter
-    ---------
+    Parameters
+    ----------
     df : pandas.DataFrame
-    minstorms : int (default = 3)
-        Minimum number of storms (monitoring events) for a BMP study to be included
-    minbmps : int (default = 3)
-        Minimum number of BMP studies for a parameter to be included
-    combine_nox : bool (default = True)
-        Toggles combining NO3 and NO2+NO3 into as new parameter NOx, giving
-        preference to NO2+NO3 when both parameters are observed for an event.
-        The underlying assuption is that NO2 concentrations are typically much
-        smaller than NO3, thus NO2+NO3 ~ NO3.
-    combine_WB_RP : bool (default = True)
-        Toggles combining Retention Pond and Wetland Basin data into a new
-        BMP category: Retention Pond/Wetland Basin.
-    remove_grabs : bool (default = True)
-        Toggles removing grab samples from the dataset except for:
-          - biological parameters
-          - BMPs categories that are whitelisted via *grab_ok_bmps*
-    grab_ok_bmps : sequence of str, optional
+    dtype_backend : str
+        "pyarrow" toggles the conversion. With "numpy", *df* is returned
+        as-is.
+    columns : list of str, optional
+        The columns to convert. Columns that are missing from *df* or that
+        do not hold strings are skipped. Defaults to ``_row_headers``.
+
+    Returns
+    -------
+    converted : pandas.DataFrame
+
+    """
+
+    if dtype_backend != "pyarrow":
+        return df
+
+    columns = _row_headers if columns is None else columns
+    to_convert = [c for c in columns if c in df.columns and df[c].dtype == object]
+    if not to_convert:
+        return df
+    return df.astype({c: _arrow_string for c in to_convert})
+
+
+def _set_index_levels(df, levels):
+    # swap out the (unique) level values of the index without touching the
+    # codes or copying the data
+    reindexed = df.copy(deep=False)
+    reindexed.index = df.index.set_levels(levels)
+    return reindexed
+
+
+def _validate_mode(validate):
+    if validate not in _validate_modes:
+        raise ValueError("`validate` must be one of {}, not {!r}".format(", ".join(_validate_modes), validate))
+    return validate
+
+
+def _rows_to_validate(df, validate):
+    # the rows that the checks are run on: all of them, a random (but
+    # reproducible) sample of them, or None to skip the checks
+    if validate == "off":
+        return None
+    if validate == "sample" and df.shape[0] > _validate_sample_size:
+        positions = numpy.random.RandomState(0).choice(df.shape[0], _validate_sample_size, replace=False)
+        return df.iloc[numpy.sort(positions)]
+    return df
+
+
+def _check_unique_index(df, validate="full"):
+    """Same as ``bulwark.checks.has_unique_index``, but works from the
+    codes of the index. ``Index.is_unique`` builds a hash table of the
+    tuples of all the index levels, which is several times larger than
+    the data themselves for the cleaned data. With *validate* "sample",
+    only the duplicates among a sample of the rows are found.
+    """
+
+    rows = _rows_to_validate(df, validate)
+    if rows is None:
+        return df
+
+    duplicated = rows.index.duplicated()
+    if duplicated.any():
+        raise AssertionError(*rows.index[duplicated].unique())
+    return df
+
+
+def _check_no_missing(df, columns, validate="full"):
+    """Same as ``bulwark.checks.has_no_nans`` and
+    ``bulwark.checks.has_no_nones`` together, in a single scan of each
+    column. Unlike their ``isin``, this doesn't copy the columns or
+    convert Arrow-backed strings to python strings. With *validate*
+    "sample", only a sample of the rows is scanned.
+    """
+
+    rows = _rows_to_validate(df, validate)
+    if rows is None:
+        return df
+
+    missing = [column for column in columns if rows[column].isnull().any()]
+    if missing:
+        raise AssertionError("missing values in {}".format(", ".join(missing)))
+    return df
+
+
+def _check_level_values(df, level, value, validate="full"):
+    # the check that the steps that (re)define index values ran (the
+    # equivalent of a bulwark custom_check), on the codes of the index
+    if validate == "off":
+        return df
+    return checks.custom_check(df, lambda df: _level_isin(df.index, level, [value]))
+
+
+def _append_index_level(df, column):
+    """Moves *column* of a dataframe into a new, last level of its
+    MultiIndex. Equivalent to ``df.set_index(column, append=True)``, but
+    the existing levels and codes are reused instead of being rebuilt from
+    full-length arrays of their values.
+    """
+
+    codes, uniques = pandas.factorize(df[column], sort=True)
+    index = pandas.MultiIndex(
+        levels=[*df.index.levels, uniques],
+        codes=[*df.index.codes, codes],
+        names=[*df.index.names, column],
+        verify_integrity=False,
+    )
+    return df.drop(columns=column).set_axis(index, axis="index")
+
+
+@wqio.utils.log_df_shape(_logger)
+def _maybe_compact_index(df, compact):
+    """Encodes the string levels of a dataframe's MultiIndex as pandas
+    categoricals. Only the unique values of each level are touched, so this
+    is cheap even for very large dataframes.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    compact : bool
+        Toggles the encoding. When False, *df* is returned as-is.
+
+    Returns
+    -------
+    compacted : pandas.DataFrame
+
+    See also
+    --------
+    _expand_index
+
+    """
+
+    if not compact or not isinstance(df.index, pandas.MultiIndex):
+        return df
+
+    if not any(_is_string_dtype(lvl.dtype) for lvl in df.index.levels):
+        return df
+
+    levels = [
+        pandas.CategoricalIndex(lvl, name=lvl.name) if _is_string_dtype(lvl.dtype) else lvl
+        for lvl in df.index.levels
+    ]
+    return _set_index_levels(df, levels)
+
+
+@wqio.utils.log_df_shape(_logger)
+def _maybe_arrow_index(df, dtype_backend):
+    """Stores the string levels of a dataframe's MultiIndex as Arrow-backed
+    strings. Like ``_maybe_compact_index``, only the unique values of each
+    level are converted.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    dtype_backend : str
+        "pyarrow" toggles the conversion. With "numpy", *df* is returned
+        as-is.
+
+    Returns
+    -------
+    converted : pandas.DataFrame
+
+    See also
+    --------
+    _expand_index
+
+    """
+
+    if dtype_backend != "pyarrow" or not isinstance(df.index, pandas.MultiIndex):
+        return df
+
+    if not any(lvl.dtype == object for lvl in df.index.levels):
+        return df
+
+    levels = [
+        pandas.Index(lvl, dtype=_arrow_string, name=lvl.name) if lvl.dtype == object else lvl
+        for lvl in df.index.levels
+    ]
+    return _set_index_levels(df, levels)
+
+
+def _expand_index(df):
+    """Reverts the categorical and Arrow-backed index levels created by
+    ``_maybe_compact_index`` and ``_maybe_arrow_index`` back to plain
+    object levels.
+    """
+
+    if not isinstance(df.index, pandas.MultiIndex):
+        return df
+
+    def _encoded(lvl):
+        return isinstance(lvl, pandas.CategoricalIndex) or isinstance(lvl.dtype, pandas.StringDtype)
+
+    if not any(_encoded(lvl) for lvl in df.index.levels):
+        return df
+
+    levels = [
+        pandas.Index(numpy.asarray(lvl, dtype=object), dtype=object, name=lvl.name) if _encoded(lvl) else lvl
+        for lvl in df.index.levels
+    ]
+    return _set_index_levels(df, levels)
+
+
+def _raw_columns(columns=None):
+    """The columns of the raw data that are parsed.
+
+    Parameters
+    ----------
+    columns : sequence of str, optional
+        The optional row headers to keep (e.g., "state" or "epazone"), in
+        addition to ``_required_row_headers``. All of them by default.
+
+    Returns
+    -------
+    usecols : list of str
+
+    """
+
+    if columns is None:
+        columns = _row_headers
+    else:
+        columns = wqio.validate.at_least_empty_list(columns)
+        unknown = sorted(set(columns) - set(_row_headers))
+        if unknown:
+            raise ValueError("{} are not row headers of the data".format(unknown))
+
+    # fraction is always derived from the parameter name
+    headers = [h for h in _row_headers if (h in _required_row_headers or h in columns) and h != "fraction"]
+    return headers + _raw_value_columns
+
+
+def _select_rows(df, filters):
+    """Selects the rows of a dataframe that match *filters*.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    filters : list of lists of tuples, optional
+        In the disjunctive normal form of the *filters* of
+        ``pyarrow.parquet.read_table``: a row is selected when it matches
+        all of the ``(column, op, values)`` conditions of any of the inner
+        lists. Only the "in" and "not in" operators are supported. Columns
+        are looked up among the columns of *df*, then among the levels of
+        its index. When None, *df* is returned as-is.
+
+    Returns
+    -------
+    selected : pandas.DataFrame
+
+    """
+
+    if filters is None:
+        return df
+
+    keep = numpy.zeros(df.shape[0], dtype=bool)
+    for conjunction in filters:
+        match = numpy.ones(df.shape[0], dtype=bool)
+        for column, op, values in conjunction:
+            data = df[column] if column in df.columns else df.index.get_level_values(column)
+            isin = numpy.asarray(data.isin(values))
+            match &= isin if op == "in" else ~isin
+        keep |= match
+    return df.loc[keep]
+
+
+def _filter_chunks(reader, filters, dtype_backend="numpy"):
+    with reader:
+        for chunk in reader:
+            yield _select_rows(chunk, filters).pipe(_maybe_arrow_columns, dtype_backend)
+
+
+def _load_raw_data(csvfile=None, chunksize=None, columns=None, filters=None, dtype_backend="numpy"):
+    """Reads the raw data CSV. When *chunksize* is provided, an iterator
+    of dataframes with at most that many rows each is returned instead of
+    a single dataframe.
+
+    Only the columns that are cleaned are parsed (see ``_raw_columns``
+    for *columns*). When *filters* are provided (see ``_select_rows``),
+    the CSV is read in chunks and only the matching rows of each chunk
+    are kept. With the "pyarrow" *dtype_backend*, the CSV is also read in
+    chunks and the string row headers of each chunk are converted to
+    Arrow-backed strings, so the object strings of the whole CSV are
+    never held at once.
+    """
+    csvfile = Path(csvfile or wqio.download("bmpdata"))
+    options = dict(parse_dates=["sampledate"], encoding="utf-8", usecols=_raw_columns(columns))
+    if filters is not None or dtype_backend == "pyarrow":
+        options["chunksize"] = chunksize or _filter_chunksize
+        chunks = _filter_chunks(pandas.read_csv(csvfile, **options), filters, dtype_backend)
+        if chunksize is not None:
+            return chunks
+        return pandas.concat(chunks, ignore_index=True)
+
+    if chunksize is not None:
+        options["chunksize"] = chunksize
+    return pandas.read_csv(csvfile, **options)
+
+
+def _default_sql(table):
+    sqlfile = Path(resource_filename("pybmpdb.data", "default.sql"))
+    return sqlfile.read_text().format(table)
+
+
+def _conform_sql_batch(batch, columns=None):
+    # renames and converts the columns fetched with default.sql to match
+    # those of the CSV export
+    usecols = _raw_columns(columns)
+    batch = batch.rename(columns=_sql_column_names)
+    if "dot_type" in usecols and "dot_type" not in batch.columns:
+        batch = batch.assign(dot_type="Not Applicable")
+    return batch.loc[:, usecols].assign(
+        res=lambda df: pandas.to_numeric(df["res"]),
+        DL=lambda df: pandas.to_numeric(df["DL"]),
+        sampledate=lambda df: pandas.to_datetime(df["sampledate"], errors="coerce"),
+    )
+
+
+def _fetch_batches(connection, query, batchsize):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query)
+        names = [description[0] for description in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batchsize)
+            if not rows:
+                break
+            yield pandas.DataFrame.from_records(rows, columns=names)
+    finally:
+        cursor.close()
+
+
+def _sql_batches(connection, query, batchsize, columns=None, filters=None, dtype_backend="numpy"):
+    with closing(_fetch_batches(connection, query, batchsize)) as batches:
+        for batch in batches:
+            yield _select_rows(_conform_sql_batch(batch, columns), filters).pipe(_maybe_arrow_columns, dtype_backend)
+
+
+def _load_raw_sql(connection, table, chunksize=None, columns=None, filters=None, dtype_backend="numpy"):
+    """Reads the raw data from a table of the BMP Database with the query
+    in ``pybmpdb/data/default.sql``, without going through a CSV export.
+
+    Parameters
+    ----------
+    connection : DB-API connection
+        Connection to the database, e.g., from ``pyodbc.connect`` for the
+        MS Access database or ``sqlite3.connect``.
+    table : str
+        Name of the table with the data.
+    chunksize : int, optional
+        When provided, an iterator of dataframes with at most that many
+        rows each is returned instead of a single dataframe.
+    columns, filters, dtype_backend : optional
+        See ``_load_raw_data``.
+
+    Returns
+    -------
+    raw : pandas.DataFrame or iterator of pandas.DataFrame
+        With the same columns as ``_load_raw_data``. The rows are fetched
+        with ``cursor.fetchmany`` in batches of *chunksize* (or
+        ``_fetch_size``) rows, and each batch is converted on its own.
+
+    """
+
+    batches = _sql_batches(connection, _default_sql(table), chunksize or _fetch_size, columns, filters, dtype_backend)
+    if chunksize is not None:
+        return batches
+
+    frames = list(batches)
+    if not frames:
+        return pandas.DataFrame(columns=_raw_columns(columns)).pipe(_maybe_arrow_columns, dtype_backend)
+    return pandas.concat(frames, ignore_index=True)
+
+
+@wqio.utils.log_df_shape(_logger)
+def _clean_raw_rows(raw_df, nd_correction=2, compact=False, dtype_backend="numpy", validate="full"):
+    """Applies the row-local cleaning steps to the raw data: non-detect
+    handling, screening and sample type flags, timestamps, and unit
+    normalization. Every row is processed independently of the others, so
+    this can be applied to the raw data in pieces.
+
+    Parameters
+    ----------
+    raw_df : pandas.DataFrame
+        The raw data (or a chunk of them) as loaded by ``_load_raw_data``.
+    nd_correction : float, optional (default = 2.0)
+        The factor by which non-detect results will be multiplied.
+    compact : bool (default = False)
+        Toggles storing the string row headers as pandas categoricals.
+    dtype_backend : str (default = "numpy")
+        With "pyarrow", the string row headers are stored as Arrow-backed
+        strings (the categories of the categoricals, with *compact*).
+    validate : str (default = "full")
+        Checks that none of the row headers are missing in all ("full") or
+        a sample ("sample") of the rows, or not at all ("off").
+
+    Returns
+    -------
+    rows : pandas.DataFrame
+        The cleaned rows, with the ``_row_headers`` still as columns. The
+        optional row headers that are missing from *raw_df* are left out.
+
+    """
+
+    units_norm = {u["unicode"]: info.getNormalization(u["name"]) for u in info.units}
+
+    target_units = {p["name"].lower(): info.getUnitsFromParam(p["name"], attr="unicode") for p in info.parameters}
+
+    # the optional row headers may have been left out of the raw data
+    headers = [h for h in _row_headers if h in raw_df.columns or h == "fraction"]
+    screening = {h: partial(_process_screening, screencol=h) for h in _screening_headers if h in headers}
+    drop_columns = ["ms", "_parameter"]
+    passthrough_headers = [h for h in headers if h not in _derived_row_headers]
+    return (
+        raw_df.pipe(_maybe_arrow_columns, dtype_backend, passthrough_headers)
+        .pipe(_maybe_compact_columns, compact, passthrough_headers)
+        .fillna({"qual": "="})
+        .dropna(subset=["res"])
+        .assign(qual=lambda df: df["qual"].str.strip())
+        .pipe(_apply_ND_handling, nd_correction=nd_correction)
+        .assign(**screening)
+        .assign(station=lambda df: df["station"].str.lower())
+        .assign(sampletype=lambda df: _process_sampletype(df, "sampletype"))
+        .assign(sampledatetime=lambda df: _make_timestamps(df, "sampledate", "sampletime"))
+        .assign(units=lambda df: info.mapUnits(df["units"], attr="unicode"))
+        .assign(_parameter=lambda df: df["parameter"].str.lower().str.strip())
+        .assign(fraction=lambda df: numpy.where(_str_contains(df["_parameter"], "dissolved"), "dissolved", "total"))
+        .pipe(
+            wqio.utils.normalize_units,
+            units_norm,
+            target_units,
+            paramcol="_parameter",
+            rescol="res",
+            unitcol="units",
+            napolicy="raise",
+        )
+        .drop(drop_columns, axis=1, errors="ignore")
+        .query("res > 0")
+        .pipe(_maybe_arrow_columns, dtype_backend, _derived_row_headers)
+        .pipe(_maybe_compact_columns, compact, _derived_row_headers)
+        .pipe(_check_no_missing, headers, validate=validate)
+    )
+
+
+def _partition_by_site(raw_df, npartitions):
+    """Splits the raw data into at most *npartitions* dataframes of
+    roughly equal size without splitting up the data of any site. Sites
+    are assigned largest first to the partition with the fewest rows.
+    """
+
+    # missing sites (code -1) are shifted to code 0 and kept together
+    codes = pandas.factorize(raw_df["site"])[0] + 1
+    sizes = numpy.bincount(codes)
+
+    loads = numpy.zeros(npartitions, dtype=int)
+    assignments = numpy.zeros_like(sizes)
+    for code in numpy.argsort(-sizes, kind="stable"):
+        if sizes[code] > 0:
+            assignments[code] = loads.argmin()
+            loads[assignments[code]] += sizes[code]
+
+    partitions = assignments[codes]
+    return [raw_df.loc[partitions == n] for n in range(npartitions) if loads[n] > 0]
+
+
+@wqio.utils.log_df_shape(_logger)
+def _clean_raw_data(raw_df, nd_correction=2, compact=False, n_jobs=None, dtype_backend="numpy", validate="full"):
+    """Cleans up the raw data from the BMP Database and indexes each
+    observation by ``_row_headers`` and ``sampledatetime``.
+
+    Parameters
+    ----------
+    raw_df : pandas.DataFrame
+        The raw data as loaded by ``_load_raw_data``.
+    nd_correction : float, optional (default = 2.0)
+        The factor by which non-detect results will be multiplied.
+    compact : bool (default = False)
+        When True, the string columns that become index levels are stored as
+        pandas categoricals from the start, which reduces memory use and
+        speeds up the grouping.
+    n_jobs : int, optional
+        Number of worker processes across which the data are cleaned. The
+        raw data are partitioned by site and each partition is cleaned in
+        its own process. None or 1 cleans everything in the current
+        process, -1 uses all CPUs. The result is identical either way.
+    dtype_backend : str (default = "numpy")
+        With "pyarrow", the string row headers are stored as Arrow-backed
+        strings (``string[pyarrow]``) throughout, and so are the string
+        levels of the index of the result.
+    validate : str (default = "full")
+        How much of the data are checked for missing row headers and
+        duplicate observations: "full" checks all of the rows, "sample"
+        checks a random sample of ``_validate_sample_size`` rows (which
+        catches systematic problems only), and "off" skips the checks.
+
+    Returns
+    -------
+    cleaned : pandas.DataFrame
+
+    See also
+    --------
+    _clean_raw_chunks
+
+    """
+
+    workers = utils.n_workers(n_jobs)
+    partitions = _partition_by_site(raw_df, workers) if workers > 1 else [raw_df]
+    if len(partitions) > 1:
+        with ProcessPoolExecutor(max_workers=len(partitions)) as pool:
+            # none of the steps group across sites, so the partitions can
+            # be cleaned independently and stitched back together
+            clean = partial(
+                _clean_raw_data, nd_correction=nd_correction, dtype_backend=dtype_backend, validate=validate
+            )
+            cleaned = list(pool.map(clean, partitions))
+
+        return (
+            pandas.concat(cleaned)
+            .sort_index()
+            .pipe(_check_unique_index, validate=validate)
+            .pipe(_maybe_arrow_index, dtype_backend)
+            .pipe(_maybe_compact_index, compact)
+        )
+
+    rows = _clean_raw_rows(
+        raw_df, nd_correction=nd_correction, compact=compact, dtype_backend=dtype_backend, validate=validate
+    )
+    prepped = (
+        rows.assign(qual=lambda df: _encode_qualifiers(df["qual"]))
+        .groupby(by=_present_headers(rows), observed=True)
+        .agg({"res": "mean", "qual": "min", "sampledatetime": "min"})
+        .assign(qual=lambda df: _decode_qualifiers(df["qual"]))
+    )
+
+    if compact:
+        # grouping by several categoricals with observed=True keeps the
+        # groups in order of appearance instead of sorting them
+        prepped = prepped.sort_index()
+
+    return prepped.pipe(_append_index_level, "sampledatetime").pipe(_check_unique_index, validate=validate)
+
+
+def _present_headers(df):
+    return [h for h in _row_headers if h in df.columns]
+
+
+def _encode_qualifiers(quals):
+    # the cleaned qualifiers are either "=" or "ND", so the minimum qualifier
+    # of a group is the minimum of a non-detect flag. Unlike the minimum of
+    # strings, this doesn't fall back to a python loop over the groups.
+    return (quals != "=").astype("int8")
+
+
+def _decode_qualifiers(flags):
+    return numpy.where(flags > 0, "ND", "=")
+
+
+def _partial_aggregate(rows):
+    # reduces cleaned rows to per-observation partial aggregates that can
+    # be merged across chunks (the mean is carried as a sum and a count)
+    return (
+        rows.assign(qual=lambda df: _encode_qualifiers(df["qual"]))
+        .groupby(by=_present_headers(rows), observed=True)
+        .agg(
+            res_sum=("res", "sum"),
+            res_count=("res", "count"),
+            qual=("qual", "min"),
+            sampledatetime=("sampledatetime", "min"),
+        )
+    )
+
+
+def _merge_partial_aggregates(partials):
+    return (
+        pandas.concat(partials)
+        .groupby(level=list(partials[0].index.names))
+        .agg({"res_sum": "sum", "res_count": "sum", "qual": "min", "sampledatetime": "min"})
+    )
+
+
+def _clean_raw_chunks(chunks, nd_correction=2, compact=False, merge_every=8, dtype_backend="numpy", validate="full"):
+    """Cleans the raw data from the BMP Database one chunk at a time.
+
+    The row-local steps (``_clean_raw_rows``) are applied to each chunk,
+    which is then immediately reduced to partial aggregates of the
+    duplicate observations. The partial aggregates are merged into the
+    final result, so the full raw data never need to be held in memory.
+
+    Parameters
+    ----------
+    chunks : iterable of pandas.DataFrame
+        The raw data, e.g., as loaded by ``_load_raw_data`` with a
+        *chunksize*.
+    nd_correction : float, optional (default = 2.0)
+        The factor by which non-detect results will be multiplied.
+    compact : bool (default = False)
+        Toggles storing the string index levels as pandas categoricals.
+    merge_every : int (default = 8)
+        Number of chunks after which the partial aggregates accumulated so
+        far are merged together.
+    dtype_backend : str (default = "numpy")
+        With "pyarrow", the string row headers and index levels are stored
+        as Arrow-backed strings.
+    validate : str (default = "full")
+        See ``_clean_raw_data``.
+
+    Returns
+    -------
+    cleaned : pandas.DataFrame
+        Same as the output of ``_clean_raw_data`` for the full raw data.
+
+    """
+
+    partials = []
+    nrows = 0
+    for chunk in chunks:
+        nrows += chunk.shape[0]
+        # categories differ from one chunk to the next, so the chunks are
+        # cleaned as plain strings and the result is encoded at the end
+        rows = _clean_raw_rows(chunk, nd_correction=nd_correction, dtype_backend=dtype_backend, validate=validate)
+        partials.append(_partial_aggregate(rows))
+        if len(partials) >= merge_every:
+            partials = [_merge_partial_aggregates(partials)]
+
+    cleaned = (
+        _merge_partial_aggregates(partials)
+        .assign(res=lambda df: df["res_sum"] / df["res_count"])
+        .assign(qual=lambda df: _decode_qualifiers(df["qual"]))
+        .loc[:, ["res", "qual", "sampledatetime"]]
+        .pipe(_append_index_level, "sampledatetime")
+        .pipe(_check_unique_index, validate=validate)
+        .pipe(_maybe_arrow_index, dtype_backend)
+        .pipe(_maybe_compact_index, compact)
+    )
+    _logger.debug("_clean_raw_chunks: {} raw rows -> dataframe shape = {}".format(nrows, cleaned.shape))
+    return cleaned
+
+
+class LoadOptions(object):
+    """How ``load_data`` reads, caches, and processes the data. These
+    options trade memory, disk space, and processes for speed, but do not
+    change which data are prepared.
+
+    Parameters
+    ----------
+    cachedir : Path-like, optional
+        Folder in which the cleaned data are cached as Parquet files
+        (requires pyarrow). Cached data are reused as long as the raw CSV,
+        *nd_correction*, and the units and parameter tables are unchanged.
+        Use ``pybmpdb.cache.invalidate`` to clear the cache explicitly.
+    incremental : bool (default = False)
+        When True, snapshots of the raw, cleaned and prepared data are
+        kept in *cachedir* (required). On the next call, only the storms
+        of the BMP studies (bmp_id, site_id, storm) that were added or
+        modified in the raw CSV are cleaned again, and only the parameters
+        that they affect are prepared again. The result is the same as a
+        full rebuild, but sorted by its index. Cannot be combined with
+        *chunksize* or the *columns* of ``load_data``.
+    memoize : bool (default = False)
+        When True, the cleaned data of each source file are kept in memory
+        and reused by the next calls with the same source file, and
+        *nd_correction*, *compact*, and *columns* options. The prepared
+        data are kept in memory for each set of options, so a call with
+        the same options as a previous one skips the cleaning and the
+        preparation. Each call gets its own copy of the prepared data (and
+        a new DataCollection of it), so changing the result of one call
+        does not affect the next ones. The sizes of these caches can be
+        changed through ``pybmpdb.cache.cleaned_memo`` and
+        ``pybmpdb.cache.result_memo``. See ``pybmpdb.cache.memo_stats``
+        and ``pybmpdb.cache.clear_memo``. A source file is considered
+        changed when its size or modification time change.
+    connection : DB-API connection, optional
+        Connection to the BMP Database (e.g., ``pyodbc.connect`` with the
+        MS Access driver). When provided, the raw data are queried from
+        *table* with ``pybmpdb/data/default.sql`` and fetched in batches
+        (of *chunksize* rows, if provided) straight into the cleaning
+        steps, instead of being read from a CSV. Cannot be combined with
+        *cachedir*, *incremental*, or *memoize*, which rely on the
+        modification time of a CSV file.
+    table : str, optional
+        Name of the table with the data, required with *connection*.
+    chunksize : int, optional
+        When provided, the raw CSV is streamed in chunks of this many rows.
+        Each chunk is cleaned and reduced on its own before the chunks are
+        merged, so that the peak memory use while cleaning is bounded by
+        the chunk size instead of the size of the full CSV. The result is
+        the same as without *chunksize*.
+    n_jobs : int, optional
+        Number of worker processes used to clean the raw data. The data
+        are partitioned by site and the partitions are cleaned in
+        parallel. None or 1 disables the parallelism and -1 uses all
+        CPUs. The result is the same as the serial one. Cannot be combined
+        with *chunksize*.
+    compact : bool (default = False)
+        When True, the string index levels of the data (category, site,
+        bmp, parameter, etc) are stored as pandas categoricals while the
+        data are cleaned and prepared, which reduces memory use and speeds
+        up the grouping and reshaping. They are converted back to plain
+        strings before the data are passed to wqio.DataCollection.
+    dtype_backend : str (default = "numpy")
+        With "pyarrow" (requires pyarrow), the string columns are stored
+        as Arrow-backed strings (``string[pyarrow]``) from the moment they
+        are read, through the cleaning and the preparation of the data,
+        which takes a fraction of the memory of python strings. With
+        *compact*, the categoricals hold Arrow-backed categories. The
+        index is only converted back to python strings for
+        wqio.DataCollection, so with *as_dataframe*, the dataframe keeps
+        the Arrow-backed index levels.
+    validate : str (default = "full")
+        How thoroughly the data are checked as they are cleaned and
+        prepared: "full" checks all of the rows for missing row headers
+        and duplicate observations, "sample" only checks a random sample
+        of them, which catches systematic problems at a fraction of the
+        cost, and "off" skips the checks, e.g., for trusted inputs. The
+        cleaned data read from *cachedir* or kept by *memoize* were
+        checked when they were first cleaned.
+
+    Examples
+    --------
+    >>> options = LoadOptions(cachedir="bmpcache", compact=True)
+    >>> bmp = load_data("bmpdata.csv", options=options)  # doctest: +SKIP
+
+    """
+
+    def __init__(
+        self,
+        cachedir=None,
+        incremental=False,
+        memoize=False,
+        connection=None,
+        table=None,
+        chunksize=None,
+        n_jobs=None,
+        compact=False,
+        dtype_backend="numpy",
+        validate="full",
+    ):
+        self.cachedir = cachedir
+        self.incremental = incremental
+        self.memoize = memoize
+        self.connection = connection
+        self.table = table
+        self.chunksize = chunksize
+        self.n_jobs = n_jobs
+        self.compact = compact
+        self.dtype_backend = _validate_dtype_backend(dtype_backend)
+        self.validate = _validate_mode(validate)
+
+        if chunksize is not None and utils.n_workers(n_jobs) > 1:
+            raise ValueError("`chunksize` and `n_jobs` cannot be used together")
+        if connection is not None:
+            if table is None:
+                raise ValueError("`connection` requires a `table`")
+            if cachedir is not None or incremental or memoize:
+                raise ValueError("`connection` cannot be used with `cachedir`, `incremental`, or `memoize`")
+        if incremental:
+            if cachedir is None:
+                raise ValueError("`incremental` requires a `cachedir`")
+            if chunksize is not None:
+                raise ValueError("`chunksize` and `incremental` cannot be used together")
+
+
+def _load_cleaned_data(datapath=None, nd_correction=2, columns=None, filters=None, options=None):
+    """Load and clean the raw data, optionally through the on-disk cache.
+
+    Parameters
+    ----------
+    datapath : Path-like, optional
+        Path to the raw data CSV. If not provided, the latest data will be
+        downloaded.
+    nd_correction : float, optional (default = 2.0)
+        The factor by which non-detect results will be multiplied.
+    columns : sequence of str, optional
+        The optional row headers to keep (see ``_raw_columns``). The others
+        are not parsed from the CSV.
+    filters : list of lists of tuples, optional
+        Only the rows matching these filters are cleaned (see
+        ``_select_rows``). Without a cache directory, the other rows are
+        dropped as the CSV is read. With one, all of the rows are cleaned
+        and cached the first time, and only the matching rows of the
+        cache are read afterwards.
+    options : LoadOptions, optional
+        How the data are read and cleaned. Of these options:
+
+          - with a *cachedir*, the cleaned data are read from the cache if
+            the raw CSV, *nd_correction*, and the units and parameter
+            tables are unchanged since they were cached. Otherwise they
+            are cleaned and written to the cache.
+          - with a *chunksize*, the raw data are read and cleaned this
+            many rows at a time (see ``_clean_raw_chunks``).
+          - with a *connection*, the raw data are read from its *table*
+            instead of from a CSV (see ``_load_raw_sql``).
+          - data read from the cache are not checked (*validate*) again.
+
+        *incremental* and *memoize* are handled by ``load_data``.
+
+    Returns
+    -------
+    cleaned : pandas.DataFrame
+
+    """
+
+    if options is None:
+        options = LoadOptions()
+
+    reading = dict(columns=columns, dtype_backend=options.dtype_backend)
+    cleaning = dict(
+        nd_correction=nd_correction,
+        compact=options.compact,
+        dtype_backend=options.dtype_backend,
+        validate=options.validate,
+    )
+
+    def _load(datapath, chunksize, filters):
+        if options.connection is not None:
+            return _load_raw_sql(options.connection, options.table, chunksize=chunksize, filters=filters, **reading)
+        return _load_raw_data(datapath, chunksize=chunksize, filters=filters, **reading)
+
+    def _clean(datapath, filters):
+        if options.chunksize is None:
+            return _load(datapath, None, filters).pipe(_clean_raw_data, n_jobs=options.n_jobs, **cleaning)
+        chunks = _load(datapath, options.chunksize, filters)
+        with closing(chunks):
+            return _clean_raw_chunks(chunks, **cleaning)
+
+    cachedir = options.cachedir
+    if cachedir is None:
+        return _clean(datapath, filters)
+
+    if cache.pyarrow is None:
+        _logger.warning("pyarrow is not installed, so the cleaned data will not be cached")
+        return _clean(datapath, filters)
+
+    datapath = Path(datapath or wqio.download("bmpdata"))
+    headers = None if columns is None else _raw_columns(columns)
+    key = cache.cache_key(datapath, nd_correction=nd_correction, columns=headers)
+    cleaned = cache.read_cleaned(cachedir, key, filters=filters)
+    if cleaned is not None:
+        _logger.info("cleaned data cache hit for {} ({})".format(datapath, key))
+        # the cache may have been written with or without *compact* or
+        # Arrow-backed strings
+        if options.compact and options.dtype_backend == "numpy":
+            return _maybe_compact_index(cleaned, options.compact)
+        return (
+            _expand_index(cleaned)
+            .pipe(_maybe_arrow_index, options.dtype_backend)
+            .pipe(_maybe_compact_index, options.compact)
+        )
+
+    _logger.info("cleaned data cache miss for {} ({})".format(datapath, key))
+    cleaned = _clean(datapath, None)
+    cache.write_cleaned(cleaned, cachedir, key)
+    return _select_rows(cleaned, filters)
+
+
+_PlanStep = namedtuple("_PlanStep", ["name", "function", "kwargs", "description"])
+
+
+def _describe_filters(filters):
+    conjunctions = [" & ".join("{} {} {}".format(*condition) for condition in conj) for conj in filters]
+    if len(conjunctions) == 1:
+        return conjunctions[0]
+    return " | ".join("({})".format(conj) for conj in conjunctions)
+
+
+def _filter_step(name, filters):
+    return _PlanStep(name, _select_rows, dict(filters=filters), "{} rows: {}".format(name, _describe_filters(filters)))
+
+
+class SummaryPlan(object):
+    """Lazy plan of the steps that prepare the cleaned data for summaries.
+
+    The plan records the options of ``_prepare_for_summary`` (and of
+    ``load_data``) and only decides on the steps and their order when
+    they are first needed. The row filters are moved ahead of the
+    reshaping steps where that does not change the result:
+
+      - the excluded BMPs, the excluded parameters other than NOx and its
+        components, and the selected parameters, categories, and parameter
+        groups are applied in a single filter before anything else (see
+        ``row_filters``).
+      - grab samples are removed after the categories are redefined but
+        before NOx is computed (NOx results inherit the sample type of
+        the results they are computed from).
+      - the parameters that NOx depends on are excluded right after NOx
+        is computed.
+
+    Steps that would not do anything for the given options (or the
+    selected parameters and categories) are left out.
+
+    The BMP studies kept with *balanced_only* are those with results at
+    every station of the whole dataset. A selection can leave out all of
+    the results of a station (e.g., parameters only monitored at the
+    inflow of BMPs), in which case the stations are taken from the
+    complete data prepared without the selection. So the selection never
+    changes which BMP studies are balanced.
+
+    Parameters
+    ----------
+    minstorms, minbmps, combine_nox, combine_WB_RP, remove_grabs, grab_ok_bmps,
+    balanced_only, fix_PFCs, excluded_bmps, excluded_params, compact, dtype_backend,
+    validate
+        See ``_prepare_for_summary``.
+    parameters, categories, paramgroups : sequence of str, optional
+        When provided, only these parameters, BMP categories, and parameter
+        groups are prepared. The result is the same as selecting them from
+        the fully prepared data.
+
+    Examples
+    --------
+    >>> plan = SummaryPlan(parameters=["Lead, Total"], categories=["Bioretention"])
+    >>> print(plan.explain())  # doctest: +SKIP
+    >>> prepared = plan.execute(cleaned)  # doctest: +SKIP
+
+    """
+
+    def __init__(
+        self,
+        minstorms=3,
+        minbmps=3,
+        combine_nox=True,
+        combine_WB_RP=True,
+        remove_grabs=True,
+        grab_ok_bmps="default",
+        balanced_only=True,
+        fix_PFCs=True,
+        excluded_bmps=None,
+        excluded_params=None,
+        parameters=None,
+        categories=None,
+        paramgroups=None,
+        compact=False,
+        dtype_backend="numpy",
+        validate="full",
+    ):
+        self.options = dict(
+            minstorms=minstorms,
+            minbmps=minbmps,
+            combine_nox=combine_nox,
+            combine_WB_RP=combine_WB_RP,
+            remove_grabs=remove_grabs,
+            grab_ok_bmps=grab_ok_bmps,
+            balanced_only=balanced_only,
+            fix_PFCs=fix_PFCs,
+            excluded_bmps=excluded_bmps,
+            excluded_params=excluded_params,
+            parameters=parameters,
+            categories=categories,
+            paramgroups=paramgroups,
+            compact=compact,
+            dtype_backend=dtype_backend,
+            validate=validate,
+        )
+        self._steps = None
+        self.stations = None
+
+    @property
+    def steps(self):
+        if self._steps is None:
+            self._steps = self._make_steps()
+        return self._steps
+
+    def _needed_rows(self):
+        # the parameters and categories of the cleaned data that can
+        # contribute to the selected ones (None when all of them can)
+        opts = self.options
+        needed_params, needed_cats = None, None
+        if opts["parameters"] is not None:
+            needed_params = wqio.validate.at_least_empty_list(opts["parameters"])
+            if _nitro_combined in needed_params and opts["combine_nox"]:
+                needed_params = needed_params + _nitro_components
+        if opts["categories"] is not None:
+            needed_cats = wqio.validate.at_least_empty_list(opts["categories"])
+            if _wbrp_combo in needed_cats and opts["combine_WB_RP"]:
+                needed_cats = needed_cats + _wbrp_indiv
+        return needed_params, needed_cats
+
+    def row_filters(self):
+        """The filters of the rows of the cleaned (or raw) data that can
+        affect the result of the plan. The plan applies them first, and
+        they can be pushed down into the readers of the data.
+
+        Returns
+        -------
+        filters : list of lists of tuples or None
+            See ``_select_rows``.
+
+        """
+
+        opts = self.options
+        nox_family = [_nitro_combined] + _nitro_components if opts["combine_nox"] else []
+        excluded_bmps = wqio.validate.at_least_empty_list(opts["excluded_bmps"])
+        excluded_params = wqio.validate.at_least_empty_list(opts["excluded_params"])
+        early_excluded = [p for p in excluded_params if p not in nox_family]
+        needed_params, needed_cats = self._needed_rows()
+
+        conditions = []
+        if excluded_bmps:
+            conditions.append(("bmp", "not in", excluded_bmps))
+        if early_excluded:
+            conditions.append(("parameter", "not in", early_excluded))
+        if needed_params is not None:
+            conditions.append(("parameter", "in", needed_params))
+        if opts["paramgroups"] is not None:
+            conditions.append(("paramgroup", "in", wqio.validate.at_least_empty_list(opts["paramgroups"])))
+
+        if needed_cats is None:
+            filters = [conditions]
+        else:
+            filters = [conditions + [("category", "in", needed_cats)]]
+            if _PFC in needed_cats and opts["fix_PFCs"]:
+                # PF BMPs of any category become Permeable Friction Courses
+                filters.append(conditions + [("bmptype", "in", ["PF"])])
+
+        return filters if any(filters) else None
+
+    def _make_steps(self):
+        opts = self.options
+        nox_family = [_nitro_combined] + _nitro_components if opts["combine_nox"] else []
+        excluded_params = wqio.validate.at_least_empty_list(opts["excluded_params"])
+        late_excluded = [p for p in excluded_params if p in nox_family]
+        needed_params, needed_cats = self._needed_rows()
+        filters = self.row_filters()
+
+        steps = []
+        if filters is not None:
+            steps.append(_filter_step("filter", filters))
+        if opts["combine_WB_RP"] and (needed_cats is None or set(_wbrp_indiv).intersection(needed_cats)):
+            steps.append(
+                _PlanStep(
+                    "combine_WB_RP",
+                    _maybe_combine_WB_RP,
+                    dict(combine_WB_RP=True, validate=opts["validate"]),
+                    "combine {} into {}".format(" and ".join(_wbrp_indiv), _wbrp_combo),
+                )
+            )
+        if opts["fix_PFCs"]:
+            steps.append(
+                _PlanStep(
+                    "fix_PFCs",
+                    _maybe_fix_PFCs,
+                    dict(fix_PFCs=True, validate=opts["validate"]),
+                    "set the category of PF BMPs to " + _PFC,
+                )
+            )
+        if opts["remove_grabs"]:
+            steps.append(
+                _PlanStep(
+                    "remove_grabs",
+                    _maybe_remove_grabs,
+                    dict(remove_grabs=True, grab_ok_bmps=opts["grab_ok_bmps"]),
+                    "remove grab samples",
+                )
+            )
+        if opts["combine_nox"] and (needed_params is None or set(nox_family).intersection(needed_params)):
+            steps.append(
+                _PlanStep(
+                    "combine_nox",
+                    _maybe_combine_nox,
+                    dict(combine_nox=True, validate=opts["validate"]),
+                    "combine {} into {}".format(" and ".join(_nitro_components), _nitro_combined),
+                )
+            )
+        if late_excluded:
+            steps.append(_filter_step("filter", [[("parameter", "not in", late_excluded)]]))
+
+        # the new index values of the steps above are plain strings
+        encode_steps = []
+        if opts["dtype_backend"] == "pyarrow":
+            encode_steps.append(
+                _PlanStep(
+                    "arrow",
+                    _maybe_arrow_index,
+                    dict(dtype_backend="pyarrow"),
+                    "store the string index levels as Arrow strings",
+                )
+            )
+        if opts["compact"]:
+            encode_steps.append(
+                _PlanStep("compact", _maybe_compact_index, dict(compact=True), "encode the index as categoricals")
+            )
+        steps.extend(encode_steps)
+        steps.append(_PlanStep("pick_sampletype", _pick_best_sampletype, {}, "pick the best sample type"))
+        steps.append(_PlanStep("pick_station", _pick_best_station, {}, "pick the best station"))
+        steps.extend(encode_steps)
+        if opts["balanced_only"]:
+            steps.append(
+                _PlanStep(
+                    "balanced_only",
+                    _maybe_filter_onesided_BMPs,
+                    dict(balanced_only=True),
+                    "remove BMP studies with only inflow or outflow data",
+                )
+            )
+        if opts["minstorms"] and opts["minstorms"] > 0:
+            steps.append(
+                _PlanStep(
+                    "minstorms",
+                    _filter_by_storm_count,
+                    dict(minstorms=opts["minstorms"]),
+                    "remove BMP studies with fewer than {} storms".format(opts["minstorms"]),
+                )
+            )
+        if opts["minbmps"] and opts["minbmps"] > 0:
+            steps.append(
+                _PlanStep(
+                    "minbmps",
+                    _filter_by_BMP_count,
+                    dict(minbmps=opts["minbmps"]),
+                    "remove parameters with fewer than {} BMP studies".format(opts["minbmps"]),
+                )
+            )
+
+        # the selection is applied again at the end, since the rows kept for
+        # (and added by) NOx, the combined WB/RP category and PFCs are not
+        # all selected
+        selection = []
+        if opts["parameters"] is not None:
+            selection.append(("parameter", "in", wqio.validate.at_least_empty_list(opts["parameters"])))
+        if opts["categories"] is not None:
+            selection.append(("category", "in", wqio.validate.at_least_empty_list(opts["categories"])))
+        if selection:
+            steps.append(_filter_step("select", [selection]))
+
+        return steps
+
+    def explain(self):
+        """Describes the planned steps, one per line, in the order in
+        which they are executed.
+
+        Returns
+        -------
+        plan : str
+
+        """
+
+        return "\n".join("{}. {}".format(n, step.description) for n, step in enumerate(self.steps, 1))
+
+    def _selects(self):
+        opts = self.options
+        return any(opts[key] is not None for key in ["parameters", "categories", "paramgroups"])
+
+    def _balanced_stations(self, df, cleaned, complete):
+        # the stations of the whole dataset at the balanced_only step, from
+        # *df* when it has all of the stations that any dataset can have
+        stations = _station_set(df)
+        if stations == _final_stations or (complete is None and not self._selects()):
+            return stations
+
+        _logger.info("finding the stations of the complete data for balanced_only")
+        unselected = dict(self.options, parameters=None, categories=None, paramgroups=None)
+        full = cleaned if complete is None else complete()
+        for step in SummaryPlan(**unselected).steps:
+            if step.name == "balanced_only":
+                break
+            full = step.function(full, **step.kwargs)
+        return _station_set(full)
+
+    def execute(self, df, complete=None):
+        """Runs the planned steps on the cleaned data.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            The cleaned data, as returned by ``_clean_raw_data``.
+        complete : callable, optional
+            Returns the complete cleaned data when *df* is only a part of
+            them (e.g., the rows of ``row_filters``). It is only called
+            when the stations of the whole dataset are needed by the
+            *balanced_only* step (see above). Defaults to *df* itself when
+            parameters, categories, or parameter groups are selected.
+
+        Returns
+        -------
+        summarizable : pandas.DataFrame
+
+        Notes
+        -----
+        The stations compared against by the *balanced_only* step are
+        stored in the ``stations`` attribute of the plan.
+
+        """
+
+        cleaned = df
+        for step in self.steps:
+            kwargs = step.kwargs
+            if step.name == "balanced_only":
+                self.stations = self._balanced_stations(df, cleaned, complete)
+                kwargs = dict(kwargs, all_stations=self.stations)
+            df = step.function(df, **kwargs)
+        return df
+
+
+@wqio.utils.log_df_shape(_logger)
+def _prepare_for_summary(
+    df,
+    minstorms=3,
+    minbmps=3,
+    combine_nox=True,
+    combine_WB_RP=True,
+    remove_grabs=True,
+    grab_ok_bmps="default",
+    balanced_only=True,
+    fix_PFCs=True,
+    excluded_bmps=None,
+    excluded_params=None,
+    parameters=None,
+    categories=None,
+    paramgroups=None,
+    compact=False,
+    dtype_backend="numpy",
+    validate="full",
+):
+    """Prepare data for categorical summaries
+
+    Parameter
+    ---------
+    df : pandas.DataFrame
+    minstorms : int (default = 3)
+        Minimum number of storms (monitoring events) for a BMP study to be included
+    minbmps : int (default = 3)
+        Minimum number of BMP studies for a parameter to be included
+    combine_nox : bool (default = True)
+        Toggles combining NO3 and NO2+NO3 into as new parameter NOx, giving
+        preference to NO2+NO3 when both parameters are observed for an event.
+        The underlying assuption is that NO2 concentrations are typically much
+        smaller than NO3, thus NO2+NO3 ~ NO3.
+    combine_WB_RP : bool (default = True)
+        Toggles combining Retention Pond and Wetland Basin data into a new
+        BMP category: Retention Pond/Wetland Basin.
+    remove_grabs : bool (default = True)
+        Toggles removing grab samples from the dataset except for:
+          - biological parameters
+          - BMPs categories that are whitelisted via *grab_ok_bmps*
+    grab_ok_bmps : sequence of str, optional
         BMP categories for which grab data should be included. By default, this
         inclues Retention Ponds, Wetland Basins, and the combined
         Retention Pond/Wetland Basin category created when *combine_WB_RP* is
@@ -536,30 +2226,321 @@ def _prepare_for_summary(
         Makes correction to the category of Permeable Friction Course BMPs
     excluded_bmps, excluded_params : sequence of str, optional
         List of BMPs studies and parameters to exclude from the data.
+    parameters, categories, paramgroups : sequence of str, optional
+        When provided, only these parameters, BMP categories, and parameter
+        groups are prepared.
+    compact : bool (default = False)
+        When True, string index levels are kept as pandas categoricals
+        through the station and sample type selection and the filters.
+    dtype_backend : str (default = "numpy")
+        With "pyarrow", the string index levels created along the way
+        (e.g., the NOx parameter) are stored as Arrow-backed strings like
+        those of data cleaned with the same option.
+    validate : str (default = "full")
+        With "off", the checks of the results of the steps that combine
+        or redefine parameters and categories are skipped.
 
     Returns
     -------
     summarizable : pandas.DataFrame
 
+    See also
+    --------
+    SummaryPlan
+
     """
 
-    excluded_bmps = wqio.validate.at_least_empty_list(excluded_bmps)
-    excluded_params = wqio.validate.at_least_empty_list(excluded_params)
+    return SummaryPlan(
+        minstorms=minstorms,
+        minbmps=minbmps,
+        combine_nox=combine_nox,
+        combine_WB_RP=combine_WB_RP,
+        remove_grabs=remove_grabs,
+        grab_ok_bmps=grab_ok_bmps,
+        balanced_only=balanced_only,
+        fix_PFCs=fix_PFCs,
+        excluded_bmps=excluded_bmps,
+        excluded_params=excluded_params,
+        parameters=parameters,
+        categories=categories,
+        paramgroups=paramgroups,
+        compact=compact,
+        dtype_backend=dtype_backend,
+        validate=validate,
+    ).execute(df)
+
+
+# the keys by which raw data are compared between releases of the database
+_study_keys = ["bmp_id", "site_id", "storm"]
+
+
+def _hash_studies(raw_df):
+    """Hashes the raw data of every storm of every BMP study.
 
-    return (
-        df.pipe(_maybe_combine_WB_RP, combine_WB_RP)
-        .pipe(_maybe_combine_nox, combine_nox)
-        .pipe(_maybe_fix_PFCs, fix_PFCs)
-        .pipe(_maybe_remove_grabs, remove_grabs, grab_ok_bmps)
-        .query("bmp not in @excluded_bmps")
-        .query("parameter not in @excluded_params")
-        .pipe(_pick_best_sampletype)
-        .pipe(_pick_best_station)
-        .pipe(_maybe_filter_onesided_BMPs, balanced_only)
-        .pipe(_filter_by_storm_count, minstorms)
-        .pipe(_filter_by_BMP_count, minbmps)
+    Returns
+    -------
+    studies : pandas.DataFrame
+        Indexed by ``_study_keys``, with the order-insensitive sum of the
+        hashes of the raw rows (``hash``) and their count (``rows``).
+
+    """
+
+    rowhashes = pandas.util.hash_pandas_object(raw_df, index=False).to_numpy()
+    grouped = raw_df.groupby(by=_study_keys, dropna=False)
+    sizes = grouped.size()
+
+    # numpy.add.at wraps around on overflow, unlike grouped sums of uint64
+    hashes = numpy.zeros(sizes.shape[0], dtype="uint64")
+    numpy.add.at(hashes, grouped.ngroup().to_numpy(), rowhashes)
+    return pandas.DataFrame({"hash": hashes, "rows": sizes.to_numpy()}, index=sizes.index)
+
+
+def _diff_studies(old, new):
+    """Returns the keys of the new or modified studies in *new* and of
+    the studies in *old* that no longer exist.
+    """
+
+    def _tagged(studies):
+        return studies.set_index(["hash", "rows"], append=True).index
+
+    changed = new.index[~_tagged(new).isin(_tagged(old))]
+    removed = old.index[~old.index.isin(new.index)]
+    return changed, removed
+
+
+def _in_studies(df, studies):
+    # selects the rows of *df* belonging to the studies in *studies* using
+    # either its columns or the levels of its index
+    if set(_study_keys).issubset(df.columns):
+        keys = pandas.MultiIndex.from_frame(df[_study_keys])
+    else:
+        keys = pandas.MultiIndex.from_arrays([df.index.get_level_values(k) for k in _study_keys])
+    return keys.isin(studies)
+
+
+def _generation(studies, settings):
+    # identifies a release of the raw data cleaned with given settings
+    hashes = pandas.util.hash_pandas_object(studies.reset_index(), index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes() + settings.encode("utf-8")).hexdigest()
+
+
+def _update_cleaned_data(datapath=None, cachedir=None, nd_correction=2, n_jobs=None, validate="full"):
+    """Cleans the raw data incrementally against the snapshot of the
+    previous release in *cachedir*. Only the studies (bmp_id, site_id,
+    storm) that are new or that changed since then are cleaned. They
+    are spliced into the previously cleaned data after the stale and
+    removed studies are dropped.
+
+    Parameters
+    ----------
+    datapath : Path-like, optional
+        Path to the raw data CSV. If not provided, the latest data will be
+        downloaded.
+    cachedir : Path-like
+        Folder where the snapshots are stored.
+    nd_correction : float, optional (default = 2.0)
+        The factor by which non-detect results will be multiplied.
+    n_jobs : int, optional
+        Number of processes used to clean the data.
+    validate : str (default = "full")
+        How much of the data are checked (see ``_clean_raw_data``).
+
+    Returns
+    -------
+    cleaned : pandas.DataFrame
+    modified : pandas.MultiIndex or None
+        The index of the cleaned rows that were added or removed since the
+        previous release. None when everything was cleaned from scratch.
+    generations : tuple of str
+        Identifiers of the previous (None when unknown) and current
+        releases of the raw data.
+
+    """
+
+    raw = _load_raw_data(datapath)
+    studies = _hash_studies(raw)
+    settings = cache.settings_key(nd_correction)
+    generation = _generation(studies, settings)
+
+    old_studies, studies_meta = cache.read_snapshot(cachedir, "studies")
+    old_cleaned, cleaned_meta = cache.read_snapshot(cachedir, "cleaned")
+    usable = (
+        studies_meta is not None
+        and cleaned_meta is not None
+        and studies_meta == cleaned_meta
+        and cleaned_meta["settings"] == settings
     )
 
+    if not usable:
+        _logger.info("no usable snapshot in {}, cleaning all {} studies".format(cachedir, studies.shape[0]))
+        cleaned = _clean_raw_data(raw, nd_correction=nd_correction, n_jobs=n_jobs, validate=validate)
+        modified, previous = None, None
+
+    elif cleaned_meta["generation"] == generation:
+        _logger.info("raw data unchanged since the snapshot in {}".format(cachedir))
+        return _expand_index(old_cleaned), old_cleaned.index[:0], (generation, generation)
+
+    else:
+        old_cleaned = _expand_index(old_cleaned)
+        changed, removed = _diff_studies(old_studies, studies)
+        _logger.info(
+            "cleaning {} new or modified of {} studies ({} removed)".format(
+                changed.shape[0], studies.shape[0], removed.shape[0]
+            )
+        )
+
+        stale = _in_studies(old_cleaned, changed.append(removed))
+        fresh = old_cleaned.iloc[:0]
+        if changed.shape[0] > 0:
+            fresh = raw.loc[_in_studies(raw, changed)].pipe(
+                _clean_raw_data, nd_correction=nd_correction, n_jobs=n_jobs, validate=validate
+            )
+
+        cleaned = (
+            pandas.concat([old_cleaned.loc[~stale], fresh])
+            .sort_index()
+            .pipe(_check_unique_index, validate=validate)
+        )
+        modified = old_cleaned.index[stale].append(fresh.index)
+        previous = cleaned_meta["generation"]
+
+    cache.write_snapshot(cleaned, cachedir, "cleaned", settings=settings, generation=generation)
+    cache.write_snapshot(studies, cachedir, "studies", settings=settings, generation=generation)
+    return cleaned, modified, (previous, generation)
+
+
+def _summary_groups(index, combine_nox=True, combine_WB_RP=True, fix_PFCs=True):
+    """Labels the rows of the cleaned or prepared data with the parameter
+    and BMP category within which ``_prepare_for_summary`` works. NOx and
+    its components, and Retention Ponds, Wetland Basins and their
+    combination are labeled as one. BMPs of type "PF" are labeled with the
+    category that ``_maybe_fix_PFCs`` gives them.
+
+    Returns
+    -------
+    groups : pandas.MultiIndex
+        Levels ``parameter`` and ``category`` aligned with *index*.
+
+    """
+
+    params = pandas.Series(index.get_level_values("parameter"), dtype=object)
+    cats = pandas.Series(index.get_level_values("category"), dtype=object)
+    if combine_nox:
+        params = params.mask(params.isin(_nitro_components), _nitro_combined)
+    if combine_WB_RP:
+        cats = cats.mask(cats.isin(_wbrp_indiv), _wbrp_combo)
+    if fix_PFCs and "bmptype" in index.names:
+        cats = cats.mask(numpy.asarray(index.get_level_values("bmptype") == "PF"), _PFC)
+    return pandas.MultiIndex.from_arrays([params, cats], names=["parameter", "category"])
+
+
+def _update_prepared_data(cleaned, modified, generations, cachedir, **options):
+    """Prepares the cleaned data for summaries incrementally against the
+    snapshot of the previously prepared data in *cachedir*.
+
+    Every step of ``_prepare_for_summary``, including the filters based on
+    the number of storms and BMPs, works within a parameter and BMP
+    category (see ``_summary_groups``). So only the groups with modified
+    cleaned data are prepared again and spliced into the previously
+    prepared data. The exception is *balanced_only*, which keeps the BMP
+    studies with results at every station of the whole dataset: when the
+    stations of the whole dataset change (e.g., the modified data add the
+    first outflow results), whether any of the groups are balanced can
+    change, and all of them are prepared again.
+
+    Parameters
+    ----------
+    cleaned : pandas.DataFrame
+    modified : pandas.MultiIndex or None
+    generations : tuple of str
+        All as returned by ``_update_cleaned_data``.
+    cachedir : Path-like
+        Folder where the snapshots are stored.
+    **options
+        Keyword arguments passed to ``_prepare_for_summary``. A separate
+        snapshot is kept for each set of options.
+
+    Returns
+    -------
+    prepared : pandas.DataFrame
+        Sorted by its index.
+
+    """
+
+    previous, generation = generations
+    optionskey = json.dumps(options, sort_keys=True, default=str)
+    name = "prepared_" + hashlib.sha256(optionskey.encode("utf-8")).hexdigest()[:16]
+    old_prepared, meta = cache.read_snapshot(cachedir, name)
+
+    if old_prepared is not None and meta["generation"] == generation:
+        return _expand_index(old_prepared)
+
+    plan = SummaryPlan(**options)
+    prepared = None
+    if old_prepared is not None and modified is not None and meta["generation"] == previous:
+        groups = partial(
+            _summary_groups,
+            combine_nox=options.get("combine_nox", True),
+            combine_WB_RP=options.get("combine_WB_RP", True),
+            fix_PFCs=options.get("fix_PFCs", True),
+        )
+        affected = groups(modified).unique()
+        _logger.info("preparing {} modified parameter/category groups".format(affected.shape[0]))
+
+        old_prepared = _expand_index(old_prepared)
+        keep = ~groups(old_prepared.index).isin(affected)
+        subset = cleaned.loc[groups(cleaned.index).isin(affected)]
+        parts = [old_prepared.loc[keep]]
+        if subset.shape[0] > 0:
+            parts.append(plan.execute(subset, complete=lambda: cleaned))
+
+        # the stations of balanced_only (None without it) are recorded
+        # with the snapshots. Without any modified data left to prepare,
+        # they're unknown, so everything is prepared again
+        if plan.stations == meta.get("stations"):
+            prepared = pandas.concat(parts).sort_index()
+        else:
+            _logger.info("the stations of the data changed, preparing all of the groups")
+
+    if prepared is None:
+        prepared = plan.execute(cleaned).sort_index()
+
+    cache.write_snapshot(
+        prepared, cachedir, name, generation=generation, options=optionskey, stations=plan.stations
+    )
+    return prepared
+
+
+def _normalize_option(value):
+    # the order of the lists of BMPs, parameters, etc. doesn't matter
+    if isinstance(value, (list, tuple, set)):
+        return sorted(value)
+    return value
+
+
+def _memoized_cleaned_data(datapath, nd_correction=2, columns=None, options=None):
+    """``_load_cleaned_data`` through the in-process cache of the cleaned
+    data (``pybmpdb.cache.cleaned_memo``). All of the rows are loaded, so
+    that they can be reused for any selection of them.
+    """
+
+    if options is None:
+        options = LoadOptions()
+
+    key = cache.memo_key(
+        datapath,
+        nd_correction=nd_correction,
+        compact=options.compact,
+        columns=_normalize_option(columns),
+        dtype_backend=options.dtype_backend,
+    )
+    cleaned = cache.cleaned_memo.get(key)
+    if cleaned is None:
+        _logger.info("cleaned data memo miss for {}".format(datapath))
+        cleaned = _load_cleaned_data(datapath, nd_correction=nd_correction, columns=columns, options=options)
+        cache.cleaned_memo.put(key, cleaned)
+    return cleaned
+
 
 def load_data(
     datapath=None,
@@ -573,7 +2554,13 @@ def load_data(
     fix_PFCs=True,
     excluded_bmps=None,
     excluded_params=None,
+    parameters=None,
+    categories=None,
+    paramgroups=None,
+    columns=None,
     as_dataframe=False,
+    nd_correction=2,
+    options=None,
     **dc_kwargs
 ):
     """Prepare data for categorical summaries
@@ -611,8 +2598,36 @@ def load_data(
         Makes correction to the category of Permeable Friction Course BMPs
     excluded_bmps, excluded_params : sequence of str, optional
         List of BMPs studies and parameters to exclude from the data.
+    parameters, categories, paramgroups : sequence of str, optional
+        When provided, only these parameters, BMP categories, and parameter
+        groups are loaded and prepared, which is much faster than preparing
+        the whole database. The result is the same as selecting them from
+        the fully prepared data. The rows that cannot affect the result are
+        dropped as the CSV is read, or skipped when the cleaned data are
+        read from the cache directory of the *options*. See
+        ``SummaryPlan`` for the order in which
+        the preparation steps are executed. With *balanced_only*, when the
+        selected data lack all of the results of a station, the complete
+        data are read as well to find the stations of the whole dataset.
+    columns : sequence of str, optional
+        Optional descriptive columns of the raw data to keep as index
+        levels (e.g., "state", "epazone", "watertype", "ws_id"). The
+        columns that the preparation of the data and wqio.DataCollection
+        rely on (category, site, bmp, station, storm, sampletype,
+        paramgroup, units, parameter, fraction, bmptype, site_id, and
+        bmp_id) are always kept. The other columns are not parsed at all.
+        By default, all of them are kept. Note that the data are grouped by
+        the columns that are kept while they are cleaned and prepared, so
+        leaving out columns whose values vary within a BMP study (e.g.,
+        the screening flags) can change the result.
     as_dataframe : bool (default = False)
         When False, a wqio.DataCollection is returned
+    nd_correction : float, optional (default = 2.0)
+        The factor by which non-detect results will be multiplied.
+    options : LoadOptions, optional
+        How the data are read, cached, and processed (e.g., a cache
+        directory, memoization, or the number of worker processes). See
+        ``LoadOptions``. None of them change which data are prepared.
 
     Additional Parameters
     ---------------------
@@ -630,33 +2645,94 @@ def load_data(
     ndval = dc_kwargs.pop("ndval", ["ND", "<"])
     stationcol = dc_kwargs.pop("stationcol", "station")
     paramcol = dc_kwargs.pop("paramcol", "parameter")
-    bmp = (
-        _load_raw_data(datapath)
-        .pipe(_clean_raw_data)
-        .pipe(
-            _prepare_for_summary,
-            minstorms=minstorms,
-            minbmps=minbmps,
-            combine_nox=combine_nox,
-            combine_WB_RP=combine_WB_RP,
-            remove_grabs=remove_grabs,
-            grab_ok_bmps=grab_ok_bmps,
-            balanced_only=balanced_only,
-            fix_PFCs=fix_PFCs,
-            excluded_bmps=excluded_bmps,
-            excluded_params=excluded_params,
-        )
-    )
-    if as_dataframe:
-        return bmp
-    return wqio.DataCollection(
-        bmp,
-        rescol=rescol,
-        qualcol=qualcol,
-        ndval=ndval,
-        stationcol=stationcol,
-        paramcol=paramcol,
-        othergroups=othergroups,
-        pairgroups=pairgroups,
-        **dc_kwargs
+    prep_options = dict(
+        minstorms=minstorms,
+        minbmps=minbmps,
+        combine_nox=combine_nox,
+        combine_WB_RP=combine_WB_RP,
+        remove_grabs=remove_grabs,
+        grab_ok_bmps=grab_ok_bmps,
+        balanced_only=balanced_only,
+        fix_PFCs=fix_PFCs,
+        excluded_bmps=excluded_bmps,
+        excluded_params=excluded_params,
+        parameters=parameters,
+        categories=categories,
+        paramgroups=paramgroups,
     )
+
+    def finish(bmp):
+        if as_dataframe:
+            return bmp
+        return wqio.DataCollection(
+            _expand_index(bmp),
+            rescol=rescol,
+            qualcol=qualcol,
+            ndval=ndval,
+            stationcol=stationcol,
+            paramcol=paramcol,
+            othergroups=othergroups,
+            pairgroups=pairgroups,
+            **dc_kwargs
+        )
+
+    if options is None:
+        options = LoadOptions()
+    if options.connection is not None and datapath is not None:
+        raise ValueError("`datapath` and `connection` cannot be used together")
+    if options.incremental and columns is not None:
+        raise ValueError("`columns` and `incremental` cannot be used together")
+
+    memokey = None
+    if options.memoize:
+        datapath = Path(datapath or wqio.download("bmpdata"))
+        memokey = cache.memo_key(
+            datapath,
+            nd_correction=nd_correction,
+            compact=options.compact,
+            columns=_normalize_option(columns),
+            dtype_backend=options.dtype_backend,
+            incremental=options.incremental,
+            **{name: _normalize_option(value) for name, value in prep_options.items()}
+        )
+        bmp = cache.result_memo.get(memokey)
+        if bmp is not None:
+            _logger.info("load_data memo hit for {}".format(datapath))
+            return finish(bmp.copy())
+
+    if options.incremental:
+        cleaned, modified, generations = _update_cleaned_data(
+            datapath,
+            cachedir=options.cachedir,
+            nd_correction=nd_correction,
+            n_jobs=options.n_jobs,
+            validate=options.validate,
+        )
+        bmp = (
+            _update_prepared_data(cleaned, modified, generations, options.cachedir, **prep_options)
+            .pipe(_maybe_arrow_index, options.dtype_backend)
+            .pipe(_maybe_compact_index, options.compact)
+        )
+    else:
+        plan = SummaryPlan(
+            compact=options.compact, dtype_backend=options.dtype_backend, validate=options.validate, **prep_options
+        )
+        if options.memoize:
+            cleaned = _memoized_cleaned_data(datapath, nd_correction=nd_correction, columns=columns, options=options)
+            bmp = plan.execute(cleaned)
+        else:
+            loader = partial(
+                _load_cleaned_data, datapath, nd_correction=nd_correction, columns=columns, options=options
+            )
+            # only the rows of the filters are read, but the plan may need
+            # all of them for the stations of balanced_only
+            filters = plan.row_filters()
+            complete = None if filters is None else loader
+            bmp = loader(filters=filters).pipe(plan.execute, complete=complete)
+
+    if memokey is not None:
+        # the memo keeps its own copy of the prepared data, so that the
+        # callers cannot change it
+        cache.result_memo.put(memokey, bmp)
+        bmp = bmp.copy()
+    return finish(bmp)
@@ -0,0 +1,560 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy
+import pandas
+
+from . import info
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+
+__all__ = [
+    "cache_key",
+    "settings_key",
+    "read_cleaned",
+    "write_cleaned",
+    "read_snapshot",
+    "write_snapshot",
+    "read_mmap_snapshot",
+    "write_mmap_snapshot",
+    "invalidate",
+    "LRUCache",
+    "memo_key",
+    "clear_memo",
+    "memo_stats",
+]
+
+
+_logger = logging.getLogger(__name__)
+
+# bump this whenever the layout of the cleaned data changes so that
+# stale cache files are never read back in
+CACHE_VERSION = 1
+CACHE_PREFIX = "bmpdb_cleaned_"
+CACHE_SUFFIX = ".parquet"
+SNAPSHOT_PREFIX = "bmpdb_snapshot_"
+MMAP_SUFFIX = ".mmap"
+MMAP_VERSION = 1
+
+# small enough row groups for the filters of ``read_cleaned`` to skip most
+# of a cached dataset that is sorted by category
+ROW_GROUP_SIZE = 2 ** 14
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("pyarrow is required to read or write the cleaned data cache")
+
+
+def _hash_file(filepath, blocksize=2 ** 20):
+    sha = hashlib.sha256()
+    with Path(filepath).open("rb") as fileobj:
+        for block in iter(lambda: fileobj.read(blocksize), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _hash_info_tables():
+    tables = {"units": info.units, "parameters": info.parameters}
+    return hashlib.sha256(json.dumps(tables, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def cache_key(csvfile, nd_correction=2, columns=None):
+    """Content-addressed key for the cleaned version of a raw data file.
+
+    Parameters
+    ----------
+    csvfile : Path-like
+        The raw BMP Database CSV.
+    nd_correction : float, optional (default = 2)
+        The non-detect scaling factor used when cleaning the data.
+    columns : sequence of str, optional
+        The columns of the CSV that are cleaned, when not all of them.
+
+    Returns
+    -------
+    key : str
+        A hexadecimal digest that changes whenever the contents of the CSV,
+        the non-detect correction, the cleaned columns, or the units and
+        parameters lookup tables in ``pybmpdb.info`` change.
+
+    """
+
+    parts = [
+        "v{}".format(CACHE_VERSION),
+        _hash_file(csvfile),
+        repr(float(nd_correction)),
+        _hash_info_tables(),
+    ]
+    if columns is not None:
+        parts.append(",".join(columns))
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def settings_key(nd_correction=2):
+    """Key of everything other than the raw data that the cleaned data
+    depend on: the cache version, the non-detect correction, and the units
+    and parameters lookup tables.
+    """
+
+    parts = ["v{}".format(CACHE_VERSION), repr(float(nd_correction)), _hash_info_tables()]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _write_atomically(filepath, writer):
+    # write under a temporary name and then move the file into place so
+    # that concurrent readers never see a partially written file
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmppath = filepath.with_suffix(".{}.tmp".format(os.getpid()))
+    writer(tmppath)
+    os.replace(tmppath, filepath)
+    return filepath
+
+
+def cache_path(cachedir, key):
+    return Path(cachedir) / "{}{}{}".format(CACHE_PREFIX, key, CACHE_SUFFIX)
+
+
+def read_cleaned(cachedir, key, filters=None):
+    """Read a cleaned dataset back from the cache.
+
+    Parameters
+    ----------
+    cachedir : Path-like
+        Folder where the cache files are stored.
+    key : str
+        Key of the dataset, as returned by ``cache_key``.
+    filters : list of lists of tuples, optional
+        Only the rows matching these filters are read (see
+        ``pyarrow.parquet.read_table``). The row groups of the file that
+        cannot match are skipped entirely.
+
+    Returns
+    -------
+    cleaned : pandas.DataFrame or None
+        The cached data with its original MultiIndex, or None when nothing
+        has been cached under *key*.
+
+    """
+
+    _require_pyarrow()
+    filepath = cache_path(cachedir, key)
+    if not filepath.exists():
+        return None
+    return pandas.read_parquet(filepath, engine="pyarrow", filters=filters)
+
+
+def write_cleaned(df, cachedir, key):
+    """Write a cleaned dataset to the cache as Parquet.
+
+    The file is written under a temporary name and then moved into place so
+    that concurrent readers never see a partially written file.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Output of ``pybmpdb.bmpdb._clean_raw_data``.
+    cachedir : Path-like
+        Folder where the cache files are stored. Created if needed.
+    key : str
+        Key of the dataset, as returned by ``cache_key``.
+
+    Returns
+    -------
+    filepath : pathlib.Path
+
+    """
+
+    _require_pyarrow()
+    return _write_atomically(
+        cache_path(cachedir, key),
+        lambda path: df.to_parquet(path, engine="pyarrow", row_group_size=ROW_GROUP_SIZE),
+    )
+
+
+def snapshot_path(cachedir, name, suffix=CACHE_SUFFIX):
+    return Path(cachedir) / "{}{}{}".format(SNAPSHOT_PREFIX, name, suffix)
+
+
+def read_snapshot(cachedir, name):
+    """Read a named snapshot and its metadata back from the cache.
+
+    Unlike the content-addressed datasets of ``read_cleaned``, there is
+    only one snapshot for a given name. Snapshots are overwritten as the
+    data are updated incrementally.
+
+    Parameters
+    ----------
+    cachedir : Path-like
+        Folder where the cache files are stored.
+    name : str
+        Name of the snapshot.
+
+    Returns
+    -------
+    snapshot : pandas.DataFrame or None
+    meta : dict or None
+        The metadata stored alongside the snapshot. Both are None when the
+        snapshot doesn't exist.
+
+    """
+
+    _require_pyarrow()
+    datapath = snapshot_path(cachedir, name)
+    metapath = snapshot_path(cachedir, name, suffix=".json")
+    if not (datapath.exists() and metapath.exists()):
+        return None, None
+
+    meta = json.loads(metapath.read_text())
+    return pandas.read_parquet(datapath, engine="pyarrow"), meta
+
+
+def write_snapshot(df, cachedir, name, **meta):
+    """Write (or overwrite) a named snapshot to the cache.
+
+    The metadata are removed while the data are replaced and written back
+    last, so a snapshot whose write was interrupted is treated as missing.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    cachedir : Path-like
+        Folder where the cache files are stored. Created if needed.
+    name : str
+        Name of the snapshot.
+    **meta
+        JSON-serializable metadata stored with the snapshot.
+
+    Returns
+    -------
+    filepath : pathlib.Path
+
+    """
+
+    _require_pyarrow()
+    metapath = snapshot_path(cachedir, name, suffix=".json")
+    if metapath.exists():
+        metapath.unlink()
+
+    filepath = _write_atomically(snapshot_path(cachedir, name), lambda path: df.to_parquet(path, engine="pyarrow"))
+    _write_atomically(metapath, lambda path: path.write_text(json.dumps(meta, sort_keys=True)))
+    return filepath
+
+
+def _smallest_codes(codes, nlabels):
+    for dtype in (numpy.int8, numpy.int16, numpy.int32):
+        if nlabels < numpy.iinfo(dtype).max:
+            return codes.astype(dtype, copy=False)
+    return codes.astype(numpy.int64, copy=False)
+
+
+def _is_labeled(values):
+    # strings (and categoricals) are stored as codes and labels, anything
+    # else as a plain numpy array
+    dtype = values.dtype
+    return isinstance(dtype, (pandas.CategoricalDtype, pandas.StringDtype)) or dtype == object
+
+
+def _save_array(filepath, values):
+    def _writer(path):
+        with path.open("wb") as fileobj:
+            numpy.save(fileobj, numpy.ascontiguousarray(values), allow_pickle=False)
+
+    return _write_atomically(filepath, _writer)
+
+
+def mmap_snapshot_path(cachedir, name):
+    return snapshot_path(cachedir, name, suffix=MMAP_SUFFIX)
+
+
+def write_mmap_snapshot(df, cachedir, name):
+    """Write (or overwrite) a named snapshot of a dataframe as arrays that
+    can be memory-mapped by ``read_mmap_snapshot``.
+
+    The snapshot is a folder with one ``.npy`` file for the codes of each
+    level of the index and for each column, and a small JSON file with the
+    labels of the strings. String columns and index levels are stored as
+    the codes of their labels, numeric and datetime ones as-is. The labels
+    are removed while the arrays are replaced and written back last, so a
+    snapshot whose write was interrupted is treated as missing. Processes
+    that have the previous snapshot mapped keep reading the previous
+    arrays.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        E.g., the prepared data from ``pybmpdb.load_data(...,
+        as_dataframe=True)``.
+    cachedir : Path-like
+        Folder where the cache files are stored. Created if needed.
+    name : str
+        Name of the snapshot.
+
+    Returns
+    -------
+    folder : pathlib.Path
+
+    """
+
+    folder = mmap_snapshot_path(cachedir, name)
+    labelspath = folder / "labels.json"
+    if labelspath.exists():
+        labelspath.unlink()
+
+    multiindex = isinstance(df.index, pandas.MultiIndex)
+    index = df.index if multiindex else pandas.MultiIndex.from_arrays([df.index])
+    written = []
+    meta = {"version": MMAP_VERSION, "multiindex": multiindex, "index": [], "columns": []}
+    for n, (level, codes) in enumerate(zip(index.levels, index.codes)):
+        labels = None
+        if _is_labeled(level):
+            labels = numpy.asarray(level, dtype=object).tolist()
+        else:
+            written.append(_save_array(folder / "index_{}_values.npy".format(n), level.to_numpy()))
+        written.append(_save_array(folder / "index_{}_codes.npy".format(n), codes))
+        meta["index"].append({"name": level.name, "labels": labels})
+
+    for n, column in enumerate(df.columns):
+        values = df[column]
+        labels = None
+        if _is_labeled(values):
+            codes, uniques = pandas.factorize(values, sort=True)
+            labels = numpy.asarray(uniques, dtype=object).tolist()
+            values = _smallest_codes(codes, len(labels))
+        written.append(_save_array(folder / "column_{}.npy".format(n), values.to_numpy() if labels is None else values))
+        meta["columns"].append({"name": column, "labels": labels})
+
+    for stale in set(folder.glob("*.npy")) - set(written):
+        stale.unlink()
+
+    _write_atomically(labelspath, lambda path: path.write_text(json.dumps(meta)))
+    return folder
+
+
+def read_mmap_snapshot(cachedir, name, mmap_mode="r"):
+    """Read a snapshot written by ``write_mmap_snapshot``.
+
+    With the default *mmap_mode*, the arrays are memory-mapped rather
+    than read: the codes of the index and the numeric columns of the
+    dataframe are read-only views of the files, so any number of
+    processes reading the same snapshot share a single copy of the data
+    through the page cache of the OS. Only the labels are held by each
+    process.
+
+    Parameters
+    ----------
+    cachedir : Path-like
+        Folder where the cache files are stored.
+    name : str
+        Name of the snapshot.
+    mmap_mode : str, optional (default = "r")
+        See ``numpy.load``. None reads the arrays into memory.
+
+    Returns
+    -------
+    snapshot : pandas.DataFrame or None
+        The dataframe, with the labeled columns as pandas categoricals and
+        the string index levels as plain object levels. None when the
+        snapshot doesn't exist.
+
+    """
+
+    folder = mmap_snapshot_path(cachedir, name)
+    labelspath = folder / "labels.json"
+    if not labelspath.exists():
+        return None
+
+    meta = json.loads(labelspath.read_text())
+    if meta["version"] != MMAP_VERSION:
+        return None
+
+    def _load(filename):
+        return numpy.load(folder / filename, mmap_mode=mmap_mode, allow_pickle=False)
+
+    levels, codes = [], []
+    for n, level in enumerate(meta["index"]):
+        values = level["labels"] if level["labels"] is not None else _load("index_{}_values.npy".format(n))
+        levels.append(pandas.Index(values, dtype=object if level["labels"] is not None else None, name=level["name"]))
+        codes.append(_load("index_{}_codes.npy".format(n)))
+    index = pandas.MultiIndex(
+        levels=levels, codes=codes, names=[level["name"] for level in meta["index"]], verify_integrity=False
+    )
+    if not meta["multiindex"]:
+        index = index.get_level_values(0)
+
+    columns = {}
+    for n, column in enumerate(meta["columns"]):
+        values = _load("column_{}.npy".format(n))
+        if column["labels"] is not None:
+            values = pandas.Categorical.from_codes(values, categories=column["labels"])
+        columns[column["name"]] = values
+    return pandas.DataFrame(columns, index=index, copy=False)
+
+
+def invalidate(cachedir, key=None):
+    """Remove cleaned datasets from the cache.
+
+    Parameters
+    ----------
+    cachedir : Path-like
+        Folder where the cache files are stored.
+    key : str, optional
+        Key of a single dataset to remove. When omitted, every cached
+        dataset and snapshot in *cachedir* is removed.
+
+    Returns
+    -------
+    removed : list of pathlib.Path
+
+    """
+
+    cachedir = Path(cachedir)
+    if key is not None:
+        candidates = [cache_path(cachedir, key)]
+    else:
+        candidates = sorted(cachedir.glob("{}*{}".format(CACHE_PREFIX, CACHE_SUFFIX)))
+        candidates.extend(sorted(cachedir.glob("{}*".format(SNAPSHOT_PREFIX))))
+
+    removed = []
+    for filepath in candidates:
+        if filepath.is_dir():
+            shutil.rmtree(filepath)
+            removed.append(filepath)
+        elif filepath.exists():
+            filepath.unlink()
+            removed.append(filepath)
+
+    _logger.debug("removed {} file(s) from the cache in {}".format(len(removed), cachedir))
+    return removed
+
+
+class LRUCache(object):
+    """A least-recently-used cache of objects held in memory, with
+    statistics of its hits and misses.
+
+    Parameters
+    ----------
+    maxsize : int (default = 16)
+        Maximum number of entries. The least recently used entries are
+        evicted when it is exceeded. Zero disables the cache.
+
+    Examples
+    --------
+    >>> memo = LRUCache(maxsize=2)
+    >>> memo.put("a", 1)
+    >>> memo.get("a"), memo.get("b")
+    (1, None)
+    >>> memo.stats()
+    {'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 2}
+
+    """
+
+    def __init__(self, maxsize=16):
+        self._entries = OrderedDict()
+        self._maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, value):
+        if value < 0:
+            raise ValueError("`maxsize` cannot be negative")
+        self._maxsize = value
+        self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _evict(self):
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, key, default=None):
+        """Returns the entry stored under *key* (and marks it as the most
+        recently used one), or *default* when there isn't one.
+        """
+
+        if key not in self._entries:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key, value):
+        """Stores *value* under *key*, evicting the least recently used
+        entries if needed.
+        """
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def clear(self):
+        """Removes all the entries and resets the statistics."""
+
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self), "maxsize": self.maxsize}
+
+
+# in-process caches of ``pybmpdb.load_data(..., options=LoadOptions(memoize=True))``:
+# the cleaned data of each source file, and the results for each set of options
+cleaned_memo = LRUCache(maxsize=2)
+result_memo = LRUCache(maxsize=16)
+
+
+def memo_key(filepath, **options):
+    """Key of the in-process caches for a source file and a set of options.
+
+    The file is identified by its resolved path, size, and modification
+    time (rather than by its contents, as in ``cache_key``). The options
+    must be JSON-serializable, or have a meaningful string representation.
+    """
+
+    filepath = Path(filepath).resolve()
+    stat = filepath.stat()
+    return (str(filepath), stat.st_size, stat.st_mtime_ns, json.dumps(options, sort_keys=True, default=str))
+
+
+def clear_memo():
+    """Empties the in-process caches of ``load_data`` and resets their
+    statistics.
+    """
+
+    cleaned_memo.clear()
+    result_memo.clear()
+
+
+def memo_stats():
+    """Hits, misses, size, and maximum size of the in-process caches of
+    ``load_data``.
+
+    Returns
+    -------
+    stats : dict
+        With the keys "cleaned" and "results".
+
+    """
+
+    return {"cleaned": cleaned_memo.stats(), "results": result_memo.stats()}
@@ -1,27 +1,67 @@
 import json
+from functools import lru_cache
 from pkg_resources import resource_filename
 
+import pandas
+
 from ._parameters import parameters
 from ._units import units
 
 
-__all__ = ["getUnits", "getTexParam", "getTexUnit", "getNormalization", "getConversion"]
+__all__ = [
+    "getUnits",
+    "getTexParam",
+    "getTexUnit",
+    "getNormalization",
+    "getConversion",
+    "mapUnits",
+    "mapUnitsFromParam",
+]
+
+
+def _normalize_name(value_string):
+    return value_string.strip().lower()
+
+
+@lru_cache(maxsize=16)
+def _index_names(names):
+    index = {}
+    for position, name in enumerate(names):
+        index.setdefault(_normalize_name(name), []).append(position)
+    return index
 
 
-def _find_by_name(value_string, list_of_dicts, key="name"):
+def _get_index(list_of_dicts, key="name"):
+    """ Returns a case-insensitive dictionary mapping the values of
+    *key* to the positions of the entries with that value. The indexes
+    are memoized on the values of *key* (not on the table object), so
+    that entries edited in place are always found under their current
+    names.
+    """
+    return _index_names(tuple(entry[key] for entry in list_of_dicts))
+
+
+def _find_by_name(value_string, list_of_dicts, key="name", index=None):
     # get the parameter's entry in the lookup list of dicts
-    _entry = list(
-        filter(
-            lambda x: x[key].strip().lower() == value_string.strip().lower(),
-            list_of_dicts,
-        )
-    )
+    if index is None:
+        index = _get_index(list_of_dicts, key=key)
+    _entry = index.get(_normalize_name(value_string), [])
 
     if len(_entry) != 1:
         msg = "Found ({}) entries found for {}. Expected 1."
         raise ValueError(msg.format(len(_entry), value_string))
 
-    return _entry[0]
+    return list_of_dicts[_entry[0]]
+
+
+def _map_by_name(values, list_of_dicts, attr, key="name"):
+    # look up each distinct value once, then broadcast
+    values = pandas.Series(values)
+    index = _get_index(list_of_dicts, key=key)
+    lookup = {
+        v: _find_by_name(v, list_of_dicts, key=key, index=index)[attr] for v in values.unique()
+    }
+    return values.map(lookup)
 
 
 def getUnitsFromParam(paramname, attr="name"):
@@ -73,3 +113,23 @@ def getConversion(param):
     p = _find_by_name(param, parameters)
 
     return getNormalization(p["units"])
+
+
+def mapUnits(unitnames, attr="name"):
+    """
+    Returns the *attr* of the units for every value in *unitnames*
+    (a pandas.Series or other sequence) as a pandas.Series. Each
+    distinct value is looked up only once. Raises a ValueError when
+    any of the units is missing from or duplicated in the table.
+    """
+    return _map_by_name(unitnames, units, attr)
+
+
+def mapUnitsFromParam(paramnames, attr="name"):
+    """
+    Returns the *attr* of the standard units of every parameter in
+    *paramnames* (a pandas.Series or other sequence) as a
+    pandas.Series. Each distinct value is looked up only once.
+    """
+    unitnames = _map_by_name(paramnames, parameters, "units")
+    return _map_by_name(unitnames, units, attr)
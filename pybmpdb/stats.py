@@ -0,0 +1,394 @@
+import numpy
+import pandas
+from scipy import special
+
+
+__all__ = ["grouped_quantiles", "grouped_bootstrap", "bootstrap_intervals", "sample_stats"]
+
+_bootstrap_statistics = ("median", "mean")
+_bootstrap_methods = ("BCA", "percentile")
+
+# roughly the number of bytes of working memory per resampled value
+_bytes_per_draw = 32
+
+
+def _percentile_name(percentile):
+    return "pctl {:g}".format(percentile)
+
+
+def _sorted_groups(df, groupcols, rescol):
+    """Sorts the values of *rescol* by group and value with a single
+    sort. Missing values sort to the end of each group.
+
+    Returns
+    -------
+    keys : pandas.Index
+        The (sorted) keys of the groups.
+    values : numpy.ndarray
+        The sorted values.
+    starts, counts : numpy.ndarray
+        The position of the first value of each group in *values*, and
+        the number of non-missing values of each group.
+
+    """
+
+    groups = df.groupby(by=groupcols, sort=True)
+    codes = groups.ngroup().fillna(-1).to_numpy(dtype=int)
+    values = df[rescol].to_numpy(dtype=float)
+
+    # rows with missing keys don't belong to any group
+    keep = codes >= 0
+    codes, values = codes[keep], values[keep]
+
+    sizes = numpy.bincount(codes, minlength=groups.ngroups)
+    counts = numpy.bincount(codes[~numpy.isnan(values)], minlength=groups.ngroups)
+    starts = numpy.zeros_like(sizes)
+    starts[1:] = numpy.cumsum(sizes)[:-1]
+
+    values = values[numpy.lexsort((values, codes))]
+    return groups.size().index, values, starts, counts
+
+
+def _interpolate(values, starts, counts, quantile):
+    # numpy.percentile's default (linear) interpolation, for all of the
+    # groups at once
+    position = (counts - 1).clip(min=0) * quantile
+    below = numpy.floor(position).astype(int)
+    above = numpy.minimum(below + 1, (counts - 1).clip(min=0))
+    lower = values[starts + below]
+    upper = values[starts + above]
+    result = lower + (position - below) * (upper - lower)
+    return numpy.where(counts > 0, result, numpy.nan)
+
+
+def grouped_quantiles(df, groupcols, rescol, percentiles=(25, 50, 75)):
+    """Counts, percentiles, minimums and maximums of the values in each
+    group of a dataframe. The values are sorted once, together with their
+    groups, and all of the statistics are read off of the sorted values.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    groupcols : list of str
+        Columns (or index levels) that define the groups.
+    rescol : str
+        Column of the values.
+    percentiles : sequence of floats, optional
+        The percentiles (0 - 100) to compute. Values in between two data
+        points are linearly interpolated, as in ``numpy.percentile``.
+
+    Returns
+    -------
+    stats : pandas.DataFrame
+        Indexed by the groups, with the columns ``"count"``, ``"min"``,
+        ``"pctl <percentile>"`` for each percentile, and ``"max"``.
+        Missing values are excluded from all of the statistics.
+
+    """
+
+    keys, values, starts, counts = _sorted_groups(df, groupcols, rescol)
+
+    stats = {"count": counts, "min": _interpolate(values, starts, counts, 0.0)}
+    for percentile in percentiles:
+        quantile = percentile / 100.0
+        if not 0 <= quantile <= 1:
+            raise ValueError("percentiles must be between 0 and 100, not {}".format(percentile))
+        stats[_percentile_name(percentile)] = _interpolate(values, starts, counts, quantile)
+    stats["max"] = _interpolate(values, starts, counts, 1.0)
+
+    return pandas.DataFrame(stats, index=keys)
+
+
+def _group_starts(counts):
+    starts = numpy.zeros_like(counts)
+    starts[1:] = numpy.cumsum(counts)[:-1]
+    return starts
+
+
+def _resample(values, firsts, size, niter, rng, statistic):
+    # statistic of *niter* resamples of each of the groups of *size*
+    # values starting at *firsts*, drawn as one array of indices
+    draws = rng.integers(0, size, size=(firsts.shape[0], niter, size))
+    if statistic == "median":
+        # the values of each group are sorted, so only the middle draws
+        # need to be looked up
+        draws.sort(axis=-1)
+        draws = draws[..., [(size - 1) // 2, size // 2]]
+    return values[firsts[:, None, None] + draws].mean(axis=-1)
+
+
+def _resampled_stats(values, starts, counts, statistic, niter, rng, max_draws):
+    """The statistic of *niter* resamples (with replacement) of each
+    group. Groups of the same size are resampled together, in batches
+    of about *max_draws* values.
+
+    Returns
+    -------
+    boot_stats : numpy.ndarray
+        Of shape (number of groups, *niter*).
+
+    """
+
+    boot_stats = numpy.empty((counts.shape[0], niter))
+
+    # the random numbers are drawn group by group (within each size),
+    # then iteration by iteration, however the draws are batched
+    for size in numpy.unique(counts):
+        groups = numpy.flatnonzero(counts == size)
+        nrows = max_draws // (niter * size)
+        if nrows:
+            for first in range(0, groups.shape[0], nrows):
+                batch = groups[first : first + nrows]
+                boot_stats[batch] = _resample(values, starts[batch], size, niter, rng, statistic)
+        else:
+            step = max(max_draws // size, 1)
+            for group in groups:
+                for first in range(0, niter, step):
+                    boot_stats[group, first : first + step] = _resample(
+                        values, starts[[group]], size, min(step, niter - first), rng, statistic
+                    )[0]
+
+    return boot_stats
+
+
+def _acceleration(values, starts, counts):
+    # same estimate as wqio.bootstrap._acceleration, for each group
+    means = numpy.add.reduceat(values, starts) / counts
+    resids = numpy.repeat(means, counts) - values
+    sumcube = numpy.add.reduceat(resids ** 3, starts)
+    sumsqr = numpy.maximum(numpy.add.reduceat(resids ** 2, starts), 1e-12)
+    return sumcube / (6 * sumsqr ** 1.5)
+
+
+def _row_percentiles(sorted_rows, quantiles):
+    # linear interpolation of a different pair of quantiles in each row
+    # of an array whose rows are sorted
+    position = (sorted_rows.shape[1] - 1) * quantiles
+    below = numpy.floor(position).astype(numpy.intp)
+    above = numpy.minimum(below + 1, sorted_rows.shape[1] - 1)
+    lower = numpy.take_along_axis(sorted_rows, below, axis=1)
+    upper = numpy.take_along_axis(sorted_rows, above, axis=1)
+    return lower + (position - below) * (upper - lower)
+
+
+def _bootstrap(values, counts, statistic, niter, alpha, method, seed, max_memory):
+    """Bootstrapped confidence intervals of a statistic of each group of
+    *values* (sorted within each group, without missing values).
+
+    Returns
+    -------
+    primary, lower, upper : numpy.ndarray
+        The statistic of each group and its confidence interval.
+
+    """
+
+    if statistic not in _bootstrap_statistics:
+        raise ValueError(
+            "statistic must be one of {}, not {}".format(_bootstrap_statistics, statistic)
+        )
+    if method not in _bootstrap_methods:
+        raise ValueError("method must be one of {}, not {}".format(_bootstrap_methods, method))
+
+    primary, lower, upper = numpy.full((3, counts.shape[0]), numpy.nan)
+    filled = counts > 0
+    counts = counts[filled]
+    if not counts.shape[0]:
+        return primary, lower, upper
+
+    starts = _group_starts(counts)
+    rng = numpy.random.default_rng(seed)
+    boot_stats = _resampled_stats(
+        values, starts, counts, statistic, int(niter), rng, max_memory // _bytes_per_draw
+    )
+
+    if statistic == "median":
+        stat = _interpolate(values, starts, counts, 0.5)
+    else:
+        stat = numpy.add.reduceat(values, starts) / counts
+
+    tails = numpy.array([0.5 * alpha, 1 - 0.5 * alpha])
+    sorted_stats = numpy.sort(boot_stats, axis=1)
+    ci = _row_percentiles(sorted_stats, numpy.tile(tails, (counts.shape[0], 1)))
+
+    if method == "BCA":
+        below = (boot_stats < stat[:, None]).sum(axis=1).astype(float)
+        below[below == 0] = 0.00001
+        accel = _acceleration(values, starts, counts)[:, None]
+        z0 = special.ndtri(below / niter)[:, None]
+        z = special.ndtri(tails)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            adjusted = special.ndtr(z0 + (z0 + z) / (1 - accel * (z0 + z)))
+            bca = _row_percentiles(sorted_stats, numpy.nan_to_num(adjusted, nan=0.5))
+
+        # like wqio, fall back to the percentile interval where the BCa
+        # interval is undefined or excludes the mean of the resamples
+        boot_mean = boot_stats.mean(axis=1)
+        valid = (
+            (below < niter)
+            & numpy.isfinite(adjusted).all(axis=1)
+            & (bca[:, 0] <= boot_mean)
+            & (boot_mean <= bca[:, 1])
+        )
+        ci[valid] = bca[valid]
+
+    primary[filled] = stat
+    lower[filled] = ci[:, 0]
+    upper[filled] = ci[:, 1]
+    return primary, lower, upper
+
+
+def grouped_bootstrap(
+    df,
+    groupcols,
+    rescol,
+    statistic="median",
+    niter=10000,
+    alpha=0.05,
+    method="BCA",
+    seed=None,
+    max_memory=2 ** 28,
+):
+    """Bootstrapped confidence intervals of the median or mean of the
+    values in each group of a dataframe. All of the groups are resampled
+    together with NumPy index arrays, in batches limited by
+    *max_memory*.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    groupcols : list of str
+        Columns (or index levels) that define the groups.
+    rescol : str
+        Column of the values.
+    statistic : {"median", "mean"}, optional
+    niter : int, optional (default = 10000)
+        Number of resamples of each group.
+    alpha : float, optional (default = 0.05)
+        The confidence interval subtracted from 1.
+    method : {"BCA", "percentile"}, optional
+        Bias-corrected and accelerated intervals (which, like in
+        ``wqio.bootstrap.BCA``, fall back to the percentile interval when
+        they are undefined or exclude the mean of the resampled
+        statistics), or percentile intervals.
+    seed : int or numpy.random.SeedSequence, optional
+        Seed of the random number generator. The results do not depend on
+        *max_memory*.
+    max_memory : int, optional
+        Approximate number of bytes of working memory to use for the
+        resamples, which are otherwise drawn in one batch.
+
+    Returns
+    -------
+    intervals : pandas.DataFrame
+        Indexed by the groups, with the columns ``"lower"``,
+        *statistic*, and ``"upper"``. Missing values are excluded.
+
+    """
+
+    keys, values, starts, counts = _sorted_groups(df, groupcols, rescol)
+    primary, lower, upper = _bootstrap(
+        values[~numpy.isnan(values)], counts, statistic, niter, alpha, method, seed, max_memory
+    )
+    return pandas.DataFrame({"lower": lower, statistic: primary, "upper": upper}, index=keys)
+
+
+def bootstrap_intervals(
+    samples,
+    statistic="median",
+    niter=10000,
+    alpha=0.05,
+    method="BCA",
+    seed=None,
+    max_memory=2 ** 28,
+):
+    """Bootstrapped confidence intervals of the median or mean of each of
+    several samples, resampled together. See ``grouped_bootstrap``.
+
+    Parameters
+    ----------
+    samples : sequence of array-like
+    statistic, niter, alpha, method, seed, max_memory
+        See ``grouped_bootstrap``.
+
+    Returns
+    -------
+    intervals : numpy.ndarray
+        Lower and upper bounds of each sample, of shape
+        (number of samples, 2). Both are NaN for empty samples.
+
+    """
+
+    samples = [numpy.asarray(sample, dtype=float) for sample in samples]
+    samples = [numpy.sort(sample[~numpy.isnan(sample)]) for sample in samples]
+    counts = numpy.array([sample.shape[0] for sample in samples], dtype=int)
+    values = numpy.concatenate(samples) if samples else numpy.empty(0)
+    _, lower, upper = _bootstrap(
+        values, counts, statistic, niter, alpha, method, seed, max_memory
+    )
+    return numpy.column_stack([lower, upper])
+
+
+def _moments(values, starts, counts):
+    # mean and (population) standard deviation and skewness of each group
+    means = numpy.add.reduceat(values, starts) / counts
+    resids = values - numpy.repeat(means, counts)
+    m2 = numpy.add.reduceat(resids ** 2, starts) / counts
+    m3 = numpy.add.reduceat(resids ** 3, starts) / counts
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        skew = numpy.where(m2 > 0, m3 / m2 ** 1.5, numpy.nan)
+    return means, numpy.sqrt(m2), skew
+
+
+def sample_stats(samples):
+    """Descriptive statistics of each of several samples, computed for
+    all of the samples at once. The statistics are named and defined
+    like the attributes of ``wqio.Location``.
+
+    Parameters
+    ----------
+    samples : sequence of array-like
+
+    Returns
+    -------
+    stats : pandas.DataFrame
+        One row per sample, with the columns ``"N"``, ``"min"``,
+        ``"max"``, ``"median"``, ``"pctl25"``, ``"pctl75"``, ``"mean"``,
+        ``"std"``, ``"cov"``, ``"skew"``, ``"all_positive"``,
+        ``"logmean"``, ``"logstd"``, and ``"geomean"``.
+        Missing values are excluded. The statistics of empty samples,
+        and the log-statistics of samples that are not all positive,
+        are NaN.
+
+    """
+
+    samples = [numpy.asarray(sample, dtype=float) for sample in samples]
+    samples = [numpy.sort(sample[~numpy.isnan(sample)]) for sample in samples]
+    counts = numpy.array([sample.shape[0] for sample in samples], dtype=int)
+    filled = counts > 0
+
+    values = numpy.concatenate(samples) if samples else numpy.empty(0)
+    starts = _group_starts(counts[filled])
+    nonempty = counts[filled]
+
+    stats = pandas.DataFrame(index=pandas.RangeIndex(len(samples)), dtype=float)
+    stats["N"] = counts
+    quantiles = [("min", 0), ("max", 1), ("median", 0.5), ("pctl25", 0.25), ("pctl75", 0.75)]
+    for name, quantile in quantiles:
+        stats.loc[filled, name] = _interpolate(values, starts, nonempty, quantile)
+
+    mean, std, skew = _moments(values, starts, nonempty)
+    stats.loc[filled, "mean"] = mean
+    stats.loc[filled, "std"] = std
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        stats.loc[filled, "cov"] = std / mean
+    stats.loc[filled, "skew"] = skew
+
+    stats["all_positive"] = stats["min"] > 0
+    positive = stats["all_positive"].to_numpy()
+    if positive.any():
+        logged = numpy.log(numpy.concatenate([samples[n] for n in numpy.flatnonzero(positive)]))
+        logmean, logstd, _ = _moments(logged, _group_starts(counts[positive]), counts[positive])
+        stats.loc[positive, "logmean"] = logmean
+        stats.loc[positive, "logstd"] = logstd
+    stats = stats.reindex(columns=stats.columns.union(["logmean", "logstd"], sort=False))
+    return stats.assign(geomean=numpy.exp(stats["logmean"]))
@@ -1,13 +1,21 @@
 import os
+import warnings
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from functools import partial
 
 import numpy
+import pandas
 import matplotlib
 from matplotlib import pyplot
 import seaborn
+import scipy.stats
 from statsmodels.tools.decorators import cache_readonly
 
 import wqio
-from . import bmpdb, utils
+from . import bmpdb, stats, utils
 
 
 def filterlocation(location, count=5, column="bmp"):
@@ -21,11 +29,15 @@ def filterlocation(location, count=5, column="bmp"):
 
 
 class DatasetSummary(object):
-    def __init__(self, dataset, paramgroup, figpath, forcepaths=False):
+    def __init__(self, dataset, paramgroup, figpath, forcepaths=False, location_stats=None):
         self.forcepaths = forcepaths
         self.figpath = figpath
         self.paramgroup = paramgroup
         self.ds = dataset
+
+        # precomputed statistics of the influent and effluent, keyed by
+        # the names of the wqio.Location attributes that they replace
+        self.location_stats = location_stats or {}
         self.parameter = self.ds.definition["parameter"]
         self.parameter.usingTex = True
         self.bmp = self.ds.definition["category"]
@@ -89,6 +101,9 @@ class DatasetSummary(object):
     def stat_fig_name(self, value):
         self._stat_fig_name = value
 
+    def _location_stat(self, location, attribute):
+        return _location_stat(self.ds, location, attribute, self.location_stats)
+
     def _tex_table_row(
         self,
         name,
@@ -132,12 +147,12 @@ class DatasetSummary(object):
                 {name} & \multicolumn{{2}}{{c}} {{{value}}} \\"""
         else:
             valstrings = []
-            for loc in [self.ds.influent, self.ds.effluent]:
-                if loc.include:
+            for location in ["influent", "effluent"]:
+                if getattr(self.ds, location).include:
                     if hasattr(attribute, "append"):
-                        val = [getattr(loc, attr) for attr in attribute]
+                        val = [self._location_stat(location, attr) for attr in attribute]
                     else:
-                        val = getattr(loc, attribute)
+                        val = self._location_stat(location, attribute)
 
                     if val is not None:
                         if twoval:
@@ -404,6 +419,242 @@ class DatasetSummary(object):
         return tablestring
 
 
+def _location_stat(dataset, location, attribute, location_stats=None):
+    """A statistic of the "influent" or "effluent" of a dataset, read
+    from its precomputed *location_stats* (see ``_dataset_stats``) when
+    they have it, and otherwise computed by its ``wqio.Location``.
+    """
+
+    precomputed = (location_stats or {}).get(location, {})
+    if attribute in precomputed:
+        return precomputed[attribute]
+    return getattr(getattr(dataset, location), attribute)
+
+
+def _dataset_conf_intervals(datasets, bootstrap=None, location_stats=None):
+    """Bootstrapped confidence intervals of the medians, means, log-means
+    and geometric means of the influent and effluent of each dataset, all
+    resampled together with ``pybmpdb.stats.bootstrap_intervals``.
+
+    Parameters
+    ----------
+    datasets : list of wqio.Dataset
+    bootstrap : dict, optional
+        Keyword arguments of ``pybmpdb.stats.bootstrap_intervals``.
+    location_stats : list of dicts, optional
+        Precomputed statistics of each dataset (see ``_dataset_stats``),
+        which are used instead of those of the locations.
+
+    Returns
+    -------
+    conf_intervals : list of dicts
+        For each dataset, the intervals of the "influent" and "effluent",
+        keyed by the name of the corresponding ``wqio.Location``
+        attribute.
+
+    """
+
+    options = dict(bootstrap or {})
+    median_seed, mean_seed = numpy.random.SeedSequence(options.pop("seed", None)).spawn(2)
+
+    locations = [
+        (n, location, getattr(ds, location))
+        for n, ds in enumerate(datasets)
+        for location in ["influent", "effluent"]
+    ]
+    locations = [item for item in locations if item[2].include and item[2].hasData]
+    if location_stats is None:
+        location_stats = [None] * len(datasets)
+    positive = [
+        (n, location, loc)
+        for n, location, loc in locations
+        if _location_stat(datasets[n], location, "all_positive", location_stats[n])
+    ]
+
+    medians = stats.bootstrap_intervals(
+        [loc.data for *_, loc in locations], statistic="median", seed=median_seed, **options
+    )
+    means = stats.bootstrap_intervals(
+        [loc.data for *_, loc in locations] + [numpy.log(loc.data) for *_, loc in positive],
+        statistic="mean",
+        seed=mean_seed,
+        **options
+    )
+
+    conf_intervals = [{"influent": {}, "effluent": {}} for _ in datasets]
+    for (n, location, _), median_ci, mean_ci in zip(locations, medians, means):
+        conf_intervals[n][location]["median_conf_interval"] = median_ci
+        conf_intervals[n][location]["mean_conf_interval"] = mean_ci
+
+    for (n, location, _), logmean_ci in zip(positive, means[len(locations) :]):
+        conf_intervals[n][location]["logmean_conf_interval"] = logmean_ci
+        conf_intervals[n][location]["geomean_conf_interval"] = numpy.exp(logmean_ci)
+
+    return conf_intervals
+
+
+def _dataset_stats(datasets, bootstrap=None):
+    """Statistics of the influent and effluent of each dataset, computed
+    for all of the datasets in one vectorized pass (see
+    ``pybmpdb.stats.sample_stats`` and ``_dataset_conf_intervals``). The
+    tables and the plots read them with ``_location_stat``.
+
+    Parameters
+    ----------
+    datasets : list of wqio.Dataset
+    bootstrap : dict, optional
+        Keyword arguments of ``pybmpdb.stats.bootstrap_intervals``.
+
+    Returns
+    -------
+    location_stats : list of dicts
+        For each dataset, the statistics of the "influent" and
+        "effluent", keyed by the name of the corresponding
+        ``wqio.Location`` attribute.
+
+    """
+
+    locations = [
+        (n, location, getattr(ds, location))
+        for n, ds in enumerate(datasets)
+        for location in ["influent", "effluent"]
+    ]
+    locations = [item for item in locations if item[2].include and item[2].hasData]
+    described = stats.sample_stats([loc.data for *_, loc in locations])
+
+    logstats = ["logmean", "logstd", "geomean"]
+    location_stats = [{"influent": {}, "effluent": {}} for _ in datasets]
+    for (n, location, loc), (_, row) in zip(locations, described.iterrows()):
+        record = row.to_dict()
+        record.update(N=int(row["N"]), all_positive=bool(row["all_positive"]))
+        record["ND"] = int(loc.dataframe[loc.cencol].sum())
+        if not record["all_positive"]:
+            record.update(dict.fromkeys(logstats))
+        location_stats[n][location].update(record)
+
+    # the log-means are only bootstrapped for all-positive locations,
+    # which are known from the records
+    conf_intervals = _dataset_conf_intervals(datasets, bootstrap, location_stats)
+    for n, location, loc in locations:
+        location_stats[n][location].update(conf_intervals[n][location])
+
+    return location_stats
+
+
+def _computed_stats(obj):
+    # names of the statistics that a wqio.Location or wqio.Dataset has
+    # computed (and cached), including the ROS of a location's data
+    names = set(getattr(obj, "_cache", {}))
+    if getattr(obj, "_dataframe", None) is not None:
+        names.add("dataframe")
+    return names
+
+
+@contextmanager
+def _count_computed_stats(counts, objects):
+    """Adds the number of times that each statistic is computed by
+    *objects* within the context to the *counts*.
+    """
+
+    before = [_computed_stats(obj) for obj in objects]
+    yield counts
+    for obj, names in zip(objects, before):
+        counts.update(_computed_stats(obj) - names)
+
+
+def _init_figure_worker():
+    # each worker process draws with its own non-interactive backend
+    pyplot.switch_backend("Agg")
+
+
+def _boxplot_stats(ds, location, bacteria, location_stats):
+    """The boxplot statistics of the "influent" or "effluent" of a
+    dataset on a log scale, like ``wqio.Location.boxplot_stats``, with
+    the statistics read by ``_location_stat``.
+    """
+
+    def stat(attribute):
+        return _location_stat(ds, location, attribute, location_stats)
+
+    loc = getattr(ds, location)
+    cilo, cihi = stat("median_conf_interval")
+    bxpstats = {
+        "label": loc.name,
+        "mean": stat("geomean" if bacteria else "mean"),
+        "med": stat("median"),
+        "q1": stat("pctl25"),
+        "q3": stat("pctl75"),
+        "cilo": cilo,
+        "cihi": cihi,
+    }
+    bxpstats.update(
+        wqio.viz.whiskers_and_fliers(
+            numpy.log(loc.data),
+            numpy.log(bxpstats["q1"]),
+            numpy.log(bxpstats["q3"]),
+            transformout=numpy.exp,
+        )
+    )
+    return [bxpstats]
+
+
+def _statplot(ds, ylabel, bacteria, location_stats):
+    """The boxplots and probability plot of
+    ``ds.statplot(ylabel=ylabel, bacteria=bacteria, axtype="prob")``,
+    with the boxplots drawn from the precomputed *location_stats*.
+    """
+
+    fig = pyplot.figure(figsize=(6.40, 3.00), facecolor="none", edgecolor="none")
+    ax1 = pyplot.subplot2grid((1, 4), (0, 0))
+    ax2 = pyplot.subplot2grid((1, 4), (0, 1), colspan=3)
+
+    for location, position in [("influent", 0.5), ("effluent", 1.5)]:
+        loc = getattr(ds, location)
+        wqio.viz.boxplot(
+            _boxplot_stats(ds, location, bacteria, location_stats),
+            ax=ax1,
+            position=position,
+            color=loc.color,
+            marker=loc.plot_marker,
+            patch_artist=False,
+            showmean=True,
+        )
+    ax1.set_yscale("log")
+    ax1.yaxis.set_major_formatter(wqio.viz.log_formatter(use_1x=False))
+    ax1.set_ylabel(ylabel)
+    ax1.set_xlim([0, 2])
+    ax1.set_xticks([0.5, 1.5])
+    ax1.set_xticklabels([ds.influent.name, ds.effluent.name])
+
+    ds.probplot(ax=ax2, axtype="prob", clearYLabels=True, rotateticklabels=True)
+    ax1.yaxis.tick_left()
+    ax2.yaxis.tick_right()
+    fig.subplots_adjust(wspace=0.05)
+    return fig
+
+
+def _render_figures(
+    ds, paramunit, bacteria, statpath, scatterpath, figoptions, location_stats=None
+):
+    """Saves the probability plot and the influent/effluent scatter plot
+    of a dataset, with the precomputed *location_stats* of the dataset
+    (if any) in the boxplots. Module-level so that it can be sent to the
+    worker processes of ``CategoricalSummary.makeReport``.
+    """
+
+    if location_stats is None:
+        statfig = ds.statplot(ylabel=paramunit, bacteria=bacteria, axtype="prob")
+    else:
+        statfig = _statplot(ds, paramunit, bacteria, location_stats)
+    scatterfig = ds.scatterplot(
+        xlabel="Influent " + paramunit, ylabel="Effluent " + paramunit, one2one=True
+    )
+
+    statfig.savefig(statpath, **figoptions)
+    scatterfig.savefig(scatterpath, **figoptions)
+    pyplot.close("all")
+
+
 class CategoricalSummary(object):
     def __init__(
         self,
@@ -415,8 +666,13 @@ class CategoricalSummary(object):
         applyfilters=False,
         filtercount=5,
         filtercolumn="bmp",
+        bootstrap=None,
+        precompute=False,
     ):
         self._cache = {}
+        self._bootstrap = bootstrap
+        self._precompute = precompute
+        self.stat_counts = Counter()
         self._applyfilters = applyfilters
         self.filtercount = filtercount
         self.filtercolumn = filtercolumn
@@ -452,53 +708,96 @@ class CategoricalSummary(object):
 
         return filtered_datasets
 
-    def _make_input_file_IO(self, inputIO, regenfigs=True):
+    @cache_readonly
+    def location_stats(self):
+        # with *precompute*, all of the statistics of the tables and plots
+        # of the datasets are computed in one pass. Otherwise, with
+        # *bootstrap* options, only their confidence intervals are.
+        # Everything else is computed by each wqio.Location.
+        if self._precompute:
+            location_stats = _dataset_stats(self.datasets, self._bootstrap)
+        elif self._bootstrap is not None:
+            location_stats = _dataset_conf_intervals(self.datasets, self._bootstrap)
+        else:
+            return [None] * len(self.datasets)
+
+        self.stat_counts.update(
+            name for dstats in location_stats for stats in dstats.values() for name in stats
+        )
+        return location_stats
+
+    def _make_input_file_IO(self, inputIO, regenfigs=True, n_jobs=None):
 
         figoptions = dict(dpi=600, bbox_inches="tight", transparent=True)
 
         if self.showprogress:
             pbar = utils.ProgressBar(self.datasets)
 
-        old_param = "pure garbage"
-        for n, ds in enumerate(self.datasets, 1):
-            dsum = DatasetSummary(ds, self.paramgroup, self.figpath)
-            new_param = dsum.parameter.name
+        # counts of the statistics computed for this report (in this
+        # process, i.e., not including those of the figure workers)
+        self.stat_counts = Counter()
+        objects = [obj for ds in self.datasets for obj in (ds, ds.influent, ds.effluent)]
+
+        workers = utils.n_workers(n_jobs) if regenfigs else 1
+        with ExitStack() as stack:
+            pool = None
+            if workers > 1:
+                pool = stack.enter_context(
+                    ProcessPoolExecutor(max_workers=workers, initializer=_init_figure_worker)
+                )
+            stack.enter_context(_count_computed_stats(self.stat_counts, objects))
 
-            tabletitle = "Statistics for {} at {} BMPs".format(
-                dsum.parameter.paramunit(), dsum.bmp
-            )
-            latex_input = ""
-            if old_param != new_param:
-                latex_input = "\\section{%s}\n" % dsum.parameter.name
-
-            latex_input += dsum.makeTexInput(tabletitle, subsection=True)
-            latex_input += "\\clearpage\n"
-
-            if regenfigs:
-                statfig = ds.statplot(
-                    ylabel=dsum.parameter.paramunit(),
-                    bacteria=(self.paramgroup == "Bacteria"),
-                    axtype="prob",
+            pending = []
+            old_param = "pure garbage"
+            for n, (ds, dstats) in enumerate(zip(self.datasets, self.location_stats), 1):
+                dsum = DatasetSummary(ds, self.paramgroup, self.figpath, location_stats=dstats)
+                new_param = dsum.parameter.name
+
+                tabletitle = "Statistics for {} at {} BMPs".format(
+                    dsum.parameter.paramunit(), dsum.bmp
                 )
-                scatterfig = ds.scatterplot(
-                    xlabel="Influent " + dsum.parameter.paramunit(),
-                    ylabel="Effluent " + dsum.parameter.paramunit(),
-                    one2one=True,
+                latex_input = ""
+                if old_param != new_param:
+                    latex_input = "\\section{%s}\n" % dsum.parameter.name
+
+                latex_input += dsum.makeTexInput(tabletitle, subsection=True)
+                latex_input += "\\clearpage\n"
+                old_param = new_param
+
+                figures = (
+                    ds,
+                    dsum.parameter.paramunit(),
+                    self.paramgroup == "Bacteria",
+                    os.path.join(self.basepath, dsum.stat_fig_name),
+                    os.path.join(self.basepath, dsum.scatter_fig_name),
+                    figoptions,
+                    # the tables and the plots read the same statistics
+                    dstats,
                 )
 
-                statpath = os.path.join(self.basepath, dsum.stat_fig_name)
-                statfig.savefig(statpath, **figoptions)
+                if pool is not None:
+                    # the statistics of the tables were just computed, so
+                    # they are sent to the worker along with the dataset
+                    pending.append((latex_input, pool.submit(_render_figures, *figures)))
+                    continue
+
+                if regenfigs:
+                    _render_figures(*figures)
 
-                scatterpath = os.path.join(self.basepath, dsum.scatter_fig_name)
-                scatterfig.savefig(scatterpath, **figoptions)
+                inputIO.write(latex_input)
+                pyplot.close("all")
 
-            inputIO.write(latex_input)
-            pyplot.close("all")
+                if self.showprogress:
+                    pbar.animate(n)
 
-            old_param = new_param
+            # the text of each dataset is written, in order, once its
+            # figures are saved (which also raises any error of the worker)
+            for n, (latex_input, future) in enumerate(pending, 1):
+                future.result()
+                inputIO.write(latex_input)
 
-            if self.showprogress:
-                pbar.animate(n)
+                if self.showprogress:
+                    pbar.animate(n)
 
     def _make_report_IO(self, templateIO, inputpath, reportIO, report_title):
         inputname = os.path.basename(inputpath)
@@ -509,11 +808,11 @@ class CategoricalSummary(object):
         reportIO.write(documentstring)
 
     def makeReport(
-        self, templatepath, inputpath, reportpath, report_title, regenfigs=True
+        self, templatepath, inputpath, reportpath, report_title, regenfigs=True, n_jobs=None
     ):
 
         with open(inputpath, "w") as inputIO:
-            self._make_input_file_IO(inputIO, regenfigs=regenfigs)
+            self._make_input_file_IO(inputIO, regenfigs=regenfigs, n_jobs=n_jobs)
 
         with open(templatepath, "r") as templateIO:
             with open(reportpath, "w") as reportIO:
@@ -628,7 +927,147 @@ def _get_fmt(paramgroup):
         return lambda x: "{:.2f}".format(x)
 
 
-def categorical_stats(dc, simple=False):
+def _raw_rescol(dc):
+    """The column of the raw results of a DataCollection. With ROS,
+    ``dc.rescol`` is the column of the substituted results, which is
+    named after the raw column.
+    """
+
+    rescol = dc.roscol[len("ros_") :] if dc.useros else dc.rescol
+    if rescol not in dc.raw_data.columns:
+        raise ValueError(
+            "the raw results of the DataCollection are not in a '{}' column".format(rescol)
+        )
+    return rescol
+
+
+def _tidy_data(dc):
+    """The results of each group of a DataCollection that passes its
+    *filterfxn*, with the ROS estimates of the non-detects when it uses
+    ROS, like ``wqio.DataCollection.tidy``. The groups are substituted
+    one at a time, which does not depend on the version of pandas.
+    """
+
+    rescol = _raw_rescol(dc)
+    data = dc.data.groupby(dc.groupcols).filter(dc.filterfxn)
+    if not dc.useros:
+        columns = dc.groupcols + [rescol, dc.cencol]
+        return data.sort_values(dc.groupcols).reset_index(drop=True).loc[:, columns]
+
+    columns = [rescol, dc.roscol, dc.cencol]
+    groups = []
+    for keys, group in data.groupby(dc.groupcols, observed=True):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            ros = wqio.ROS(df=group, result=rescol, censorship=dc.cencol, as_array=False)
+        ros = ros.rename(columns={"final": dc.roscol}).loc[:, columns]
+        groups.append(ros.assign(**dict(zip(dc.groupcols, keys))))
+    if not groups:
+        return pandas.DataFrame(columns=dc.groupcols + columns)
+    return pandas.concat(groups, ignore_index=True).loc[:, dc.groupcols + columns]
+
+
+def _station_stats(dc, seed=None, bootstrap=None, tidy=None):
+    """Counts, quartiles, and medians (with their bootstrapped confidence
+    intervals) of each station (columns) and group (rows) of a
+    DataCollection, from its *tidy* data (computed if not given).
+    """
+
+    if tidy is None:
+        tidy = _tidy_data(dc)
+    options = dict(niter=dc.bsiter)
+    options.update(bootstrap or {})
+    cis = stats.grouped_bootstrap(
+        tidy, dc.groupcols, dc.rescol, statistic="median", seed=seed, **options
+    )
+    return (
+        stats.grouped_quantiles(tidy, dc.groupcols, dc.rescol, percentiles=[25, 50, 75])
+        .loc[:, ["count", "pctl 25", "pctl 50", "pctl 75"]]
+        .rename(columns={"count": "Count", "pctl 50": "median"})
+        .join(cis.loc[:, ["lower", "upper"]])
+        .unstack(level=dc.stationcol)
+        .swaplevel(axis="columns")
+        .rename_axis(["station", "result"], axis="columns")
+    )
+
+
+def _compare(x, y, testfxn):
+    # like wqio, no p-value when the two samples are identical
+    if len(x) == len(y) and numpy.equal(x, y).all():
+        return numpy.nan
+    return testfxn(x, y).pvalue
+
+
+def _inflow_outflow_tests(dc, tidy=None):
+    """P-values of the Mann-Whitney test (of the *tidy* results, computed
+    if not given) and of the Wilcoxon test (of the paired raw results) of
+    the differences between the inflow and outflow of each group of a
+    DataCollection, computed like ``dc.mann_whitney`` and
+    ``dc.wilcoxon``. Groups without inflow or outflow results are left
+    out.
+    """
+
+    rescol = _raw_rescol(dc)
+    groupcols = dc.groupcols_comparison
+    if tidy is None:
+        tidy = _tidy_data(dc)
+    paired = (
+        dc.data.groupby(dc.groupcols)
+        .filter(dc.filterfxn)
+        .set_index(dc.pairgroups)[rescol]
+        .unstack(level=dc.stationcol)
+    )
+
+    mann_whitney = {}
+    for name, group in tidy.groupby(groupcols):
+        inflow = group.loc[group[dc.stationcol] == "inflow", dc.rescol].to_numpy()
+        outflow = group.loc[group[dc.stationcol] == "outflow", dc.rescol].to_numpy()
+        if len(inflow) and len(outflow):
+            mann_whitney[name] = _compare(
+                inflow, outflow, partial(scipy.stats.mannwhitneyu, alternative="two-sided")
+            )
+
+    wilcoxon = {}
+    if {"inflow", "outflow"}.issubset(paired.columns):
+        for name, group in paired.groupby(level=groupcols):
+            pairs = group.loc[:, ["inflow", "outflow"]].dropna()
+            wilcoxon[name] = _compare(
+                pairs["inflow"].to_numpy(), pairs["outflow"].to_numpy(), scipy.stats.wilcoxon
+            )
+
+    return pandas.Series(mann_whitney, dtype=float), pandas.Series(wilcoxon, dtype=float)
+
+
+def _intervals_overlap(interval1, interval2):
+    # row-wise, like wqio.utils.check_interval_overlap(..., axis=1)
+    return (interval2.min(axis=1) <= interval1.max(axis=1)) & (
+        interval1.min(axis=1) <= interval2.max(axis=1)
+    )
+
+
+def _symbolize_bools(df, true_symbol, false_symbol, other_symbol, join_char):
+    # like wqio.utils.symbolize_bools, with Series.map
+    symbols = {True: true_symbol, False: false_symbol}
+    return df.apply(lambda col: col.map(lambda x: symbols.get(x, other_symbol))).apply(
+        join_char.join, axis=1
+    )
+
+
+def _stats_table(dc, seed=None, bootstrap=None):
+    tidy = _tidy_data(dc)
+    station_stats = _station_stats(dc, seed=seed, bootstrap=bootstrap, tidy=tidy)
+    mann_whitney, wilcoxon = _inflow_outflow_tests(dc, tidy=tidy)
+
+    def result(name):
+        return station_stats.xs(name, level="result", axis="columns", drop_level=False)
+
+    medians = station_stats.reindex(
+        columns=pandas.MultiIndex.from_product(
+            [station_stats.columns.unique(level="station"), ["lower", "median", "upper"]],
+            names=["station", "result"],
+        )
+    )
+
     return (
         dc.data.loc[:, dc.groupcols + ["bmp_id"]]
         .drop_duplicates()
@@ -639,28 +1078,16 @@ def categorical_stats(dc, simple=False):
         .astype(int)
         .pipe(wqio.utils.add_column_level, "BMPs", "result")
         .swaplevel(axis="columns")
-        .join(dc.count.fillna(0).astype(int))
-        .join(dc.percentile(25).round(2))
-        .join(dc.median.round(2))
-        .join(dc.percentile(75).round(2))
+        .join(result("Count").fillna(0).astype(int))
+        .join(result("pctl 25").round(2))
+        .join(medians.round(2))
+        .join(result("pctl 75").round(2))
         .pipe(wqio.utils.flatten_columns)
+        .assign(diff_medianci=~_intervals_overlap(medians["inflow"], medians["outflow"]))
+        .assign(diff_mannwhitney=mann_whitney < 0.05)
+        .assign(diff_wilcoxon=wilcoxon < 0.05)
         .assign(
-            diff_medianci=~wqio.utils.checkIntervalOverlap(
-                dc.median["inflow"], dc.median["outflow"], axis=1, oneway=False
-            )
-        )
-        .assign(
-            diff_mannwhitney=(dc.mann_whitney["pvalue"] < 0.05).xs(
-                ("inflow", "outflow"), level=["station_1", "station_2"]
-            )
-        )
-        .assign(
-            diff_wilcoxon=(dc.wilcoxon["pvalue"] < 0.05).xs(
-                ("inflow", "outflow"), level=["station_1", "station_2"]
-            )
-        )
-        .assign(
-            diff_symbol=lambda df: wqio.utils.symbolize_bools(
+            diff_symbol=lambda df: _symbolize_bools(
                 df.loc[:, lambda df: df.columns.map(lambda c: c.startswith("diff"))],
                 true_symbol="◆",
                 false_symbol="◇",
@@ -671,3 +1098,147 @@ def categorical_stats(dc, simple=False):
         .pipe(wqio.utils.expand_columns, sep="_", names=["result", "value"])
         .swaplevel(axis="columns")
     )
+
+
+def _collection_options(dc):
+    """The options that *dc* was created with, from its public attributes.
+    The station and parameter columns are left out of the pair groups
+    (the constructor adds them back).
+    """
+
+    return dict(
+        rescol=_raw_rescol(dc),
+        qualcol=dc.qualcol,
+        stationcol=dc.stationcol,
+        paramcol=dc.paramcol,
+        ndval=dc.ndval,
+        othergroups=dc.othergroups,
+        pairgroups=[col for col in dc.pairgroups if col not in (dc.stationcol, dc.paramcol)],
+        useros=dc.useros,
+        filterfxn=dc.filterfxn,
+        bsiter=dc.bsiter,
+        showpbar=dc.showpbar,
+    )
+
+
+def _shard_parameters(sizes, nshards):
+    """Splits the parameters into at most *nshards* lists of parameters
+    with roughly the same number of rows. Parameters are assigned largest
+    first to the shard with the fewest rows.
+
+    Parameters
+    ----------
+    sizes : pandas.Series
+        Number of rows of each parameter, indexed by parameter.
+    nshards : int
+
+    Returns
+    -------
+    shards : list of lists of str
+
+    """
+
+    loads = numpy.zeros(nshards, dtype=int)
+    shards = [[] for _ in range(nshards)]
+    for parameter, size in sizes.sort_values(ascending=False, kind="stable").items():
+        shard = loads.argmin()
+        shards[shard].append(parameter)
+        loads[shard] += size
+    return [shard for shard in shards if shard]
+
+
+def _in_parameters(df, paramcol, parameters):
+    # the parameter may be a level of the index or a column
+    values = df.index.get_level_values(paramcol) if paramcol in df.index.names else df[paramcol]
+    return numpy.asarray(values.isin(parameters))
+
+
+def _parameter_seed(seed, parameter):
+    # stable across processes, unlike hash()
+    return zlib.crc32("{}|{}".format(seed, parameter).encode("utf-8"))
+
+
+def _parameter_stats(raw_data, options, parameters, seed=None, bootstrap=None):
+    """Stats tables of each of *parameters*, from a DataCollection of
+    each parameter's data. With a *seed*, the bootstrapped confidence
+    intervals of each parameter are reproducible, regardless of the
+    other parameters and the process in which they are computed.
+    """
+
+    tables = []
+    for parameter in parameters:
+        data = raw_data.loc[_in_parameters(raw_data, options["paramcol"], [parameter])]
+        dc = wqio.DataCollection(data, **options)
+        pseed = None if seed is None else _parameter_seed(seed, parameter)
+        tables.append(_stats_table(dc, seed=pseed, bootstrap=bootstrap))
+    return pandas.concat(tables)
+
+
+def categorical_stats(dc, simple=None, n_jobs=None, seed=None, bootstrap=None):
+    """Table of the counts, quartiles and median confidence intervals of
+    each station, and of the significance of the differences between the
+    inflow and outflow (median CIs, Mann-Whitney and Wilcoxon tests) of
+    each parameter and category.
+
+    Parameters
+    ----------
+    dc : wqio.DataCollection
+        E.g., from ``pybmpdb.load_data``.
+    simple : bool, optional
+        Deprecated and not used.
+    n_jobs : int, optional
+        Number of worker processes. The data are sharded by parameter
+        (with about the same number of rows in each shard) and the stats
+        of each shard are computed in their own process. None or 1 computes
+        everything in the current process, -1 uses all CPUs. The
+        *filterfxn* of *dc* must be picklable.
+    seed : int, optional
+        Seed of the bootstrapped confidence intervals of the medians.
+        Each parameter gets its own seed, so that the results are the
+        same for any *n_jobs*. Without a seed, the intervals are random
+        and only the other statistics are reproducible.
+    bootstrap : dict, optional
+        Options of the confidence intervals, passed on to
+        ``pybmpdb.stats.grouped_bootstrap`` (e.g., *method* and
+        *max_memory*). The number of iterations defaults to the *bsiter*
+        of *dc*.
+
+    Returns
+    -------
+    stats : pandas.DataFrame
+
+    """
+
+    if simple is not None:
+        warnings.warn(
+            "the 'simple' argument of categorical_stats is deprecated and has no effect",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+
+    workers = utils.n_workers(n_jobs)
+    options = _collection_options(dc)
+    sizes = dc.data[dc.paramcol].value_counts()
+    if workers <= 1:
+        return _parameter_stats(
+            dc.raw_data, options, sizes.index.tolist(), seed=seed, bootstrap=bootstrap
+        ).sort_index()
+
+    shards = _shard_parameters(sizes, workers)
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        futures = [
+            pool.submit(
+                _parameter_stats,
+                dc.raw_data.loc[_in_parameters(dc.raw_data, dc.paramcol, shard)],
+                options,
+                shard,
+                seed=seed,
+                bootstrap=bootstrap,
+            )
+            for shard in shards
+        ]
+        tables = [future.result() for future in futures]
+
+    # each group only involves one parameter, so the tables of the shards
+    # only need to be put back in the order of the groups
+    return pandas.concat(tables).sort_index()
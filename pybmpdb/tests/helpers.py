@@ -0,0 +1,85 @@
+import numpy
+import pandas
+
+
+def make_raw_data(nsites=12, seed=0):
+    """ Synthetic export of the BMP Database with the columns that
+    ``pybmpdb.bmpdb._clean_raw_data`` relies on. Each site gets one or
+    two BMPs with a handful of storms, inflow and outflow stations (and
+    sometimes subsurface and reference outflow stations), six
+    parameters, and a mix of sample types and qualifiers.
+    """
+    rs = numpy.random.RandomState(seed)
+    categories = [
+        ("Bioretention", "BR"),
+        ("Retention Pond", "RP"),
+        ("Wetland Basin", "WB"),
+        ("Grass Swale", "BS"),
+        ("Media Filter", "MF"),
+        ("Porous Pavement", "PF"),
+    ]
+    params = [
+        ("Total Suspended Solids", "Solids", "mg/L", 50.0),
+        ("Copper, Total", "Metals", "ug/L", 15.0),
+        ("Zinc, Total", "Metals", "mg/L", 0.1),
+        ("Nitrogen, Nitrate (NO3) as N", "Nutrients", "mg/L", 0.5),
+        ("Nitrogen, Nitrite (NO2) + Nitrate (NO3) as N", "Nutrients", "mg/L", 0.6),
+        ("Fecal Coliform", "Biological", "MPN/100 mL", 5000.0),
+    ]
+    sampletypes = ["Composite - Flow Weighted", "Grab", "EMC Flow Weighted", "Other"]
+    rows = []
+    for s in range(nsites):
+        category, bmptype = categories[s % len(categories)]
+        state = ["CA", "OR", "TX", "NC"][s % 4]
+        for b in range(1 + s % 2):
+            bmp_id = 100 * (s + 1) + b
+            stations = ["inflow", "outflow"]
+            if s % 3 == 0:
+                stations.append("subsurface")
+            if s % 4 == 1:
+                stations.append("reference outflow")
+            for storm in range(1, rs.randint(3, 9)):
+                date = pandas.Timestamp("2005-01-01") + pandas.Timedelta(days=int(rs.randint(0, 4000)))
+                time = "{:02d}:{:02d}".format(rs.randint(0, 24), rs.randint(0, 60))
+                sampletype = sampletypes[rs.choice(4, p=[0.6, 0.25, 0.1, 0.05])]
+                for station in stations:
+                    if rs.rand() < 0.15:
+                        continue
+                    for param, group, units, scale in params:
+                        if rs.rand() < 0.1:
+                            continue
+                        res = rs.lognormal(numpy.log(scale), 0.75)
+                        qual = rs.choice(["=", "U", "UJ", " K ", None], p=[0.7, 0.1, 0.05, 0.05, 0.1])
+                        record = {
+                            "category": category,
+                            "epazone": (s % 9) + 1,
+                            "state": state,
+                            "site": "Site {}".format(s),
+                            "bmp": "BMP {}-{}".format(s, b),
+                            "station": station.title(),
+                            "storm": storm,
+                            "sampletype": sampletype,
+                            "watertype": "Surface Runoff/Flow",
+                            "paramgroup": group,
+                            "units": units,
+                            "parameter": param,
+                            "fraction": "Total",
+                            "wq_initialscreen": rs.choice(["Yes", "INC", "No"], p=[0.8, 0.15, 0.05]),
+                            "ms_indivscreen": rs.choice(["Yes", "y"]),
+                            "wq_catscreen": rs.choice(["Yes", "EXC"], p=[0.9, 0.1]),
+                            "bmptype": bmptype,
+                            "ws_id": 1000 + s,
+                            "site_id": 2000 + s,
+                            "bmp_id": bmp_id,
+                            "dot_type": "Not Applicable",
+                            "ms": "MS {} {}".format(bmp_id, station),
+                            "res": res if rs.rand() > 0.02 else numpy.nan,
+                            "qual": qual,
+                            "DL": res * rs.choice([0.5, 1.0, 2.0]),
+                            "sampledate": date if rs.rand() > 0.02 else pandas.NaT,
+                            "sampletime": time if rs.rand() > 0.05 else None,
+                        }
+                        rows.append(record)
+                        if sampletype.startswith("Comp") and rs.rand() < 0.1:
+                            rows.append(dict(record, sampletype="Grab", res=res * 1.1))
+    return pandas.DataFrame(rows)
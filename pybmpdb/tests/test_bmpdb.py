@@ -1,5 +1,8 @@
 import sys
 import os
+import re
+import sqlite3
+import timeit
 import zipfile
 from io import StringIO
 from pkg_resources import resource_filename
@@ -7,6 +10,9 @@ from urllib import request
 from pathlib import Path
 
 from unittest.mock import patch
+from functools import partial
+from contextlib import closing
+
 import pytest
 import numpy.testing as nptest
 import pandas.testing as pdtest
@@ -15,13 +21,27 @@ import numpy
 import pandas
 
 from pybmpdb import bmpdb
+from pybmpdb.tests.helpers import make_raw_data
 import wqio
 
 
+requires_pyarrow = pytest.mark.skipif(bmpdb.cache.pyarrow is None, reason="pyarrow not installed")
+
+
 def get_data_file(filename):
     return resource_filename("pybmpdb.tests._data", filename)
 
 
+@pytest.fixture(scope="module")
+def raw_data():
+    return make_raw_data()
+
+
+@pytest.fixture(scope="module")
+def clean_data(raw_data):
+    return bmpdb._clean_raw_data(raw_data)
+
+
 @pytest.fixture
 def df_for_quals():
     df = pandas.DataFrame(
@@ -53,6 +73,79 @@ def test__handle_ND_qualifiers(df_for_quals):
     nptest.assert_array_equal(result, expected)
 
 
+def test__nd_kernel(df_for_quals):
+    factors, is_ND = bmpdb._nd_kernel(df_for_quals["qual"], df_for_quals["res"], df_for_quals["DL"])
+    nptest.assert_array_equal(factors, bmpdb._handle_ND_factors(df_for_quals))
+    nptest.assert_array_equal(numpy.where(is_ND, "ND", "="), bmpdb._handle_ND_qualifiers(df_for_quals))
+
+    factors, is_ND = bmpdb._nd_kernel(
+        ["J", None, "UJ", "U"], [1.0, 1.0, 5.0, 2.0], [2.0, 2.0, 10.0, 4.0], factor_quals=["J"], nd_correction=3
+    )
+    nptest.assert_array_equal(factors, [3.0, 1.0, 2.0, 1.0])
+    nptest.assert_array_equal(is_ND, [False, False, True, True])
+
+
+def test__apply_ND_handling(df_for_quals):
+    # 0.3 * (0.7 / 0.3) rounds to slightly more than 0.7, so the scaled UJ
+    # result is a detect, as when the results are scaled then requalified
+    df = pandas.DataFrame({"res": [0.3, 1.0, 5.0, 0.2], "DL": [0.7, 2.0, 1.0, 0.4], "qual": ["UJ", "U", "UJ", "UJ"]})
+    result = bmpdb._apply_ND_handling(df, nd_correction=2)
+    nptest.assert_array_almost_equal(result["res"], [0.7, 2.0, 5.0, 0.4])
+    nptest.assert_array_equal(result["qual"], ["=", "ND", "=", "ND"])
+    nptest.assert_array_equal(result["DL"], df["DL"])
+
+    for data in [df, df_for_quals]:
+        expected = data.assign(res=lambda df: df["res"] * bmpdb._handle_ND_factors(df)).assign(
+            qual=lambda df: bmpdb._handle_ND_qualifiers(df)
+        )
+        pdtest.assert_frame_equal(bmpdb._apply_ND_handling(data), expected)
+
+
+def _selector_nd_reference(df):
+    # the selector-based implementation that the kernel replaced
+    normal_ND = [df["qual"].isin(["U", "UK", "UA", "UC", "K"]), 2.0]
+    weird_UJ = [(df["qual"] == "UJ") & (df["res"] < df["DL"]), df["DL"] / df["res"]]
+    factors = wqio.utils.selector(1, normal_ND, weird_UJ)
+    is_ND = df["qual"].isin(["U", "UA", "UI", "UC", "UK", "K"]) | ((df["qual"] == "UJ") & (df["res"] <= df["DL"]))
+    return factors, numpy.asarray(is_ND)
+
+
+@pytest.fixture(scope="module")
+def nd_rows():
+    rs = numpy.random.RandomState(0)
+    N = 200000
+    return pandas.DataFrame(
+        {
+            "qual": rs.choice(["=", "U", "UJ", "K", "UI", "J"], size=N),
+            "res": rs.lognormal(size=N),
+            "DL": rs.lognormal(size=N),
+        }
+    )
+
+
+def test__nd_kernel_reference(nd_rows):
+    ref_factors, ref_ND = _selector_nd_reference(nd_rows)
+    factors, is_ND = bmpdb._nd_kernel(nd_rows["qual"], nd_rows["res"], nd_rows["DL"])
+
+    nptest.assert_array_equal(factors, ref_factors)
+    nptest.assert_array_equal(is_ND, ref_ND)
+
+
+@pytest.mark.skipif(not os.environ.get("PYBMPDB_BENCHMARKS"), reason="set PYBMPDB_BENCHMARKS=1 to run")
+def test__nd_kernel_benchmark(nd_rows):
+    # opt-in: PYBMPDB_BENCHMARKS=1 python -m pytest -s -k benchmark
+    timings = {}
+    for name, fxn in [
+        ("reference", lambda: _selector_nd_reference(nd_rows)),
+        ("kernel", lambda: bmpdb._nd_kernel(nd_rows["qual"], nd_rows["res"], nd_rows["DL"])),
+    ]:
+        timings[name] = min(timeit.repeat(fxn, number=1, repeat=5))
+
+    message = "\n_nd_kernel on {} rows: {:.1f} ms (reference: {:.1f} ms)"
+    print(message.format(nd_rows.shape[0], timings["kernel"] * 1000, timings["reference"] * 1000))
+    assert timings["kernel"] < timings["reference"]
+
+
 def test__process_screening():
     df = pandas.DataFrame({"screen": ["Yes", "INC", "No", "eXC", "junk"]})
     expected = numpy.array(["yes", "yes", "no", "no", "invalid"])
@@ -67,6 +160,36 @@ def test__process_sampletype():
     nptest.assert_array_equal(result, expected)
 
 
+@pytest.mark.parametrize("datetype", ["datetime", "string"])
+def test__make_timestamps(datetype):
+    dates = ["2012-05-06", None, "2013-01-02", "2014-03-04", "2015-06-07", "2016-01-01"]
+    if datetype == "datetime":
+        dates = pandas.to_datetime(dates)
+    else:
+        dates[2] = "junk"
+
+    df = pandas.DataFrame(
+        {
+            "sampledate": dates,
+            "sampletime": ["14:30", "07:15:30", None, "junk", "2:05 PM", numpy.nan],
+        }
+    )
+    expected = pandas.Series(
+        pandas.to_datetime(
+            [
+                "2012-05-06 14:30",
+                "1901-01-01 07:15:30",
+                "2013-01-02 00:00" if datetype == "datetime" else "1901-01-01 00:00",
+                "2014-03-04 00:00",
+                "2015-06-07 14:05",
+                "2016-01-01 00:00",
+            ]
+        )
+    )
+    result = bmpdb._make_timestamps(df, "sampledate", "sampletime")
+    pdtest.assert_series_equal(result, expected, check_names=False)
+
+
 def test__check_levelnames():
     bmpdb._check_levelnames(["epazone", "category"])
 
@@ -77,7 +200,662 @@ def test__check_levelnames():
 @patch.object(pandas, "read_csv")
 def test_load_data(read_csv):
     bmpdb.load_data("bmp.csv")
-    read_csv.assert_called_once_with(Path("bmp.csv"), parse_dates=["sampledate"], encoding="utf-8")
+    read_csv.assert_called_once_with(
+        Path("bmp.csv"), parse_dates=["sampledate"], encoding="utf-8", usecols=bmpdb._raw_columns()
+    )
+
+
+def test__raw_columns():
+    assert "ms" not in bmpdb._raw_columns()
+    assert "fraction" not in bmpdb._raw_columns()
+    assert "state" in bmpdb._raw_columns()
+
+    result = bmpdb._raw_columns(["state"])
+    assert "state" in result
+    assert "epazone" not in result
+    assert set(bmpdb._required_row_headers) - set(result) == {"fraction"}
+
+    with pytest.raises(ValueError):
+        bmpdb._raw_columns(["junk"])
+
+
+def test__select_rows():
+    df = pandas.DataFrame(
+        {"res": [1.0, 2.0, 3.0, 4.0]},
+        index=pandas.MultiIndex.from_arrays([list("AABB"), list("xyxy")], names=["site", "parameter"]),
+    ).reset_index("site")
+    assert bmpdb._select_rows(df, None) is df
+
+    result = bmpdb._select_rows(df, [[("site", "in", ["A"]), ("parameter", "not in", ["y"])]])
+    assert result["res"].tolist() == [1.0]
+
+    result = bmpdb._select_rows(df, [[("site", "in", ["A"])], [("parameter", "in", ["y"])]])
+    assert result["res"].tolist() == [1.0, 2.0, 4.0]
+
+
+@pytest.mark.parametrize("chunksize", [None, 50])
+def test__load_raw_data_pushdown(raw_data, raw_csv, chunksize):
+    filters = [[("parameter", "in", ["Zinc, Total"]), ("category", "in", ["Bioretention", "Grass Swale"])]]
+    result = bmpdb._load_raw_data(raw_csv, chunksize=chunksize, columns=["state"], filters=filters)
+    if chunksize is not None:
+        result = pandas.concat(list(result), ignore_index=True)
+    assert result.columns.tolist() == bmpdb._raw_columns(["state"])
+
+    expected = raw_data.loc[
+        raw_data["parameter"].eq("Zinc, Total") & raw_data["category"].isin(["Bioretention", "Grass Swale"]),
+        result.columns,
+    ].reset_index(drop=True)
+    pdtest.assert_frame_equal(result, expected, check_dtype=False)
+
+
+@pytest.fixture
+def raw_db(raw_data):
+    # table with the names of the columns of the MS Access database
+    sql = bmpdb._default_sql("bmpdb")
+    aliases = dict(re.findall(r"\[src\]\.\[(.+?)\] as \[(.+?)\]", sql))
+    names = {bmpdb._sql_column_names.get(alias, alias): source for source, alias in aliases.items()}
+    table = raw_data.drop(columns=["dot_type"]).rename(columns=names)
+    for source in set(aliases) - set(table.columns):
+        table[source] = "junk"
+    with closing(sqlite3.connect(":memory:")) as connection:
+        table.to_sql("bmpdb", connection, index=False)
+        yield connection
+
+
+@pytest.mark.parametrize("chunksize", [None, 500])
+def test__load_raw_sql(raw_db, raw_data, chunksize):
+    filters = [[("parameter", "in", ["Zinc, Total"])]]
+    result = bmpdb._load_raw_sql(raw_db, "bmpdb", chunksize=chunksize, columns=["state"], filters=filters)
+    if chunksize is not None:
+        result = list(result)
+        assert len(result) > 1
+        result = pandas.concat(result, ignore_index=True)
+    assert result.columns.tolist() == bmpdb._raw_columns(["state"])
+
+    cols = ["bmp", "storm", "station", "sampletype", "res"]
+    expected = raw_data.loc[raw_data["parameter"].eq("Zinc, Total"), result.columns]
+    pdtest.assert_frame_equal(
+        result.sort_values(cols).reset_index(drop=True),
+        expected.sort_values(cols).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+@pytest.mark.parametrize("chunksize", [None, 500])
+def test_load_data_sql(raw_db, raw_csv, chunksize):
+    options = dict(minstorms=2, minbmps=1, as_dataframe=True, categories=["Bioretention"])
+    expected = bmpdb.load_data(raw_csv, **options)
+    sql = bmpdb.LoadOptions(connection=raw_db, table="bmpdb", chunksize=chunksize)
+    result = bmpdb.load_data(options=sql, **options)
+    pdtest.assert_frame_equal(result, expected)
+
+    with pytest.raises(ValueError):
+        bmpdb.load_data(raw_csv, options=sql, **options)
+
+
+def test__clean_raw_data_columns(raw_csv):
+    # both from the CSV, since the results and DLs read back from it can
+    # differ in their last bits, which can requalify scaled UJ results
+    clean_data = bmpdb._load_raw_data(raw_csv).pipe(bmpdb._clean_raw_data)
+    result = bmpdb._load_raw_data(raw_csv, columns=["state"]).pipe(bmpdb._clean_raw_data)
+    dropped = [h for h in bmpdb._row_headers if h not in bmpdb._required_row_headers and h != "state"]
+    assert result.index.names == [h for h in bmpdb._row_headers if h not in dropped] + ["sampledatetime"]
+    pdtest.assert_frame_equal(result, clean_data.droplevel(dropped).sort_index())
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_load_data_selectors(raw_csv, tmp_path, cached):
+    if cached and bmpdb.cache.pyarrow is None:
+        pytest.skip("pyarrow not installed")
+
+    cachedir = tmp_path if cached else None
+    options = dict(minstorms=2, minbmps=1, as_dataframe=True, options=bmpdb.LoadOptions(cachedir=cachedir))
+    full = bmpdb.load_data(raw_csv, **options)
+    selections = [
+        dict(parameters=["Nitrogen, NOx as N", "Zinc, Total"], categories=["Wetland Basin/Retention Pond"]),
+        dict(categories=["Permeable Friction Course", "Bioretention"], paramgroups=["Metals"]),
+        dict(paramgroups=["Nutrients"], excluded_bmps=["BMP 0-0"]),
+    ]
+    for selection in selections:
+        expected = full
+        for key, level in [("parameters", "parameter"), ("categories", "category"), ("paramgroups", "paramgroup")]:
+            if key in selection:
+                expected = expected.loc[expected.index.get_level_values(level).isin(selection[key])]
+        if "excluded_bmps" in selection:
+            expected = bmpdb.load_data(raw_csv, excluded_bmps=selection["excluded_bmps"], **options)
+            expected = expected.loc[expected.index.get_level_values("paramgroup").isin(selection["paramgroups"])]
+
+        result = bmpdb.load_data(raw_csv, **selection, **options)
+        assert result.shape[0] > 0
+        pdtest.assert_frame_equal(result, expected)
+
+    result = bmpdb.load_data(raw_csv, columns=["state"], **options)
+    assert "state" in result.index.names
+    assert "epazone" not in result.index.names
+    assert result.shape[0] > 0
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_load_data_selectors_balanced_only(raw_data, tmp_path, cached):
+    if cached and bmpdb.cache.pyarrow is None:
+        pytest.skip("pyarrow not installed")
+
+    # copper is only monitored at the inflow, so none of its BMPs are balanced
+    csvfile = tmp_path / "bmpdata.csv"
+    raw_data.loc[(raw_data["parameter"] != "Copper, Total") | (raw_data["station"] == "Inflow")].to_csv(
+        csvfile, index=False, encoding="utf-8"
+    )
+    cachedir = tmp_path / "cache" if cached else None
+    options = dict(
+        minstorms=2, minbmps=1, balanced_only=True, as_dataframe=True, options=bmpdb.LoadOptions(cachedir=cachedir)
+    )
+    full = bmpdb.load_data(csvfile, **options)
+    expected = full.loc[full.index.get_level_values("paramgroup") == "Metals"]
+
+    result = bmpdb.load_data(csvfile, paramgroups=["Metals"], **options)
+    pdtest.assert_frame_equal(result, expected)
+
+    result = bmpdb.load_data(csvfile, parameters=["Copper, Total"], **options)
+    assert result.shape[0] == 0
+
+
+@pytest.mark.skipif(bmpdb.cache.pyarrow is None, reason="pyarrow not installed")
+def test__load_cleaned_data_cache(tmp_path, caplog):
+    csvfile = tmp_path / "bmpdata.csv"
+    csvfile.write_text(",".join(bmpdb._raw_columns()) + "\n")
+    cleaned = pandas.DataFrame({"site": ["A", "B"], "res": [1.0, 2.0], "qual": ["=", "ND"]}).set_index("site")
+
+    with patch.object(bmpdb, "_clean_raw_data", return_value=cleaned) as clean, caplog.at_level("INFO"):
+        options = bmpdb.LoadOptions(cachedir=tmp_path / "cache")
+        first = bmpdb._load_cleaned_data(csvfile, options=options)
+        second = bmpdb._load_cleaned_data(csvfile, options=options)
+        assert clean.call_count == 1
+
+        bmpdb.cache.invalidate(tmp_path / "cache")
+        bmpdb._load_cleaned_data(csvfile, options=options)
+        assert clean.call_count == 2
+
+    pdtest.assert_frame_equal(first, cleaned)
+    pdtest.assert_frame_equal(second, cleaned)
+    messages = [r.getMessage() for r in caplog.records if r.name == bmpdb._logger.name]
+    assert [m.split()[3] for m in messages] == ["miss", "hit", "miss"]
+
+
+def test__clean_raw_data_compact(raw_data, clean_data):
+    result = bmpdb._clean_raw_data(raw_data, compact=True)
+    for level in ["category", "site", "bmp", "station", "sampletype", "units", "parameter"]:
+        assert isinstance(result.index.get_level_values(level), pandas.CategoricalIndex)
+    pdtest.assert_frame_equal(bmpdb._expand_index(result), clean_data)
+
+
+def test__prepare_for_summary_compact(clean_data):
+    options = dict(minstorms=2, minbmps=1)
+    expected = bmpdb._prepare_for_summary(clean_data, **options)
+    result = bmpdb._prepare_for_summary(bmpdb._maybe_compact_index(clean_data, True), compact=True, **options)
+    for level in ["category", "bmp", "parameter", "station"]:
+        assert isinstance(result.index.get_level_values(level), pandas.CategoricalIndex)
+    pdtest.assert_frame_equal(bmpdb._expand_index(result), expected)
+
+
+@requires_pyarrow
+@pytest.mark.parametrize("compact", [False, True])
+def test__clean_raw_data_arrow(raw_data, clean_data, compact):
+    result = bmpdb._clean_raw_data(raw_data, compact=compact, dtype_backend="pyarrow")
+    for level in ["category", "site", "bmp", "station", "sampletype", "units", "parameter"]:
+        values = result.index.get_level_values(level)
+        if compact:
+            assert values.categories.dtype == bmpdb._arrow_string
+        else:
+            assert values.dtype == bmpdb._arrow_string
+    pdtest.assert_frame_equal(bmpdb._expand_index(result), clean_data)
+
+
+@requires_pyarrow
+def test__prepare_for_summary_arrow(clean_data):
+    options = dict(minstorms=2, minbmps=1)
+    expected = bmpdb._prepare_for_summary(clean_data, **options)
+    cleaned = bmpdb._maybe_arrow_index(clean_data, "pyarrow")
+    result = bmpdb._prepare_for_summary(cleaned, dtype_backend="pyarrow", **options)
+    for level in ["category", "bmp", "parameter", "station"]:
+        assert result.index.get_level_values(level).dtype == bmpdb._arrow_string
+    pdtest.assert_frame_equal(bmpdb._expand_index(result), expected)
+
+
+@requires_pyarrow
+@pytest.mark.parametrize(
+    ("loading", "selection"),
+    [
+        (dict(), dict()),
+        (dict(compact=True), dict()),
+        (dict(chunksize=500), dict()),
+        (dict(), dict(parameters=["Nitrogen, NOx as N"], categories=["Wetland Basin/Retention Pond"])),
+    ],
+)
+def test_load_data_arrow(raw_csv, loading, selection):
+    options = dict(minstorms=2, minbmps=1, as_dataframe=True, **selection)
+    expected = bmpdb.load_data(raw_csv, options=bmpdb.LoadOptions(**loading), **options)
+    result = bmpdb.load_data(raw_csv, options=bmpdb.LoadOptions(dtype_backend="pyarrow", **loading), **options)
+    assert result.index.get_level_values("parameter").dtype != object
+    pdtest.assert_frame_equal(bmpdb._expand_index(result), bmpdb._expand_index(expected))
+
+
+def test_LoadOptions_bad_dtype_backend():
+    with pytest.raises(ValueError):
+        bmpdb.LoadOptions(dtype_backend="arrow")
+
+
+def test_SummaryPlan_explain():
+    plan = bmpdb.SummaryPlan(
+        excluded_bmps=["BMP 1-0"],
+        excluded_params=["Fecal Coliform", "Nitrogen, Nitrate (NO3) as N"],
+    )
+    steps = [step.name for step in plan.steps]
+    assert steps == [
+        "filter",
+        "combine_WB_RP",
+        "fix_PFCs",
+        "remove_grabs",
+        "combine_nox",
+        "filter",
+        "pick_sampletype",
+        "pick_station",
+        "balanced_only",
+        "minstorms",
+        "minbmps",
+    ]
+    lines = plan.explain().splitlines()
+    assert len(lines) == len(steps)
+    assert lines[0] == "1. filter rows: bmp not in ['BMP 1-0'] & parameter not in ['Fecal Coliform']"
+    assert lines[5] == "6. filter rows: parameter not in ['Nitrogen, Nitrate (NO3) as N']"
+
+    plan = bmpdb.SummaryPlan(
+        combine_nox=False,
+        remove_grabs=False,
+        balanced_only=False,
+        minstorms=0,
+        minbmps=0,
+        parameters=["Zinc, Total"],
+        categories=["Bioretention"],
+    )
+    assert [step.name for step in plan.steps] == ["filter", "fix_PFCs", "pick_sampletype", "pick_station", "select"]
+
+
+def test_SummaryPlan_row_filters():
+    assert bmpdb.SummaryPlan().row_filters() is None
+
+    plan = bmpdb.SummaryPlan(
+        parameters=["Nitrogen, NOx as N"],
+        categories=["Wetland Basin/Retention Pond", "Permeable Friction Course"],
+        paramgroups=["Nutrients"],
+        excluded_params=["Nitrogen, Nitrate (NO3) as N", "Lead, Total"],
+    )
+    common = [
+        ("parameter", "not in", ["Lead, Total"]),
+        ("parameter", "in", ["Nitrogen, NOx as N"] + bmpdb._nitro_components),
+        ("paramgroup", "in", ["Nutrients"]),
+    ]
+    categories = ["Wetland Basin/Retention Pond", "Permeable Friction Course"] + bmpdb._wbrp_indiv
+    assert plan.row_filters() == [
+        common + [("category", "in", categories)],
+        common + [("bmptype", "in", ["PF"])],
+    ]
+    assert plan.steps[0].kwargs["filters"] == plan.row_filters()
+
+    plan = bmpdb.SummaryPlan(categories=["Bioretention"], combine_WB_RP=False, fix_PFCs=False)
+    assert plan.row_filters() == [[("category", "in", ["Bioretention"])]]
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        dict(minstorms=2, minbmps=1),
+        dict(minbmps=1, excluded_bmps=["BMP 0-0"], excluded_params=["Nitrogen, Nitrate (NO3) as N"]),
+        dict(minbmps=1, excluded_params=["Nitrogen, NOx as N"], grab_ok_bmps=["Wetland Basin/Retention Pond"]),
+    ],
+)
+@pytest.mark.parametrize(
+    ("parameters", "categories"),
+    [
+        (None, None),
+        (["Zinc, Total"], ["Bioretention"]),
+        (["Nitrogen, NOx as N"], ["Wetland Basin/Retention Pond"]),
+        (["Nitrogen, Nitrate (NO3) as N", "Fecal Coliform"], ["Retention Pond", "Permeable Friction Course"]),
+        (["Copper, Total"], None),
+    ],
+)
+def test_SummaryPlan_matches_full_preparation(clean_data, options, parameters, categories):
+    excluded_bmps = options.get("excluded_bmps", [])
+    excluded_params = options.get("excluded_params", [])
+    expected = (
+        clean_data.pipe(bmpdb._maybe_combine_WB_RP, True)
+        .pipe(bmpdb._maybe_combine_nox, True)
+        .pipe(bmpdb._maybe_fix_PFCs, True)
+        .pipe(bmpdb._maybe_remove_grabs, True, options.get("grab_ok_bmps", "default"))
+        .query("bmp not in @excluded_bmps")
+        .query("parameter not in @excluded_params")
+        .pipe(bmpdb._pick_best_sampletype)
+        .pipe(bmpdb._pick_best_station)
+        .pipe(bmpdb._maybe_filter_onesided_BMPs, True)
+        .pipe(bmpdb._filter_by_storm_count, options.get("minstorms", 3))
+        .pipe(bmpdb._filter_by_BMP_count, options["minbmps"])
+    )
+    if parameters is not None:
+        expected = expected.query("parameter in @parameters")
+    if categories is not None:
+        expected = expected.query("category in @categories")
+
+    plan = bmpdb.SummaryPlan(parameters=parameters, categories=categories, **options)
+    pdtest.assert_frame_equal(plan.execute(clean_data), expected)
+
+
+@pytest.mark.parametrize("selection", [dict(parameters=["Copper, Total"]), dict(paramgroups=["Metals"])])
+def test_SummaryPlan_balanced_only_selection(clean_data, selection):
+    # copper is only monitored at the inflow, so the copper data alone
+    # look balanced, but none of the BMPs have results at every station
+    stations = clean_data.index.get_level_values("station")
+    is_copper = clean_data.index.get_level_values("parameter") == "Copper, Total"
+    data = clean_data.loc[~is_copper | (stations == "inflow")]
+
+    options = dict(minstorms=2, minbmps=1, balanced_only=True)
+    full = bmpdb.SummaryPlan(**options).execute(data)
+    level, values = next(iter(selection.items()))
+    level = {"parameters": "parameter", "paramgroups": "paramgroup"}[level]
+    expected = full.loc[full.index.get_level_values(level).isin(values)]
+
+    plan = bmpdb.SummaryPlan(**options, **selection)
+    result = plan.execute(data)
+    assert plan.stations == ["inflow", "outflow"]
+    assert "Copper, Total" not in result.index.get_level_values("parameter")
+    pdtest.assert_frame_equal(result, expected)
+
+    # with only the rows of the filters, e.g., as read with them
+    selected = bmpdb._select_rows(data, plan.row_filters())
+    pdtest.assert_frame_equal(plan.execute(selected, complete=lambda: data), expected)
+
+
+@pytest.fixture(scope="module")
+def raw_csv(raw_data, tmp_path_factory):
+    csvfile = tmp_path_factory.mktemp("raw") / "bmpdata.csv"
+    raw_data.to_csv(csvfile, index=False, encoding="utf-8")
+    return csvfile
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("chunksize", [97, 5000])
+def test__clean_raw_chunks(raw_csv, chunksize, compact):
+    expected = bmpdb._load_raw_data(raw_csv).pipe(bmpdb._clean_raw_data)
+    chunks = bmpdb._load_raw_data(raw_csv, chunksize=chunksize)
+    result = bmpdb._clean_raw_chunks(chunks, compact=compact, merge_every=3)
+    assert isinstance(result.index.get_level_values("site"), pandas.CategoricalIndex) == compact
+    pdtest.assert_frame_equal(bmpdb._expand_index(result), expected)
+
+
+def test__load_cleaned_data_chunksize(raw_csv):
+    with patch.object(bmpdb, "_clean_raw_chunks") as clean_chunks:
+        bmpdb._load_cleaned_data(raw_csv, options=bmpdb.LoadOptions(chunksize=100))
+        chunks = clean_chunks.call_args[0][0]
+        assert isinstance(chunks, pandas.io.parsers.TextFileReader)
+        assert chunks.chunksize == 100
+
+
+def test__partition_by_site(raw_data):
+    partitions = bmpdb._partition_by_site(raw_data, 5)
+    assert len(partitions) == 5
+    assert sum(len(p) for p in partitions) == len(raw_data)
+
+    sites = [set(p["site"]) for p in partitions]
+    assert sum(len(s) for s in sites) == raw_data["site"].nunique()
+
+    sizes = [len(p) for p in partitions]
+    assert max(sizes) - min(sizes) <= raw_data.groupby("site").size().max()
+
+    assert len(bmpdb._partition_by_site(raw_data.iloc[:3], 5)) == 1
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test__clean_raw_data_n_jobs(raw_data, clean_data, compact):
+    result = bmpdb._clean_raw_data(raw_data, compact=compact, n_jobs=3)
+    assert isinstance(result.index.get_level_values("site"), pandas.CategoricalIndex) == compact
+    pdtest.assert_frame_equal(bmpdb._expand_index(result), clean_data)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        dict(chunksize=100, n_jobs=2),
+        dict(connection="db"),
+        dict(connection="db", table="bmpdb", cachedir="cache"),
+        dict(connection="db", table="bmpdb", memoize=True),
+        dict(incremental=True),
+        dict(incremental=True, cachedir="cache", chunksize=100),
+        dict(validate="some"),
+    ],
+)
+def test_LoadOptions_conflicts(options):
+    with pytest.raises(ValueError):
+        bmpdb.LoadOptions(**options)
+
+
+def test__hash_studies_and_diff():
+    raw = pandas.DataFrame(
+        {
+            "bmp_id": [1, 1, 1, 2, 2, 3],
+            "site_id": [10, 10, 10, 20, 20, 30],
+            "storm": [1, 1, 2, 1, 2, 1],
+            "res": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        }
+    )
+    studies = bmpdb._hash_studies(raw)
+    assert studies.index.names == bmpdb._study_keys
+    assert studies["rows"].tolist() == [2, 1, 1, 1, 1]
+
+    # row order doesn't matter
+    pdtest.assert_frame_equal(bmpdb._hash_studies(raw.iloc[::-1]), studies)
+
+    new = pandas.concat([raw.iloc[:4], raw.iloc[[3]].assign(storm=3)]).assign(
+        res=lambda df: df["res"].where(df["bmp_id"] != 2, -1)
+    )
+    changed, removed = bmpdb._diff_studies(studies, bmpdb._hash_studies(new))
+    assert changed.tolist() == [(2, 20, 1), (2, 20, 3)]
+    assert removed.tolist() == [(2, 20, 2), (3, 30, 1)]
+
+
+def test__summary_groups():
+    index = pandas.MultiIndex.from_tuples(
+        [
+            ("Retention Pond", "RP", "Lead"),
+            ("Wetland Basin/Retention Pond", "WB", "Lead"),
+            ("Grass Strip", "PF", "Nitrogen, Nitrate (NO3) as N"),
+            ("Grass Strip", "GS", "Nitrogen, NOx as N"),
+        ],
+        names=["category", "bmptype", "parameter"],
+    )
+    expected = [
+        ("Lead", "Wetland Basin/Retention Pond"),
+        ("Lead", "Wetland Basin/Retention Pond"),
+        ("Nitrogen, NOx as N", "Permeable Friction Course"),
+        ("Nitrogen, NOx as N", "Grass Strip"),
+    ]
+    assert bmpdb._summary_groups(index).tolist() == expected
+
+    result = bmpdb._summary_groups(index, combine_nox=False, combine_WB_RP=False, fix_PFCs=False)
+    assert result.tolist() == [(p, c) for c, _, p in index]
+
+
+@pytest.mark.skipif(bmpdb.cache.pyarrow is None, reason="pyarrow not installed")
+def test_load_data_incremental(raw_data, tmp_path):
+    csvfile = tmp_path / "bmpdata.csv"
+    cachedir = tmp_path / "cache"
+    options = dict(minstorms=2, minbmps=1, as_dataframe=True)
+    incremental = bmpdb.LoadOptions(cachedir=cachedir, incremental=True)
+
+    def check(expected_clean_rows):
+        with patch.object(bmpdb, "_clean_raw_data", wraps=bmpdb._clean_raw_data) as clean:
+            result = bmpdb.load_data(csvfile, options=incremental, **options)
+        assert [c[0][0].shape[0] for c in clean.call_args_list] == expected_clean_rows
+        pdtest.assert_frame_equal(result, bmpdb.load_data(csvfile, **options).sort_index())
+        return result
+
+    raw_data.to_csv(csvfile, index=False)
+    first = check([raw_data.shape[0]])
+    pdtest.assert_frame_equal(check([]), first)
+
+    # modify one BMP, drop another, and add some new storms
+    modified = raw_data["bmp"] == "BMP 3-1"
+    updated = pandas.concat(
+        [
+            raw_data.assign(res=raw_data["res"].where(~modified, raw_data["res"] * 2)).query("bmp != 'BMP 7-1'"),
+            raw_data.query("bmp == 'BMP 2-0'").assign(storm=lambda df: df["storm"] + 100),
+        ]
+    )
+    updated.to_csv(csvfile, index=False)
+    added = updated["storm"] > 100
+    check([int(modified.sum() + added.sum())])
+
+    with pytest.raises(ValueError):
+        bmpdb.load_data(csvfile, columns=["state"], options=incremental)
+
+
+@pytest.mark.skipif(bmpdb.cache.pyarrow is None, reason="pyarrow not installed")
+def test_load_data_incremental_new_station(raw_data, tmp_path):
+    csvfile = tmp_path / "bmpdata.csv"
+    cachedir = tmp_path / "cache"
+    options = dict(minstorms=2, minbmps=1, balanced_only=True, as_dataframe=True)
+
+    def check():
+        incremental = bmpdb.LoadOptions(cachedir=cachedir, incremental=True)
+        result = bmpdb.load_data(csvfile, options=incremental, **options)
+        pdtest.assert_frame_equal(result, bmpdb.load_data(csvfile, **options).sort_index())
+        return result
+
+    # with only inflow data, every BMP has results at every station
+    inflow = raw_data.query("station == 'Inflow'")
+    inflow.to_csv(csvfile, index=False)
+    assert check().shape[0] > 0
+
+    # the first outflow results make all of the other BMPs one-sided
+    outflow = raw_data.query("station == 'Outflow' and bmp == 'BMP 3-1'")
+    pandas.concat([inflow, outflow]).to_csv(csvfile, index=False)
+    assert check().index.get_level_values("bmp").unique().tolist() == ["BMP 3-1"]
+
+    # and removing them makes the other BMPs balanced again
+    inflow.to_csv(csvfile, index=False)
+    assert check().index.get_level_values("bmp").nunique() > 1
+
+
+def test_load_data_memoize(raw_csv):
+    bmpdb.cache.clear_memo()
+    options = dict(minbmps=1, as_dataframe=True)
+    memoize = bmpdb.LoadOptions(memoize=True)
+    calls = [
+        dict(minstorms=2, excluded_params=["Fecal Coliform", "Zinc, Total"]),
+        dict(minstorms=3, combine_nox=False),
+        dict(minstorms=2, excluded_params=["Zinc, Total", "Fecal Coliform"]),
+    ]
+    expected = [bmpdb.load_data(raw_csv, **call, **options) for call in calls]
+
+    with patch.object(bmpdb, "_load_cleaned_data", wraps=bmpdb._load_cleaned_data) as load:
+        results = [bmpdb.load_data(raw_csv, options=memoize, **call, **options) for call in calls]
+        assert load.call_count == 1
+
+    for result, exp in zip(results, expected):
+        pdtest.assert_frame_equal(result, exp)
+    assert results[2] is not results[0]
+
+    stats = bmpdb.cache.memo_stats()
+    assert stats["cleaned"]["hits"] == 1 and stats["cleaned"]["misses"] == 1
+    assert stats["results"]["hits"] == 1 and stats["results"]["misses"] == 2
+
+    # the results of the hits are copies, which the callers can change
+    results[0]["res"] = -1.0
+    pdtest.assert_frame_equal(bmpdb.load_data(raw_csv, options=memoize, **calls[0], **options), expected[0])
+
+    dc = bmpdb.load_data(raw_csv, options=memoize, minbmps=1, minstorms=2)
+    dc.data["res"] = -1.0
+    hits = bmpdb.cache.memo_stats()["results"]["hits"]
+    again = bmpdb.load_data(raw_csv, options=memoize, minbmps=1, minstorms=2)
+    assert bmpdb.cache.memo_stats()["results"]["hits"] == hits + 1
+    assert again is not dc
+    assert (again.data["res"] > 0).all()
+    pdtest.assert_frame_equal(again.raw_data, dc.raw_data)
+
+    bmpdb.cache.clear_memo()
+    assert bmpdb.cache.memo_stats()["results"]["size"] == 0
+
+
+def test__check_unique_index():
+    df = pandas.DataFrame({"a": list("AABB"), "b": [1, 2, 1, 2], "res": [1.0, 2.0, 3.0, 4.0]}).set_index(["a", "b"])
+    assert bmpdb._check_unique_index(df) is df
+
+    with pytest.raises(AssertionError) as err:
+        bmpdb._check_unique_index(pandas.concat([df, df.iloc[[2]]]))
+    assert err.value.args == (("B", 1),)
+
+    assert bmpdb._check_unique_index(pandas.concat([df, df.iloc[[2]]]), validate="off") is not None
+
+
+@pytest.mark.parametrize("validate", ["full", "sample", "off"])
+def test__check_no_missing(validate):
+    df = pandas.DataFrame({"a": list("AABB"), "b": ["x", None, "y", "z"], "c": [1.0, numpy.nan, 2.0, 3.0]})
+    assert bmpdb._check_no_missing(df, ["a"], validate=validate) is df
+    if validate == "off":
+        assert bmpdb._check_no_missing(df, ["a", "b", "c"], validate=validate) is df
+    else:
+        with pytest.raises(AssertionError) as err:
+            bmpdb._check_no_missing(df, ["a", "b", "c"], validate=validate)
+        assert err.value.args == ("missing values in b, c",)
+
+
+def test__rows_to_validate():
+    df = pandas.DataFrame({"res": numpy.arange(bmpdb._validate_sample_size * 2)})
+    assert bmpdb._rows_to_validate(df, "full") is df
+    assert bmpdb._rows_to_validate(df, "off") is None
+
+    sample = bmpdb._rows_to_validate(df, "sample")
+    assert sample.shape[0] == bmpdb._validate_sample_size
+    assert sample.index.is_monotonic_increasing
+    pdtest.assert_frame_equal(bmpdb._rows_to_validate(df, "sample"), sample)
+    assert bmpdb._rows_to_validate(df.iloc[:10], "sample").shape[0] == 10
+
+
+@pytest.mark.parametrize("validate", ["sample", "off"])
+def test_load_data_validate(raw_csv, validate):
+    options = dict(minstorms=2, minbmps=1, as_dataframe=True)
+    expected = bmpdb.load_data(raw_csv, **options)
+    result = bmpdb.load_data(raw_csv, options=bmpdb.LoadOptions(validate=validate), **options)
+    pdtest.assert_frame_equal(result, expected)
+
+
+def test__append_index_level():
+    df = pandas.DataFrame({"a": list("AABB"), "b": [2, 1, 2, 1], "c": list("xyzx"), "res": [1.0, 2.0, 3.0, 4.0]})
+    expected = df.set_index(["a", "b", "c"])
+    result = df.set_index(["a", "b"]).pipe(bmpdb._append_index_level, "c")
+    pdtest.assert_frame_equal(result, expected)
+
+
+def test__maybe_compact_index_roundtrip():
+    df = pandas.DataFrame(
+        {"site": list("AABB"), "storm": [1, 2, 1, 2], "station": ["inflow", "outflow"] * 2, "res": [1.0, 2.0, 3.0, 4.0]}
+    ).set_index(["site", "storm", "station"])
+    assert bmpdb._maybe_compact_index(df, False) is df
+
+    compacted = bmpdb._maybe_compact_index(df, True)
+    assert isinstance(compacted.index.get_level_values("site"), pandas.CategoricalIndex)
+    assert not isinstance(compacted.index.get_level_values("storm"), pandas.CategoricalIndex)
+    pdtest.assert_frame_equal(bmpdb._expand_index(compacted), df)
+
+
+@requires_pyarrow
+def test__maybe_arrow_index_roundtrip():
+    df = pandas.DataFrame(
+        {"site": list("AABB"), "storm": [1, 2, 1, 2], "station": ["inflow", "outflow"] * 2, "res": [1.0, 2.0, 3.0, 4.0]}
+    ).set_index(["site", "storm", "station"])
+    assert bmpdb._maybe_arrow_index(df, "numpy") is df
+
+    converted = bmpdb._maybe_arrow_index(df, "pyarrow")
+    assert converted.index.get_level_values("site").dtype == bmpdb._arrow_string
+    assert converted.index.get_level_values("storm").dtype == "int64"
+    pdtest.assert_frame_equal(bmpdb._expand_index(converted), df)
 
 
 @pytest.mark.skipif(True, reason="test not ready")
@@ -121,6 +899,109 @@ def test_transform_parameters():
     pdtest.assert_frame_equal(result, expected)
 
 
+def test_combine_parameters():
+    index_cols = ["storm", "param", "units"]
+    df = pandas.DataFrame(
+        {
+            "storm": [1, 1, 2, 2, 3, 4],
+            "param": list("ABABAA"),
+            "units": ["mg/L"] * 6,
+            "res": [1.0, 2.0, 3.0, 4.0, 5.0, numpy.nan],
+            "qual": ["<", "="] * 3,
+        }
+    ).set_index(index_cols)
+
+    expected = pandas.DataFrame(
+        {
+            "storm": [1, 1, 2, 2, 3, 4, 1, 2, 3, 4],
+            "param": list("ABABAACCCC"),
+            "units": (["mg/L"] * 6) + (["ug/L"] * 4),
+            "res": [1.0, 2.0, 3.0, 4.0, 5.0, numpy.nan, 3000.0, 7000.0, 5000.0, numpy.nan],
+            "qual": (["<", "="] * 3) + ["=", "=", "<", "="],
+        }
+    ).set_index(index_cols)
+
+    result = bmpdb.combine_parameters(
+        df,
+        ["A", "B"],
+        "C",
+        "ug/L",
+        lambda a, b: 1000 * a.add(b, fill_value=0),
+        lambda a, b: b.combine_first(a),
+        paramlevel="param",
+    )
+    pdtest.assert_frame_equal(result, expected)
+
+
+def test_combine_parameters_matches_transform_parameters(clean_data):
+    params = bmpdb._nitro_components
+    picker = partial(bmpdb._pick_non_null, preferred=params[0], secondary=params[1])
+    expected = bmpdb.transform_parameters(
+        clean_data,
+        params,
+        "NOx",
+        "mg/L",
+        partial(picker, maincol="res"),
+        partial(picker, maincol="qual"),
+        indexMods={"paramgroup": "N"},
+    )
+    result = bmpdb.combine_parameters(
+        clean_data,
+        params,
+        "NOx",
+        "mg/L",
+        lambda a, b: a.combine_first(b),
+        lambda a, b: a.combine_first(b),
+        indexMods={"paramgroup": "N"},
+    )
+    pdtest.assert_frame_equal(result, expected)
+
+
+def test_derive_parameters(clean_data):
+    def derivation(params, newparam, resfxn):
+        return dict(
+            existingparams=params,
+            newparam=newparam,
+            newunits="mg/L",
+            resfxn=resfxn,
+            qualfxn=lambda *quals: quals[0],
+            indexMods={"paramgroup": "Derived"},
+        )
+
+    derivations = [
+        derivation(bmpdb._nitro_components, "NOx", lambda a, b: a.combine_first(b)),
+        derivation(["Copper, Total", "Zinc, Total"], "Cu + Zn", lambda cu, zn: cu + zn),
+        derivation(["Total Suspended Solids"], "TSS (g/L)", lambda tss: tss / 1000),
+        derivation(["Lead, Total"], "Nothing", lambda pb: pb),
+    ]
+    expected = clean_data
+    for d in derivations:
+        expected = bmpdb.combine_parameters(expected, **d)
+
+    result = bmpdb.derive_parameters(clean_data, derivations)
+    pdtest.assert_frame_equal(result, expected)
+    assert "Nothing" not in result.index.get_level_values("parameter")
+
+    assert bmpdb.derive_parameters(clean_data, []) is clean_data
+    with pytest.raises(ValueError):
+        bmpdb.derive_parameters(clean_data, derivations + [derivation(["NOx"], "NOx2", lambda x: x)])
+
+
+def test__append_rows():
+    df = pandas.DataFrame(
+        {"res": [1.0, 2.0]},
+        index=pandas.MultiIndex.from_tuples([("a", 1), ("b", 2)], names=["site", "storm"]),
+    )
+    other = pandas.DataFrame(
+        {"res": [3.0, 4.0]},
+        index=pandas.MultiIndex.from_tuples([("c", 1), ("a", 3)], names=["site", "storm"]),
+    )
+    expected = pandas.concat([df, other])
+    result = bmpdb._append_rows(df, other)
+    pdtest.assert_frame_equal(result, expected)
+    pdtest.assert_frame_equal(bmpdb._append_rows(bmpdb._maybe_compact_index(df, True), other), expected)
+
+
 @pytest.mark.parametrize(
     ("fxn", "args", "index_cols", "infilename", "outfilename"),
     [
@@ -154,14 +1035,66 @@ def test_transform_parameters():
         ),
     ],
 )
-def test_summary_filter_functions(fxn, args, index_cols, infilename, outfilename):
+@pytest.mark.parametrize("compact", [False, True])
+def test_summary_filter_functions(fxn, args, index_cols, infilename, outfilename, compact):
     input_df = pandas.read_csv(get_data_file(infilename), index_col=index_cols)
     expected_df = pandas.read_csv(get_data_file(outfilename), index_col=index_cols).sort_index()
 
-    test_df = fxn(input_df, *args).sort_index()
+    test_df = fxn(bmpdb._maybe_compact_index(input_df, compact), *args).pipe(bmpdb._expand_index).sort_index()
     pdtest.assert_frame_equal(expected_df.reset_index(), test_df.reset_index())
 
 
+@pytest.fixture
+def df_for_filters():
+    rs = numpy.random.RandomState(0)
+    index = pandas.MultiIndex.from_product(
+        [["S{}".format(n) for n in range(12)], range(6), ["Cu", "Pb", "Zn"], ["inflow", "outflow"]],
+        names=["site", "storm", "parameter", "station"],
+    )
+    df = pandas.DataFrame({"res": rs.lognormal(size=index.shape[0]), "qual": "="}, index=index)
+    df["res"] = df["res"].where(rs.rand(df.shape[0]) > 0.3)
+    df["qual"] = df["qual"].where(rs.rand(df.shape[0]) > 0.1)
+    sites = df.index.get_level_values("site")
+    df = df.assign(bmp=sites.str.replace("S", "B"), category=numpy.where(sites < "S5", "BR", "GS"))
+    df = df.set_index(["bmp", "category"], append=True)
+    return df.loc[rs.rand(df.shape[0]) > 0.2]
+
+
+@pytest.mark.parametrize(
+    ("fxn", "arg", "reference"),
+    [
+        (
+            bmpdb._maybe_filter_onesided_BMPs,
+            True,
+            lambda df: df.unstack(level="station")
+            .groupby(level=["site", "bmp", "parameter", "category"])
+            .filter(lambda g: numpy.all(g["res"].describe().loc["count"] > 0))
+            .stack(level="station"),
+        ),
+        (
+            bmpdb._filter_by_storm_count,
+            4,
+            lambda df: df.groupby(level=["site", "bmp", "parameter", "station"]).filter(
+                lambda g: g.count()["res"] >= 4
+            ),
+        ),
+        (
+            bmpdb._filter_by_BMP_count,
+            6,
+            lambda df: df.groupby(level=["category", "parameter", "station"]).filter(
+                lambda g: g.index.get_level_values("bmp").unique().shape[0] >= 6
+            ),
+        ),
+    ],
+)
+def test_group_filters_match_groupby_filter(df_for_filters, fxn, arg, reference):
+    # the filters used to be implemented with groupby(...).filter(lambda ...)
+    expected = reference(df_for_filters).sort_index()
+    result = fxn(df_for_filters, arg).sort_index()
+    assert 0 < result.shape[0] < df_for_filters.shape[0]
+    pdtest.assert_frame_equal(result, expected)
+
+
 @pytest.mark.parametrize("doit", [True, False])
 @pytest.mark.parametrize(
     ("fxn", "index_cols", "infilename", "outfilename"),
@@ -208,6 +1141,52 @@ def test__maybe_filter_functions(fxn, doit, index_cols, infilename, outfilename)
     pdtest.assert_frame_equal(result, expected)
 
 
+def test__level_isin():
+    index = pandas.MultiIndex.from_arrays([["a", "b", None, "a"], [1, 2, 3, 4]], names=["site", "storm"])
+    nptest.assert_array_equal(bmpdb._level_isin(index, "site", ["a"]), [True, False, False, True])
+    nptest.assert_array_equal(bmpdb._level_isin(index, "storm", [2, 3]), [False, True, True, False])
+
+
+@pytest.mark.parametrize("dropold", [True, False])
+@pytest.mark.parametrize("value", ["C", "A"])
+def test__redefine_index_level(dropold, value):
+    df = pandas.DataFrame(
+        {"res": numpy.arange(6.0)},
+        index=pandas.MultiIndex.from_arrays(
+            [list("ABBABA"), list("xxyyzz"), [3, 1, 2, 1, 3, 2]], names=["cat", "type", "storm"]
+        ),
+    )
+    expected = wqio.utils.redefine_index_level(
+        df, "cat", value, criteria=lambda row: row[1] in ["x", "z"], dropold=dropold
+    )
+    mask = df.index.get_level_values("type").isin(["x", "z"])
+    result = bmpdb._redefine_index_level(df, "cat", value, mask, dropold=dropold)
+    pdtest.assert_frame_equal(result, expected)
+
+
+def test__replace_level_values():
+    df = pandas.DataFrame(
+        {"site": list("AABB"), "station": ["inflow", "subsurface", "outflow", "junk"], "res": [1.0, 2.0, 3.0, 4.0]}
+    ).set_index(["site", "station"])
+    result = bmpdb._replace_level_values(df, "station", {"subsurface": "outflow", "junk": "other"})
+    expected = df.rename(index={"subsurface": "outflow", "junk": "other"}, level="station")
+    pdtest.assert_frame_equal(result, expected)
+    assert sorted(result.index.levels[1]) == ["inflow", "other", "outflow"]
+
+
+def test__pick_best_sampletype_composite_only():
+    df = pandas.DataFrame(
+        {
+            "storm": [1, 1, 2],
+            "sampletype": ["composite", "unknown", "composite"],
+            "res": [1.0, 2.0, 3.0],
+            "qual": ["=", "=", "ND"],
+        }
+    ).set_index(["storm", "sampletype"])
+    result = bmpdb._pick_best_sampletype(df)
+    pdtest.assert_frame_equal(result, df.iloc[[0, 2]])
+
+
 def test__pick_non_null():
     df = pandas.DataFrame(
         {
@@ -219,6 +1198,9 @@ def test__pick_non_null():
     result = bmpdb._pick_non_null(df, "res", "this", "that")
     nptest.assert_array_equal(result, expected)
 
+    result = bmpdb._pick_non_null(df, "res", "other", "that")
+    nptest.assert_array_equal(result, df[("res", "that")])
+
 
 def test_paired_qual():
     df = pandas.DataFrame({"in_qual": ["=", "=", "ND", "ND"], "out_qual": ["=", "ND", "=", "ND"]})
@@ -0,0 +1,185 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import pandas.testing as pdtest
+
+import pandas
+
+from pybmpdb import cache
+
+
+requires_pyarrow = pytest.mark.skipif(cache.pyarrow is None, reason="pyarrow not installed")
+
+
+@pytest.fixture
+def csvfile(tmp_path):
+    filepath = tmp_path / "bmpdata.csv"
+    filepath.write_text("site,bmp,res\nA,A1,1.0\nA,A2,2.0\n")
+    return filepath
+
+
+@pytest.fixture
+def cleaned():
+    return pandas.DataFrame(
+        {
+            "site": ["A", "A", "B"],
+            "bmp": ["A1", "A2", "B1"],
+            "storm": [1, 2, 1],
+            "sampledatetime": pandas.to_datetime(["2012-01-01 10:00", "2012-02-01", "2013-05-06 07:30"]),
+            "res": [1.5, 2.0, 3.25],
+            "qual": ["=", "ND", "="],
+        }
+    ).set_index(["site", "bmp", "storm", "sampledatetime"])
+
+
+def test_cache_key_stable(csvfile):
+    assert cache.cache_key(csvfile) == cache.cache_key(csvfile)
+
+
+def test_cache_key_content(csvfile):
+    key = cache.cache_key(csvfile)
+    csvfile.write_text("site,bmp,res\nA,A1,1.0\nA,A2,2.5\n")
+    assert cache.cache_key(csvfile) != key
+
+
+def test_cache_key_nd_correction(csvfile):
+    assert cache.cache_key(csvfile, nd_correction=2) != cache.cache_key(csvfile, nd_correction=1)
+
+
+def test_cache_key_info_tables(csvfile):
+    key = cache.cache_key(csvfile)
+    with patch.object(cache.info, "units", [{"name": "mg/L", "factor": 1}]):
+        assert cache.cache_key(csvfile) != key
+
+
+@requires_pyarrow
+def test_read_cleaned_miss(tmp_path):
+    assert cache.read_cleaned(tmp_path, "junk") is None
+
+
+@requires_pyarrow
+def test_write_read_cleaned(tmp_path, cleaned):
+    filepath = cache.write_cleaned(cleaned, tmp_path / "cache", "abc")
+    assert filepath == cache.cache_path(tmp_path / "cache", "abc")
+    assert filepath.exists()
+
+    result = cache.read_cleaned(tmp_path / "cache", "abc")
+    pdtest.assert_frame_equal(result, cleaned)
+
+
+@requires_pyarrow
+def test_invalidate(tmp_path, cleaned):
+    for key in ["abc", "xyz"]:
+        cache.write_cleaned(cleaned, tmp_path, key)
+
+    assert cache.invalidate(tmp_path, key="abc") == [cache.cache_path(tmp_path, "abc")]
+    assert cache.read_cleaned(tmp_path, "abc") is None
+    assert cache.read_cleaned(tmp_path, "xyz") is not None
+
+    cache.write_snapshot(cleaned, tmp_path, "snap")
+    assert cache.invalidate(tmp_path) == [
+        cache.cache_path(tmp_path, "xyz"),
+        cache.snapshot_path(tmp_path, "snap", suffix=".json"),
+        cache.snapshot_path(tmp_path, "snap"),
+    ]
+    assert cache.invalidate(tmp_path) == []
+
+
+@requires_pyarrow
+def test_write_read_snapshot(tmp_path, cleaned):
+    assert cache.read_snapshot(tmp_path, "abc") == (None, None)
+
+    cache.write_snapshot(cleaned, tmp_path, "abc", generation="xyz", count=3)
+    result, meta = cache.read_snapshot(tmp_path, "abc")
+    pdtest.assert_frame_equal(result, cleaned)
+    assert meta == {"generation": "xyz", "count": 3}
+
+    cache.write_snapshot(cleaned.iloc[:1], tmp_path, "abc", generation="123")
+    result, meta = cache.read_snapshot(tmp_path, "abc")
+    pdtest.assert_frame_equal(result, cleaned.iloc[:1])
+    assert meta == {"generation": "123"}
+
+    # a snapshot without its metadata is treated as missing
+    cache.snapshot_path(tmp_path, "abc", suffix=".json").unlink()
+    assert cache.read_snapshot(tmp_path, "abc") == (None, None)
+
+
+def test_write_read_mmap_snapshot(tmp_path, cleaned):
+    assert cache.read_mmap_snapshot(tmp_path, "abc") is None
+
+    folder = cache.write_mmap_snapshot(cleaned, tmp_path, "abc")
+    assert folder == cache.mmap_snapshot_path(tmp_path, "abc")
+    result = cache.read_mmap_snapshot(tmp_path, "abc")
+    assert isinstance(result["qual"].dtype, pandas.CategoricalDtype)
+    pdtest.assert_frame_equal(result.astype({"qual": object}), cleaned)
+
+    # the arrays are read-only views of the files
+    assert not result["res"].to_numpy().flags.writeable
+    assert not result.index.codes[0].flags.writeable
+
+    inmemory = cache.read_mmap_snapshot(tmp_path, "abc", mmap_mode=None)
+    assert inmemory["res"].to_numpy().flags.writeable
+    pdtest.assert_frame_equal(inmemory, result)
+
+    cache.write_mmap_snapshot(cleaned.reset_index(level="storm").loc[:, ["res"]], tmp_path, "abc")
+    result = cache.read_mmap_snapshot(tmp_path, "abc")
+    pdtest.assert_frame_equal(result, cleaned.reset_index(level="storm").loc[:, ["res"]])
+    assert sorted(p.name for p in folder.glob("*.npy")) == [
+        "column_0.npy",
+        "index_0_codes.npy",
+        "index_1_codes.npy",
+        "index_2_codes.npy",
+        "index_2_values.npy",
+    ]
+
+    single = cleaned.reset_index(drop=True)
+    cache.write_mmap_snapshot(single, tmp_path, "single")
+    pdtest.assert_frame_equal(cache.read_mmap_snapshot(tmp_path, "single").astype({"qual": object}), single)
+
+    # a snapshot without its labels is treated as missing
+    (folder / "labels.json").unlink()
+    assert cache.read_mmap_snapshot(tmp_path, "abc") is None
+    assert cache.invalidate(tmp_path) == [folder, cache.mmap_snapshot_path(tmp_path, "single")]
+
+
+def test_settings_key():
+    key = cache.settings_key(2)
+    assert cache.settings_key(2.0) == key
+    assert cache.settings_key(1) != key
+    with patch.object(cache.info, "parameters", []):
+        assert cache.settings_key(2) != key
+
+
+def test_LRUCache():
+    memo = cache.LRUCache(maxsize=2)
+    memo.put("a", 1)
+    memo.put("b", 2)
+    assert memo.get("a") == 1
+    memo.put("c", 3)
+    assert "b" not in memo
+    assert memo.get("b", "missing") == "missing"
+    assert (memo.get("a"), memo.get("c")) == (1, 3)
+    assert memo.stats() == {"hits": 3, "misses": 1, "size": 2, "maxsize": 2}
+
+    memo.maxsize = 1
+    assert "a" not in memo and "c" in memo
+
+    memo.clear()
+    assert memo.stats() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 1}
+
+    memo.maxsize = 0
+    memo.put("a", 1)
+    assert len(memo) == 0
+
+    with pytest.raises(ValueError):
+        memo.maxsize = -1
+
+
+def test_memo_key(csvfile):
+    key = cache.memo_key(csvfile, b=[1, 2], a="x")
+    assert key == cache.memo_key(csvfile, a="x", b=[1, 2])
+    assert key != cache.memo_key(csvfile, a="y", b=[1, 2])
+
+    csvfile.write_text("site,bmp,res\nA,A1,1.0\n")
+    assert key != cache.memo_key(csvfile, b=[1, 2], a="x")
@@ -1,4 +1,7 @@
 import pytest
+import pandas.testing as pdtest
+
+import pandas
 from wqio.tests import helpers
 from unittest.mock import patch
 
@@ -24,6 +27,62 @@ def test__find_by_name(value, expected, error):
         assert result == expected
 
 
+@pytest.mark.parametrize("value", ["ug/L", " UG/l ", "Ug/L"])
+def test__find_by_name_case_insensitive(value):
+    source = [{"name": "mg/L", "factor": 1000}, {"name": "ug/L", "factor": 1}]
+    assert info._find_by_name(value, source) == {"name": "ug/L", "factor": 1}
+
+
+def test__find_by_name_other_key():
+    source = [{"name": "mg/L", "unicode": "mg/L"}, {"name": "ug/L", "unicode": "μg/L"}]
+    assert info._find_by_name("μg/l", source, key="unicode") == {"name": "ug/L", "unicode": "μg/L"}
+
+
+def test__get_index_memoized():
+    first = info._get_index(info.units)
+    assert info._get_index(info.units) is first
+    assert info._get_index(list(info.units)) is first
+    assert info._get_index(info.units, key="unicode") is not first
+
+    with patch.object(info, "units", info.units + [{"name": "junk/L", "factor": 1}]):
+        assert info._get_index(info.units) is not first
+        assert info.getUnits("JUNK/L") == "junk/L"
+
+    assert info._get_index(info.units) is first
+
+
+def test__get_index_edited_in_place():
+    source = [{"name": "mg/L", "factor": 1000}, {"name": "ug/L", "factor": 1}]
+    assert info._find_by_name("ug/L", source)["factor"] == 1
+
+    source[1]["factor"] = 2
+    assert info._find_by_name("ug/L", source)["factor"] == 2
+
+    source[1]["name"] = "ng/L"
+    assert info._find_by_name("ng/L", source) is source[1]
+    with pytest.raises(ValueError):
+        info._find_by_name("ug/L", source)
+
+    source[0] = {"name": "ug/L", "factor": 1}
+    assert info._find_by_name("ug/L", source) is source[0]
+
+
+def test_mapUnits():
+    names = pandas.Series(["ug/L", "mg/L", "UG/L", "ug/L"], index=list("abcd"))
+    expected = pandas.Series(["ug/L", "mg/L", "ug/L", "ug/L"], index=list("abcd"))
+    pdtest.assert_series_equal(info.mapUnits(names), expected)
+    assert info.mapUnits(["mg/L"], attr="factor").tolist() == [info.getNormalization("mg/L")]
+
+    with pytest.raises(ValueError):
+        info.mapUnits(pandas.Series(["ug/L", "junk"]))
+
+
+def test_mapUnitsFromParam():
+    params = pandas.Series(["Lead, Dissolved", "Total Suspended Solids", "lead, dissolved"])
+    expected = [info.getUnitsFromParam(p) for p in params]
+    assert info.mapUnitsFromParam(params).tolist() == expected
+
+
 @patch.object(info, "units")
 @patch.object(info, "parameters")
 @patch.object(info, "_find_by_name", return_value={"name": "Lead", "units": "mg/L"})
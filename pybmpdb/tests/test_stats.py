@@ -0,0 +1,126 @@
+import pytest
+import numpy.testing as nptest
+import pandas.testing as pdtest
+
+import numpy
+import pandas
+
+import wqio
+from pybmpdb import stats
+
+
+@pytest.fixture
+def grouped_data():
+    numpy.random.seed(0)
+    df = pandas.DataFrame(
+        {
+            "station": numpy.random.choice(["inflow", "outflow"], size=200),
+            "parameter": numpy.random.choice(["A", "B", "C"], size=200),
+            "res": numpy.random.lognormal(size=200),
+        }
+    )
+    df.loc[[3, 17, 42], "res"] = numpy.nan
+    return df
+
+
+def test_grouped_quantiles(grouped_data):
+    result = stats.grouped_quantiles(
+        grouped_data, ["station", "parameter"], "res", percentiles=[10, 50, 97.5]
+    )
+    groups = grouped_data.dropna().groupby(["station", "parameter"])["res"]
+    expected = pandas.DataFrame(
+        {
+            "count": groups.size(),
+            "min": groups.min(),
+            "pctl 10": groups.quantile(0.1),
+            "pctl 50": groups.median(),
+            "pctl 97.5": groups.quantile(0.975),
+            "max": groups.max(),
+        }
+    )
+    pdtest.assert_frame_equal(result, expected, check_names=False)
+
+
+def test_grouped_quantiles_edge_cases():
+    df = pandas.DataFrame(
+        {
+            "group": ["a", "b", "b", None, "c", "c"],
+            "res": [1.0, numpy.nan, numpy.nan, 5.0, 3.0, 1.0],
+        }
+    )
+    result = stats.grouped_quantiles(df, ["group"], "res", percentiles=[50])
+    nptest.assert_array_equal(result["count"], [1, 0, 2])
+    nptest.assert_array_equal(result["pctl 50"], [1.0, numpy.nan, 2.0])
+    nptest.assert_array_equal(result["max"], [1.0, numpy.nan, 3.0])
+
+    with pytest.raises(ValueError):
+        stats.grouped_quantiles(df, ["group"], "res", percentiles=[150])
+
+
+@pytest.mark.parametrize("statistic", ["median", "mean"])
+@pytest.mark.parametrize("method", ["BCA", "percentile"])
+def test_grouped_bootstrap(grouped_data, statistic, method):
+    options = dict(statistic=statistic, niter=500, method=method, seed=0)
+    result = stats.grouped_bootstrap(grouped_data, ["station", "parameter"], "res", **options)
+    groups = grouped_data.dropna().groupby(["station", "parameter"])["res"]
+    assert result.columns.tolist() == ["lower", statistic, "upper"]
+    pdtest.assert_series_equal(result[statistic], groups.agg(statistic), check_names=False)
+    assert (result["lower"] <= result[statistic]).all()
+    assert (result[statistic] <= result["upper"]).all()
+
+    # the batches of the draws don't change the results
+    batched = stats.grouped_bootstrap(
+        grouped_data, ["station", "parameter"], "res", max_memory=1000, **options
+    )
+    pdtest.assert_frame_equal(result, batched)
+
+
+def test_bootstrap_intervals_percentile():
+    sample = numpy.array([4.0, 1.0, 3.0, 2.0, 8.0, 5.0])
+    result = stats.bootstrap_intervals(
+        [sample, [], [7.0]], statistic="median", niter=1000, method="percentile", seed=42
+    )
+
+    draws = numpy.random.default_rng(42).integers(0, 6, size=(1000, 6))
+    boot_stats = numpy.median(numpy.sort(sample)[draws], axis=1)
+    nptest.assert_allclose(result[0], numpy.percentile(boot_stats, [2.5, 97.5]))
+    nptest.assert_array_equal(result[1], [numpy.nan, numpy.nan])
+    nptest.assert_array_equal(result[2], [7.0, 7.0])
+
+
+@pytest.mark.parametrize("options", [dict(statistic="mode"), dict(method="jackknife")])
+def test_bootstrap_intervals_errors(options):
+    with pytest.raises(ValueError):
+        stats.bootstrap_intervals([[1.0, 2.0]], **options)
+
+
+def test_sample_stats():
+    numpy.random.seed(0)
+    samples = [numpy.random.lognormal(size=20), numpy.random.normal(size=7), [], [3.0, numpy.nan]]
+    result = stats.sample_stats(samples)
+    assert result.columns.tolist() == [
+        "N",
+        "min",
+        "max",
+        "median",
+        "pctl25",
+        "pctl75",
+        "mean",
+        "std",
+        "cov",
+        "skew",
+        "all_positive",
+        "logmean",
+        "logstd",
+        "geomean",
+    ]
+    assert result["N"].tolist() == [20, 7, 0, 1]
+    assert result["all_positive"].tolist() == [True, False, False, True]
+    assert result.loc[2].drop(["N", "all_positive"]).isnull().all()
+    assert result.loc[1, ["logmean", "logstd", "geomean"]].isnull().all()
+
+    for n in [0, 1]:
+        loc = wqio.Location(pandas.DataFrame({"res": samples[n], "qual": "="}), useros=False)
+        for name in result.columns.drop(["N", "all_positive"]):
+            expected = getattr(loc, name)
+            nptest.assert_allclose(result.loc[n, name], numpy.nan if expected is None else expected)
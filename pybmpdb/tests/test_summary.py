@@ -1,5 +1,6 @@
 import sys
 import os
+from collections import Counter
 from io import StringIO
 from pkg_resources import resource_filename
 from textwrap import dedent
@@ -11,9 +12,14 @@ import pytest
 from wqio.tests import helpers
 
 import numpy
+import pandas
+import numpy.testing as nptest
+import pandas.testing as pdtest
 from matplotlib import pyplot
 
-from pybmpdb import summary
+import wqio
+from pybmpdb import summary, bmpdb
+from pybmpdb.tests.helpers import make_raw_data
 
 
 mock_figure = mock.Mock(spec=pyplot.Figure)
@@ -519,6 +525,66 @@ def test_CategoricalSummary_makeReport(cat_sum, expected_latex_report, temp_temp
             helpers.assert_bigstring_equal(rp.read(), expected_latex_report)
 
 
+def test__render_figures():
+    figure = mock.Mock(spec=pyplot.Figure)
+    ds = mock.Mock(statplot=mock.Mock(return_value=figure), scatterplot=mock.Mock(return_value=figure))
+    summary._render_figures(ds, "Lead (ug/L)", False, "stat.png", "scatter.png", dict(dpi=72))
+
+    ds.statplot.assert_called_once_with(ylabel="Lead (ug/L)", bacteria=False, axtype="prob")
+    ds.scatterplot.assert_called_once_with(
+        xlabel="Influent Lead (ug/L)", ylabel="Effluent Lead (ug/L)", one2one=True
+    )
+    figure.savefig.assert_has_calls([mock.call("stat.png", dpi=72), mock.call("scatter.png", dpi=72)])
+
+
+def test__render_figures_precomputed(tmp_path):
+    numpy.random.seed(0)
+    ds = wqio.Dataset(location(numpy.random.lognormal(size=25)), location(numpy.random.lognormal(size=30)))
+    dstats = summary._dataset_stats([ds], bootstrap=dict(niter=100, seed=0))[0]
+    paths = [tmp_path / "stat.png", tmp_path / "scatter.png"]
+    with mock.patch.object(wqio.viz, "boxplot", wraps=wqio.viz.boxplot) as boxplot:
+        summary._render_figures(ds, "Lead (ug/L)", False, *paths, dict(dpi=72), dstats)
+
+    assert all(path.exists() for path in paths)
+    for call, name in zip(boxplot.call_args_list, ["influent", "effluent"]):
+        bxpstats = call.args[0][0]
+        assert bxpstats["med"] is dstats[name]["median"]
+        assert (bxpstats["cilo"], bxpstats["cihi"]) == tuple(dstats[name]["median_conf_interval"])
+    assert "median" not in ds.influent._cache
+
+
+def test_CategoricalSummary__make_input_file_IO_n_jobs():
+    numpy.random.seed(0)
+    datasets = []
+    for param, bmp in [("Lead", "Bioretention"), ("Lead", "Wetland Basin"), ("Zinc", "Bioretention")]:
+        ds = wqio.Dataset(location(numpy.random.lognormal(size=12)), location(numpy.random.lognormal(size=10)))
+        ds.definition = {"parameter": wqio.Parameter(name=param, units="ug/L"), "category": bmp}
+        datasets.append(ds)
+
+    def tex_input(dsum, tabletitle, subsection=True):
+        return "{} -> {}\n".format(tabletitle, dsum.stat_fig_name)
+
+    outputs = []
+    with TemporaryDirectory() as tmpdir, mock.patch.object(
+        summary.DatasetSummary, "makeTexInput", autospec=True, side_effect=tex_input
+    ):
+        for folder in ["statplot", "scatterplot"]:
+            os.makedirs(os.path.join(tmpdir, "figs", folder))
+
+        for n_jobs in [None, 2]:
+            cs = summary.CategoricalSummary(datasets, "Metals", tmpdir, "figs", showprogress=True)
+            with StringIO() as inputIO:
+                cs._make_input_file_IO(inputIO, n_jobs=n_jobs)
+                outputs.append(inputIO.getvalue())
+
+        figures = sorted(os.listdir(os.path.join(tmpdir, "figs", "statplot")))
+        assert len(figures) == 3
+        assert len(os.listdir(os.path.join(tmpdir, "figs", "scatterplot"))) == 3
+
+    assert outputs[0].count("\\section{") == 2
+    assert outputs[0] == outputs[1]
+
+
 @pytest.fixture
 def expected_latext_content():
     content = dedent(
@@ -709,3 +775,304 @@ def expected_latext_content():
     """
     )
     return content
+
+
+@pytest.fixture(scope="module")
+def prepared_dc():
+    prepared = make_raw_data().pipe(bmpdb._clean_raw_data).pipe(bmpdb._prepare_for_summary, minstorms=2, minbmps=1)
+    return wqio.DataCollection(
+        prepared,
+        ndval=["ND", "<"],
+        othergroups=["category", "units"],
+        pairgroups=["category", "units", "bmp_id", "site_id", "storm"],
+        useros=False,
+    )
+
+
+@pytest.fixture(scope="module")
+def stats_dc():
+    # one result per storm, station and parameter, so that they can be paired
+    keys = ["category", "units", "bmp_id", "site_id", "storm", "station", "parameter"]
+    prepared = make_raw_data().pipe(bmpdb._clean_raw_data).pipe(bmpdb._prepare_for_summary, minstorms=2, minbmps=1)
+    prepared = prepared.reset_index().drop_duplicates(keys).set_index(prepared.index.names)
+    return wqio.DataCollection(
+        prepared,
+        ndval=["ND", "<"],
+        othergroups=["category", "units"],
+        pairgroups=["category", "units", "bmp_id", "site_id", "storm"],
+        bsiter=500,
+        showpbar=False,
+    )
+
+
+@pytest.mark.parametrize("useros", [False, True])
+def test__collection_options(prepared_dc, useros):
+    dc = wqio.DataCollection(prepared_dc.raw_data, **dict(summary._collection_options(prepared_dc), useros=useros))
+    options = summary._collection_options(dc)
+    assert options["rescol"] == "res"
+    assert options["useros"] == useros
+    assert options["pairgroups"] == ["category", "units", "bmp_id", "site_id", "storm"]
+    rebuilt = wqio.DataCollection(dc.raw_data, **options)
+    assert rebuilt.pairgroups == dc.pairgroups
+    assert rebuilt.groupcols == dc.groupcols
+    assert rebuilt.rescol == dc.rescol
+    pdtest.assert_frame_equal(rebuilt.data, dc.data)
+
+    renamed = wqio.DataCollection(dc.raw_data.rename(columns={"res": "value"}), **options)
+    with pytest.raises(ValueError):
+        summary._collection_options(renamed)
+
+
+@pytest.mark.parametrize("useros", [True, False])
+def test__station_stats_matches_wqio(useros):
+    # non-detects (substituted by ROS, or not) and a parameter without
+    # outflow results, whose outflow stats are empty
+    rs = numpy.random.RandomState(0)
+    rows = []
+    for param, stations in [("A", ["inflow", "outflow"]), ("B", ["inflow", "outflow"]), ("C", ["inflow"])]:
+        for station in stations:
+            for storm in range(12):
+                qual = "ND" if rs.rand() < 0.3 else "="
+                rows.append(dict(parameter=param, station=station, storm=storm, res=rs.lognormal(), qual=qual))
+    df = pandas.DataFrame(rows).assign(category="X", units="mg/L")
+    dc = wqio.DataCollection(
+        df.set_index(["category", "units", "parameter", "station", "storm"]),
+        ndval=["ND"],
+        othergroups=["category", "units"],
+        pairgroups=["category", "units", "storm"],
+        useros=useros,
+        bsiter=200,
+        showpbar=False,
+    )
+
+    result = summary._station_stats(dc, seed=0)
+    assert numpy.isnan(result.loc[("C", "X", "mg/L"), ("outflow", "median")])
+    for (param, station), group in df.groupby(["parameter", "station"]):
+        loc = wqio.Location(group, ndval=["ND"], station_type=station, useros=useros, bsiter=200)
+        row = result.loc[(param, "X", "mg/L"), station]
+        assert row["Count"] == loc.N
+        expected = [loc.pctl25, loc.median, loc.pctl75]
+        nptest.assert_allclose(row[["pctl 25", "median", "pctl 75"]].astype(float), expected)
+
+
+def test_categorical_stats_n_jobs(stats_dc):
+    serial = summary.categorical_stats(stats_dc, n_jobs=1, seed=42)
+    parallel = summary.categorical_stats(stats_dc, n_jobs=2, seed=42)
+    assert serial.shape[0] == stats_dc.data.groupby(stats_dc.groupcols_comparison).ngroups
+    pdtest.assert_frame_equal(parallel, serial)
+
+    # only the bootstrapped intervals of unseeded runs are random
+    unseeded = summary.categorical_stats(stats_dc)
+    others = [col for col in serial.columns if col[0] not in ("lower", "upper", "medianci", "symbol")]
+    pdtest.assert_frame_equal(unseeded.loc[:, others], serial.loc[:, others])
+
+
+def test_categorical_stats_simple(stats_dc):
+    with pytest.warns(DeprecationWarning):
+        summary.categorical_stats(stats_dc, simple=True, bootstrap=dict(niter=50))
+
+
+@pytest.fixture(scope="module")
+def percentile_stats(stats_dc):
+    return summary.categorical_stats(stats_dc, seed=42, bootstrap=dict(method="percentile", niter=200))
+
+
+@pytest.mark.parametrize("method", ["BCA", "percentile"])
+def test_categorical_stats_bootstrap(stats_dc, percentile_stats, method):
+    bootstrap = dict(method=method, niter=200)
+    result = summary.categorical_stats(stats_dc, seed=42, bootstrap=bootstrap)
+    again = summary.categorical_stats(stats_dc, seed=42, bootstrap=dict(bootstrap, max_memory=2 ** 12))
+    pdtest.assert_frame_equal(again, result)
+    parallel = summary.categorical_stats(stats_dc, n_jobs=2, seed=42, bootstrap=bootstrap)
+    pdtest.assert_frame_equal(parallel, result)
+
+    for station in ["inflow", "outflow"]:
+        lower, median, upper = (result[(name, station)] for name in ["lower", "median", "upper"])
+        valid = median.notnull()
+        assert (lower[valid] <= median[valid]).all()
+        assert (median[valid] <= upper[valid]).all()
+
+    # only the intervals depend on the method and the seed
+    others = [col for col in result.columns if col[0] not in ("lower", "upper", "medianci", "symbol")]
+    pdtest.assert_frame_equal(result.loc[:, others], percentile_stats.loc[:, others])
+    if method == "BCA":
+        # BCa intervals, and percentile intervals where they are undefined
+        same = (result["lower"] == percentile_stats["lower"]) & (result["upper"] == percentile_stats["upper"])
+        assert 0 < same.values.sum() < result["median"].notnull().values.sum()
+    else:
+        pdtest.assert_frame_equal(result, percentile_stats)
+        reseeded = summary.categorical_stats(stats_dc, seed=7, bootstrap=bootstrap)
+        assert not reseeded["lower"].equals(result["lower"])
+        pdtest.assert_frame_equal(reseeded.loc[:, others], result.loc[:, others])
+
+
+def test__in_parameters(prepared_dc):
+    params = ["Zinc, Total", "Lead, Total"]
+    expected = prepared_dc.data["parameter"].isin(params).to_numpy()
+    nptest.assert_array_equal(summary._in_parameters(prepared_dc.raw_data, "parameter", params), expected)
+    nptest.assert_array_equal(summary._in_parameters(prepared_dc.data, "parameter", params), expected)
+
+
+def test__shard_parameters():
+    sizes = pandas.Series({"a": 10, "b": 70, "c": 20, "d": 40, "e": 5})
+    assert summary._shard_parameters(sizes, 2) == [["b", "e"], ["d", "c", "a"]]
+    assert summary._shard_parameters(sizes, 1) == [["b", "d", "c", "a", "e"]]
+    assert summary._shard_parameters(sizes.iloc[:2], 4) == [["b"], ["a"]]
+
+
+def test__parameter_seed():
+    assert summary._parameter_seed(0, "Lead, Total") == summary._parameter_seed(0, "Lead, Total")
+    assert summary._parameter_seed(0, "Lead, Total") != summary._parameter_seed(1, "Lead, Total")
+    assert summary._parameter_seed(0, "Lead, Total") != summary._parameter_seed(0, "Zinc, Total")
+
+
+def test_DatasetSummary__location_stat():
+    cis = {"influent": {"median_conf_interval": numpy.array([0.5, 2.0])}}
+    dsum = summary.DatasetSummary(mock_dataset(True, True), "Metals", "testfigpath", location_stats=cis)
+    nptest.assert_array_equal(dsum._location_stat("influent", "median_conf_interval"), [0.5, 2.0])
+    nptest.assert_allclose(dsum._location_stat("effluent", "median_conf_interval"), [0.23456, 2.23456])
+    assert dsum._location_stat("influent", "median") == 1.23456
+
+
+def location(values, include=True):
+    df = pandas.DataFrame({"res": values, "qual": "="})
+    loc = wqio.Location(df, rescol="res", qualcol="qual", useros=False)
+    loc.include = include
+    return loc
+
+
+def test__dataset_conf_intervals():
+    numpy.random.seed(0)
+    datasets = [
+        mock.Mock(influent=location(numpy.random.lognormal(size=25)), effluent=location(numpy.random.normal(size=30))),
+        mock.Mock(influent=location([1.0, 2.0], include=False), effluent=location(numpy.random.lognormal(size=12))),
+    ]
+    result = summary._dataset_conf_intervals(datasets, bootstrap=dict(niter=1000, seed=0))
+    again = summary._dataset_conf_intervals(datasets, bootstrap=dict(niter=1000, seed=0))
+    nptest.assert_array_equal(again[0]["effluent"]["mean_conf_interval"], result[0]["effluent"]["mean_conf_interval"])
+
+    assert sorted(result[0]["influent"]) == [
+        "geomean_conf_interval",
+        "logmean_conf_interval",
+        "mean_conf_interval",
+        "median_conf_interval",
+    ]
+    assert sorted(result[0]["effluent"]) == ["mean_conf_interval", "median_conf_interval"]
+    assert result[1]["influent"] == {}
+    nptest.assert_allclose(
+        result[1]["effluent"]["geomean_conf_interval"], numpy.exp(result[1]["effluent"]["logmean_conf_interval"])
+    )
+
+    lower, upper = result[0]["influent"]["median_conf_interval"]
+    assert lower <= numpy.median(datasets[0].influent.data) <= upper
+
+
+def test__dataset_stats():
+    numpy.random.seed(0)
+    datasets = [
+        wqio.Dataset(location(numpy.random.lognormal(size=25)), location(numpy.random.normal(size=30))),
+        wqio.Dataset(location([1.0, 2.0], include=False), location(numpy.random.lognormal(size=12))),
+    ]
+    result = summary._dataset_stats(datasets, bootstrap=dict(niter=1000, seed=0))
+    assert result[1]["influent"] == {}
+
+    for ds, dstats in zip(datasets, result):
+        for name in ["influent", "effluent"]:
+            loc = getattr(ds, name)
+            if not loc.include:
+                continue
+
+            # the statistics are looked up in the records (not stored in
+            # the caches of the locations)...
+            for stat, value in dstats[name].items():
+                assert summary._location_stat(ds, name, stat, dstats) is value
+            assert set(loc._cache) == {"hasData"}
+
+            # ... and are the same that the locations would have computed
+            fresh = location(loc.data)
+            for stat in ["N", "ND", "min", "max", "mean", "std", "cov", "skew", "median", "pctl25", "pctl75"]:
+                nptest.assert_allclose(dstats[name][stat], getattr(fresh, stat))
+            assert dstats[name]["all_positive"] == fresh.all_positive
+
+    assert result[0]["effluent"]["logmean"] is None
+    assert "logmean_conf_interval" not in result[0]["effluent"]
+    nptest.assert_allclose(result[0]["influent"]["geomean"], datasets[0].influent.geomean)
+
+
+def test__location_stat():
+    numpy.random.seed(0)
+    ds = wqio.Dataset(location(numpy.random.lognormal(size=25)), location(numpy.random.lognormal(size=30)))
+    dstats = {"influent": {"median": 99.0}, "effluent": {}}
+    assert summary._location_stat(ds, "influent", "median", dstats) == 99.0
+    assert summary._location_stat(ds, "influent", "mean", dstats) == ds.influent.mean
+    assert summary._location_stat(ds, "effluent", "median", dstats) == ds.effluent.median
+    assert summary._location_stat(ds, "influent", "median") == ds.influent.median
+    assert ds.influent.median != 99.0
+
+
+@pytest.mark.parametrize("bacteria", [False, True])
+def test__boxplot_stats(bacteria):
+    numpy.random.seed(0)
+    ds = wqio.Dataset(location(numpy.random.lognormal(size=25)), location(numpy.random.lognormal(size=30)))
+    expected = ds.influent.boxplot_stats(log=True, bacteria=bacteria)[0]
+
+    # the same as wqio's, from the records...
+    names = ["mean", "geomean", "median", "pctl25", "pctl75", "median_conf_interval"]
+    records = {"influent": {name: getattr(ds.influent, name) for name in names}}
+    result = summary._boxplot_stats(ds, "influent", bacteria, records)[0]
+    assert sorted(result) == sorted(expected)
+    for key, value in expected.items():
+        nptest.assert_array_equal(result[key], value)
+
+    # ... which are used instead of the location's
+    records["influent"].update(median=99.0, median_conf_interval=numpy.array([90.0, 110.0]))
+    result = summary._boxplot_stats(ds, "influent", bacteria, records)[0]
+    assert (result["med"], result["cilo"], result["cihi"]) == (99.0, 90.0, 110.0)
+
+
+def test_CategoricalSummary_precompute():
+    numpy.random.seed(0)
+    datasets = []
+    for param in ["Lead", "Zinc"]:
+        ds = wqio.Dataset(location(numpy.random.lognormal(size=12)), location(numpy.random.lognormal(size=10)))
+        ds.definition = {"parameter": wqio.Parameter(name=param, units="ug/L"), "category": "Bioretention"}
+        datasets.append(ds)
+
+    def tex_input(dsum, tabletitle, subsection=True):
+        return "{}\n".format(dsum._location_stat("effluent", "median"))
+
+    cs = summary.CategoricalSummary(
+        datasets, "Metals", "basepath", "figs", bootstrap=dict(niter=100, seed=0), precompute=True
+    )
+    with mock.patch.object(summary.DatasetSummary, "makeTexInput", autospec=True, side_effect=tex_input):
+        with mock.patch.object(summary, "_render_figures") as render:
+            with StringIO() as inputIO:
+                cs._make_input_file_IO(inputIO)
+                output = inputIO.getvalue()
+
+    # the tables and the plots read the same statistics, computed once
+    for ds, dstats, call in zip(datasets, cs.location_stats, render.call_args_list):
+        assert call.args[0] is ds
+        assert call.args[-1] is dstats
+        assert "{}\n".format(dstats["effluent"]["median"]) in output
+    assert cs.stat_counts["median"] == 4
+    assert cs.stat_counts["median_conf_interval"] == 4
+    assert cs.stat_counts["dataframe"] == 4
+    for ds in datasets:
+        assert "median" not in ds.effluent._cache
+
+
+def test__count_computed_stats():
+    numpy.random.seed(0)
+    ds = wqio.Dataset(location(numpy.random.lognormal(size=25)), location(numpy.random.lognormal(size=30)))
+    counts = Counter()
+    with summary._count_computed_stats(counts, [ds, ds.influent, ds.effluent]):
+        ds.influent.median
+        ds.effluent.median
+        ds.influent.median
+        ds.n_pairs
+
+    assert counts["median"] == 2
+    assert counts["dataframe"] == 2
+    assert counts["n_pairs"] == 1
+    assert counts["mean"] == 0
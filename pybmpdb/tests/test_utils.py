@@ -33,6 +33,15 @@ def test_refresh_index():
     assert dfr is utils.refresh_index(dfr)
 
 
+@pytest.mark.parametrize(
+    ("n_jobs", "expected", "error"),
+    [(None, 1, None), (1, 1, None), (3, 3, None), (-1, 8, None), (-2, 7, None), (-20, 1, None), (0, None, ValueError)],
+)
+def test_n_workers(n_jobs, expected, error):
+    with mock.patch.object(os, "cpu_count", return_value=8), helpers.raises(error):
+        assert utils.n_workers(n_jobs) == expected
+
+
 def test_get_level_position():
     idx = pandas.MultiIndex.from_product([list("ABC"), ["cat", "dog", "fox", "deer"]], names=["forest", "animal"])
     df = pandas.DataFrame(index=idx, columns=list("abc"))
@@ -328,3 +337,14 @@ def test_compile_smoke(deep_dir, latex_content):
 
     with utils.LaTeXDirectory(deep_file) as latex:
         latex.compile(deep_file)
+
+
+def test_ProgressBar():
+    with StringIO() as stream:
+        pbar = utils.ProgressBar(list("abcd"), width=8, stream=stream)
+        pbar.animate(1)
+        pbar.animate(4)
+        output = stream.getvalue()
+
+    expected = "\r[**      ] 1 of 4 complete\r[********] 4 of 4 complete\n"
+    assert output == expected
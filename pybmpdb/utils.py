@@ -1,5 +1,6 @@
 from textwrap import dedent
 import os
+import sys
 import subprocess
 
 import numpy
@@ -34,6 +35,34 @@ def get_level_position(df, levelname):
     return ri[0]
 
 
+def n_workers(n_jobs=None):
+    """ Number of worker processes to use for a given *n_jobs*.
+
+    Parameters
+    ----------
+    n_jobs : int, optional
+        None or 1 means no parallelism. Negative values count back from
+        the number of CPUs, such that -1 uses all of them, -2 all but one,
+        etc.
+
+    Returns
+    -------
+    workers : int
+
+    """
+
+    if n_jobs is None:
+        return 1
+
+    if n_jobs == 0:
+        raise ValueError("n_jobs cannot be 0")
+
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+
+    return n_jobs
+
+
 def sanitizeTex(texstring):
     """ Cleans up overly eager LaTeX renderings from pandas.
 
@@ -538,3 +567,48 @@ class LaTeXDirectory(object):
             tex = None
 
         return tex
+
+
+class ProgressBar(object):
+    """ Simple text progress bar for loops over a sequence.
+
+    Parameters
+    ----------
+    sequence : sized iterable
+        The items being looped over (only its length is used).
+    width : int (default = 50)
+        Number of characters of the bar itself.
+    stream : file-like, optional
+        Where the bar is written. Defaults to ``sys.stdout``.
+
+    Examples
+    --------
+    >>> pbar = ProgressBar(datasets)
+    >>> for n, ds in enumerate(datasets, 1):
+    ...     do_something(ds)
+    ...     pbar.animate(n)
+
+    """
+
+    def __init__(self, sequence, width=50, stream=None):
+        self.N = len(sequence)
+        self.width = width
+        self.stream = stream or sys.stdout
+
+    def animate(self, iteration):
+        """ Redraws the bar after *iteration* items are done.
+
+        Parameters
+        ----------
+        iteration : int
+            Number of items done so far, from 1 to the length of the
+            sequence. The line is ended with the last one.
+
+        """
+
+        filled = self.width if self.N == 0 else int(self.width * iteration // self.N)
+        bar = "[{}{}]".format("*" * filled, " " * (self.width - filled))
+        self.stream.write("\r{} {} of {} complete".format(bar, iteration, self.N))
+        if iteration >= self.N:
+            self.stream.write("\n")
+        self.stream.flush()
@@ -36,6 +36,7 @@ INSTALL_REQUIRES = [
     "numpy",
     "matplotlib",
     "pandas",
+    "scipy",
     "statsmodels",
     "openpyxl",
     "seaborn",